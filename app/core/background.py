@@ -0,0 +1,85 @@
+# app/core/background.py
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List
+
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.core.tenants import all_tenants, use_tenant
+
+log = logging.getLogger("app.background")
+
+Job = Callable[[Session], Any]
+AsyncJob = Callable[[], Awaitable[Any]]
+
+_tasks: List[asyncio.Task] = []
+
+
+def _run_job(job: Job) -> Dict[str, Any]:
+    """
+    Run job once per tenant, each with its own session; returns {tenant id:
+    result}. One tenant failing (e.g. not provisioned yet) does not stop the rest.
+    """
+    results: Dict[str, Any] = {}
+    for tenant in all_tenants():
+        try:
+            with use_tenant(tenant), SessionLocal() as db:
+                results[tenant.id] = job(db)
+        except Exception:
+            log.exception("Job failed for tenant %s", tenant.id)
+            results[tenant.id] = None
+    return results
+
+
+async def _run_async_job(job: AsyncJob) -> Dict[str, Any]:
+    """Await job() once per tenant, with that tenant current; returns {tenant id: result}."""
+    results: Dict[str, Any] = {}
+    for tenant in all_tenants():
+        try:
+            with use_tenant(tenant):
+                results[tenant.id] = await job()
+        except Exception:
+            log.exception("Job failed for tenant %s", tenant.id)
+            results[tenant.id] = None
+    return results
+
+
+def _schedule(name: str, interval_s: float, run: Callable[[], Awaitable[Dict[str, Any]]]) -> None:
+    if interval_s <= 0:
+        log.info("Periodic job %s disabled", name)
+        return
+
+    async def _loop() -> None:
+        while True:
+            await asyncio.sleep(interval_s)
+            try:
+                result = await run()
+                log.debug("Periodic job %s done: %s", name, result)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("Periodic job %s failed", name)
+
+    _tasks.append(asyncio.get_running_loop().create_task(_loop(), name=name))
+    log.info("Periodic job %s started (every %ss)", name, interval_s)
+
+
+def start_periodic(name: str, interval_s: float, job: Job) -> None:
+    """
+    Run job(db) every interval_s seconds in a worker thread, once per tenant with its own session.
+    Must be called from the event loop (async startup hook). interval_s <= 0 disables.
+    """
+    _schedule(name, interval_s, lambda: asyncio.to_thread(_run_job, job))
+
+
+def start_periodic_async(name: str, interval_s: float, job: AsyncJob) -> None:
+    """Like start_periodic, for coroutine jobs that do their own DB work (e.g. DB + Graph API sends)."""
+    _schedule(name, interval_s, lambda: _run_async_job(job))
+
+
+async def stop_all() -> None:
+    for t in _tasks:
+        t.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
@@ -12,6 +12,10 @@ WHATSAPP_TOKEN: str = os.getenv("WHATSAPP_TOKEN", "")
 WABA_ID: str = os.getenv("WABA_ID", "")
 PHONE_NUMBER_ID: str = os.getenv("PHONE_NUMBER_ID", "")
 APP_SECRET: Optional[str] = os.getenv("APP_SECRET")
+# Without APP_SECRET webhook POSTs are rejected; set this to accept them unsigned (local development only).
+ALLOW_UNSIGNED_WEBHOOKS: bool = os.getenv("ALLOW_UNSIGNED_WEBHOOKS", "false").lower() in ["1", "true", "yes"]
+# Larger webhook bodies get a 413 before they are read in full or hashed.
+WEBHOOK_MAX_BODY_BYTES: int = int(os.getenv("WEBHOOK_MAX_BODY_BYTES", str(1024 * 1024)))
 
 # === App ===
 GRAPH_API_VERSION: str = os.getenv("GRAPH_API_VERSION", "v21.0")
@@ -25,3 +29,163 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 FLOW_NAME = os.getenv("FLOW_NAME")
 TARGET_WA_NUMBER = os.getenv("TARGET_WA_NUMBER")
 FLOW_ID = os.getenv("FLOW_ID", "")
+
+# === Startup ===
+# FAST_START skips create_all + live schema inspection when the stored schema
+# fingerprint matches the models (falls back to the full path on mismatch).
+FAST_START: bool = os.getenv("FAST_START", "false").lower() in ["1", "true", "yes"]
+
+# === Inventory ledger ===
+# Seconds between snapshot compactions of inventory_movements (0 disables the job).
+INVENTORY_COMPACTION_INTERVAL_S: int = int(os.getenv("INVENTORY_COMPACTION_INTERVAL_S", "3600"))
+# Snapshots only cover movements older than this many seconds. Movements are
+# stamped when their transaction starts, so this must exceed the longest
+# stock-writing transaction or a late commit would fall behind a snapshot.
+INVENTORY_COMPACTION_GRACE_S: int = int(os.getenv("INVENTORY_COMPACTION_GRACE_S", "300"))
+
+# === Low-stock alerts ===
+# SKUs whose stock drops to their reorder threshold (per SKU, per category, or
+# REORDER_DEFAULT_THRESHOLD; 0 = none) are sent to LOW_STOCK_NOTIFY_NUMBER
+# (default TARGET_WA_NUMBER) as one WhatsApp digest every
+# LOW_STOCK_DIGEST_INTERVAL_S seconds (0 disables).
+REORDER_DEFAULT_THRESHOLD: int = int(os.getenv("REORDER_DEFAULT_THRESHOLD", "0"))
+LOW_STOCK_NOTIFY_NUMBER: str = os.getenv("LOW_STOCK_NOTIFY_NUMBER") or TARGET_WA_NUMBER or ""
+LOW_STOCK_DIGEST_INTERVAL_S: int = int(os.getenv("LOW_STOCK_DIGEST_INTERVAL_S", "900"))
+
+# === Stock holds ===
+# New orders reserve their units (STOCK_HOLDS_ENABLED); holds not confirmed
+# within STOCK_HOLD_TTL_S are returned to stock by a sweeper running every
+# STOCK_HOLD_SWEEP_INTERVAL_S seconds (0 disables), STOCK_HOLD_SWEEP_BATCH per transaction.
+# SKUs without an inventory row are untracked and never held (or refused).
+STOCK_HOLDS_ENABLED: bool = os.getenv("STOCK_HOLDS_ENABLED", "true").lower() in ["1", "true", "yes"]
+STOCK_HOLD_TTL_S: int = int(os.getenv("STOCK_HOLD_TTL_S", "1800"))
+STOCK_HOLD_SWEEP_INTERVAL_S: int = int(os.getenv("STOCK_HOLD_SWEEP_INTERVAL_S", "60"))
+STOCK_HOLD_SWEEP_BATCH: int = int(os.getenv("STOCK_HOLD_SWEEP_BATCH", "500"))
+
+# === Order archive ===
+# Delivered/Cancelled orders created more than ORDER_ARCHIVE_AFTER_DAYS ago are
+# moved to orders_archive every ORDER_ARCHIVE_INTERVAL_S seconds (0 disables),
+# ORDER_ARCHIVE_BATCH orders per transaction.
+ORDER_ARCHIVE_AFTER_DAYS: int = int(os.getenv("ORDER_ARCHIVE_AFTER_DAYS", "90"))
+ORDER_ARCHIVE_INTERVAL_S: int = int(os.getenv("ORDER_ARCHIVE_INTERVAL_S", "3600"))
+ORDER_ARCHIVE_BATCH: int = int(os.getenv("ORDER_ARCHIVE_BATCH", "500"))
+
+# === Flow payload budget ===
+# Upper bound (bytes of JSON, before encryption/base64 which add about a third)
+# for the list data in one flow message or data_exchange response; longer
+# category/variant/order lists are cut and the screen shows a "Load more" link.
+FLOW_PAYLOAD_MAX_BYTES: int = int(os.getenv("FLOW_PAYLOAD_MAX_BYTES", "48000"))
+
+# === Variant images ===
+# Uploaded photos and their renditions are stored under MEDIA_DIR, named by
+# content hash; renditions are rendered in a pool of IMAGE_WORKERS processes.
+MEDIA_DIR: str = os.getenv("MEDIA_DIR", "media")
+IMAGE_MAX_UPLOAD_BYTES: int = int(os.getenv("IMAGE_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+IMAGE_WORKERS: int = int(os.getenv("IMAGE_WORKERS", "2"))
+IMAGE_JPEG_QUALITY: int = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+
+# === Catalog indexes ===
+# Search/facet indexes live in each process and replay the catalog_changes log
+# (one indexed query per use) to pick up other processes' writes; as a safety
+# net they fully reload once older than CATALOG_INDEX_MAX_AGE_S. The log keeps
+# CATALOG_CHANGES_RETAIN_S of history (must exceed the max age).
+CATALOG_INDEX_MAX_AGE_S: int = int(os.getenv("CATALOG_INDEX_MAX_AGE_S", "600"))
+CATALOG_CHANGES_RETAIN_S: int = int(os.getenv("CATALOG_CHANGES_RETAIN_S", "86400"))
+CATALOG_CHANGES_PURGE_INTERVAL_S: int = int(os.getenv("CATALOG_CHANGES_PURGE_INTERVAL_S", "3600"))
+
+# === Idempotency keys ===
+# Responses to requests carrying an Idempotency-Key are replayed for
+# IDEMPOTENCY_TTL_S. A duplicate arriving while the original still runs waits
+# up to IDEMPOTENCY_WAIT_S (then 409); an original silent for
+# IDEMPOTENCY_STALE_S is presumed dead and its key may be taken over.
+# The wait polls with time.sleep inside the endpoint's threadpool worker, so
+# every waiting duplicate holds one of the threadpool's threads: keep it short.
+IDEMPOTENCY_TTL_S: int = int(os.getenv("IDEMPOTENCY_TTL_S", "86400"))
+IDEMPOTENCY_WAIT_S: float = float(os.getenv("IDEMPOTENCY_WAIT_S", "3"))
+IDEMPOTENCY_STALE_S: int = int(os.getenv("IDEMPOTENCY_STALE_S", "60"))
+IDEMPOTENCY_PURGE_INTERVAL_S: int = int(os.getenv("IDEMPOTENCY_PURGE_INTERVAL_S", "3600"))
+
+# === Flow completion writes ===
+# Completed flow submissions are committed in micro-batches: a batch closes at
+# FLOW_BATCH_MAX_SIZE operations or FLOW_BATCH_MAX_WAIT_MS after its first one.
+FLOW_BATCH_MAX_SIZE: int = int(os.getenv("FLOW_BATCH_MAX_SIZE", "50"))
+FLOW_BATCH_MAX_WAIT_MS: int = int(os.getenv("FLOW_BATCH_MAX_WAIT_MS", "50"))
+
+# === Customer notifications ===
+# Max concurrent Graph API sends when fanning out order status messages.
+NOTIFY_CONCURRENCY: int = int(os.getenv("NOTIFY_CONCURRENCY", "8"))
+# Most orders one PATCH /orders/status/bulk may move (and notify) at once.
+BULK_STATUS_MAX_ORDERS: int = int(os.getenv("BULK_STATUS_MAX_ORDERS", "500"))
+
+# === Broadcast campaigns ===
+CAMPAIGN_RATE_PER_S: float = float(os.getenv("CAMPAIGN_RATE_PER_S", "20"))
+CAMPAIGN_WORKERS: int = int(os.getenv("CAMPAIGN_WORKERS", "8"))
+# Recipients per checkpoint: at most one chunk is re-sent after a crash.
+CAMPAIGN_CHUNK_SIZE: int = int(os.getenv("CAMPAIGN_CHUNK_SIZE", "200"))
+# A running campaign is sent by the one worker holding its lease; the lease is
+# renewed at every checkpoint and must outlast sending one chunk. Expired
+# leases (crashed worker) are taken over by the resume job run this often.
+CAMPAIGN_LEASE_S: int = int(os.getenv("CAMPAIGN_LEASE_S", "300"))
+
+# === Message status ingestion ===
+# Delivery/read callbacks are buffered and written in bulk: a flush happens at
+# STATUS_BATCH_MAX_SIZE statuses or STATUS_BATCH_MAX_WAIT_MS after the first one.
+STATUS_BATCH_MAX_SIZE: int = int(os.getenv("STATUS_BATCH_MAX_SIZE", "1000"))
+STATUS_BATCH_MAX_WAIT_MS: int = int(os.getenv("STATUS_BATCH_MAX_WAIT_MS", "1000"))
+# At most STATUS_QUEUE_MAX statuses wait for a flush; more are dropped (logged) instead of growing memory.
+STATUS_QUEUE_MAX: int = int(os.getenv("STATUS_QUEUE_MAX", "20000"))
+# A failed flush is retried this many times with backoff before its statuses are dropped.
+STATUS_BATCH_RETRIES: int = int(os.getenv("STATUS_BATCH_RETRIES", "3"))
+
+# === Graph API circuit breaker ===
+# One breaker per tenant (WhatsApp number). It opens when, over the last
+# GRAPH_CB_WINDOW_S seconds (and at least GRAPH_CB_MIN_CALLS calls), the share of
+# failed (network/5xx/429) or slow (> GRAPH_CB_SLOW_MS) calls reaches
+# GRAPH_CB_FAILURE_RATIO; stays open GRAPH_CB_OPEN_S before half-open probes.
+GRAPH_TIMEOUT_S: float = float(os.getenv("GRAPH_TIMEOUT_S", "20"))
+GRAPH_CB_WINDOW_S: float = float(os.getenv("GRAPH_CB_WINDOW_S", "30"))
+GRAPH_CB_MIN_CALLS: int = int(os.getenv("GRAPH_CB_MIN_CALLS", "10"))
+GRAPH_CB_FAILURE_RATIO: float = float(os.getenv("GRAPH_CB_FAILURE_RATIO", "0.5"))
+GRAPH_CB_SLOW_MS: float = float(os.getenv("GRAPH_CB_SLOW_MS", "5000"))
+GRAPH_CB_OPEN_S: float = float(os.getenv("GRAPH_CB_OPEN_S", "30"))
+GRAPH_CB_PROBES: int = int(os.getenv("GRAPH_CB_PROBES", "1"))
+# Read receipts / typing indicators are dropped once this many Graph calls are outstanding.
+GRAPH_SHED_OPTIONAL_INFLIGHT: int = int(os.getenv("GRAPH_SHED_OPTIONAL_INFLIGHT", "16"))
+
+# === Inbound burst coalescing ===
+# Messages from one sender are collected until INBOUND_DEBOUNCE_MS pass without a new
+# one (at most INBOUND_DEBOUNCE_MAX_MS after the first), then handled together with a
+# single read receipt. 0 handles every message immediately.
+INBOUND_DEBOUNCE_MS: int = int(os.getenv("INBOUND_DEBOUNCE_MS", "300"))
+INBOUND_DEBOUNCE_MAX_MS: int = int(os.getenv("INBOUND_DEBOUNCE_MAX_MS", "1200"))
+
+# === Database pool ===
+# Connections = DB_POOL_SIZE kept open + up to DB_MAX_OVERFLOW extra under load;
+# a checkout waits DB_POOL_TIMEOUT_S for a free one before failing.
+DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT_S: float = float(os.getenv("DB_POOL_TIMEOUT_S", "30"))
+DB_POOL_RECYCLE_S: int = int(os.getenv("DB_POOL_RECYCLE_S", "300"))
+# Pre-ping costs a round-trip per checkout; recycling already retires idle connections.
+DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() in ["1", "true", "yes"]
+
+# === Read replicas ===
+# Comma-separated replica URLs; read-only endpoints and flow screens use them.
+# A caller's reads stay on the primary for REPLICA_PIN_S seconds after their last write.
+DATABASE_REPLICA_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URL", "").split(",") if u.strip()]
+REPLICA_PIN_S: float = float(os.getenv("REPLICA_PIN_S", "5"))
+# Key for the signed last-write cookie that carries HTTP pins between processes;
+# every worker must share it. Unset = a per-process key, so pins hold within one process only.
+REPLICA_PIN_SECRET: str = os.getenv("REPLICA_PIN_SECRET", "")
+
+# === Tenants ===
+# JSON file listing extra boutiques (see app/core/tenants.py); the settings above are the "default" tenant.
+TENANTS_FILE: str = os.getenv("TENANTS_FILE", "")
+# REST credential of the default tenant (X-Api-Key header). Required once
+# TENANTS_FILE adds tenants; unset on a single-shop deployment the REST API
+# stays open. The webhook and flow endpoints authenticate by signature/token.
+API_KEY: str = os.getenv("API_KEY", "")
+# Engines for tenants with their own database/schema kept open at once (LRU).
+TENANT_MAX_ENGINES: int = int(os.getenv("TENANT_MAX_ENGINES", "16"))
+# Tenants whose in-memory catalog indexes are kept at once (LRU; evicted ones reload on demand).
+TENANT_MAX_CACHED: int = int(os.getenv("TENANT_MAX_CACHED", "8"))
@@ -1,31 +1,266 @@
 # app/core/database.py (add/modify parts)
 
 import os
+import hashlib
+import itertools
 import logging
-from typing import Generator, Dict, List, Optional
-from sqlalchemy import create_engine, text, event, inspect
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar, Token
+from typing import Callable, Generator, Dict, List, Optional, Tuple
+from sqlalchemy import Delete, Insert, Update, create_engine, text, event, inspect
 from sqlalchemy.orm import sessionmaker, Session, declarative_base
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateColumn, CreateSchema
 from sqlalchemy.exc import SQLAlchemyError
 
 from . import config
+from .dbpool import InstrumentedQueuePool, instrument
+from .tenants import Tenant, current_tenant
 
 logger = logging.getLogger("app.db")
 SQL_ECHO = os.getenv("SQLALCHEMY_ECHO", "0") in ("1", "true", "True")
 
-engine = create_engine(
-    config.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    echo=SQL_ECHO,
-    connect_args={"check_same_thread": False} if config.DATABASE_URL.startswith("sqlite") else {},
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def _pool_args(url: str) -> dict:
+    """Sized QueuePool for everything but in-memory SQLite (one shared connection)."""
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/") in ("sqlite:", "sqlite+pysqlite:")):
+        return {}
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT_S,
+    }
+
+
+def _make_engine(url: str):
+    """Engine with its own pool and pool counters (see dbpool)."""
+    eng = create_engine(
+        url,
+        pool_pre_ping=config.DB_POOL_PRE_PING,
+        pool_recycle=config.DB_POOL_RECYCLE_S,
+        echo=SQL_ECHO,
+        connect_args={"check_same_thread": False} if url.startswith("sqlite") else {},
+        **_pool_args(url),
+    )
+    instrument(eng)
+    return eng
+
+
+engine = _make_engine(config.DATABASE_URL)
+replica_engines = [_make_engine(url) for url in config.DATABASE_REPLICA_URLS]
+_replica_cycle = itertools.cycle(replica_engines) if replica_engines else None
+
+# ---------- tenants ----------
+# Tenants on the default database share `engine`; a schema-only tenant gets a
+# schema-translating view of it (same pool). Tenants with their own
+# database_url get their own pool, at most TENANT_MAX_ENGINES at once (LRU).
+
+_tenant_engines: "OrderedDict[str, Tuple[Engine, bool]]" = OrderedDict()  # id -> (engine, owns_pool)
+_tenant_lock = threading.Lock()
+
+
+def _open_tenant_engine(tenant: Tenant) -> Tuple[Engine, bool]:
+    owns_pool = bool(tenant.database_url)
+    eng = _make_engine(tenant.database_url) if owns_pool else engine
+    if tenant.schema:
+        eng = eng.execution_options(schema_translate_map={None: tenant.schema})
+    logger.info("Opened engine for tenant %s (own pool=%s, schema=%s)", tenant.id, owns_pool, tenant.schema)
+    return eng, owns_pool
+
+
+def tenant_engine(tenant: Optional[Tenant] = None) -> Engine:
+    """Primary engine of `tenant` (default: the current one)."""
+    tenant = tenant or current_tenant()
+    if not tenant.database_url and not tenant.schema:
+        return engine
+    with _tenant_lock:
+        hit = _tenant_engines.get(tenant.id)
+        if hit is not None:
+            _tenant_engines.move_to_end(tenant.id)
+            return hit[0]
+    opened = _open_tenant_engine(tenant)  # outside the lock: may build a pool
+    with _tenant_lock:
+        hit = _tenant_engines.get(tenant.id)
+        if hit is not None:  # lost a race; keep the first
+            if opened[1]:
+                opened[0].dispose()
+            return hit[0]
+        _tenant_engines[tenant.id] = opened
+        while len(_tenant_engines) > max(1, config.TENANT_MAX_ENGINES):
+            evicted, (old, owns_pool) = _tenant_engines.popitem(last=False)
+            if owns_pool:
+                old.dispose()
+            logger.info("Closed engine for tenant %s (LRU)", evicted)
+    return opened[0]
+
+
+def engine_pools() -> Dict[str, Engine]:
+    """Every engine with its own pool, by label: primary, replica:<n>, tenant:<id> (open ones only)."""
+    out: Dict[str, Engine] = {"primary": engine}
+    out.update((f"replica:{i}", eng) for i, eng in enumerate(replica_engines))
+    with _tenant_lock:
+        out.update((f"tenant:{tid}", eng) for tid, (eng, owns_pool) in _tenant_engines.items() if owns_pool)
+    return out
+
+
+def provision_tenant(tenant: Tenant) -> List[str]:
+    """
+    Create a tenant's schema, tables and missing columns (python -m app.manage
+    provision-tenants); request handling never runs DDL. Returns columns added.
+    """
+    eng = tenant_engine(tenant)
+    if tenant.schema and eng.dialect.name == "postgresql":
+        with eng.begin() as conn:
+            conn.execute(CreateSchema(tenant.schema, if_not_exists=True))
+    from app import models  # noqa: F401  registers models on this Base
+    Base.metadata.create_all(bind=eng)
+    added = _add_missing_columns(eng)
+    logger.info("Provisioned tenant %s (schema=%s)", tenant.id, tenant.schema)
+    return added
+
+
+# ---------- read/write routing ----------
+# Read-only sessions use a replica unless the current caller wrote within the
+# last REPLICA_PIN_S seconds (read-your-writes). The caller is whatever the
+# entry point identifies: HTTP client, WhatsApp sender, flow token.
+#
+# Two records of the last write are kept: a WriteMark that the entry point
+# carries between requests (HTTP: a signed cookie, see main.py), which pins
+# across processes, and a per-process map keyed by caller for entry points
+# that cannot carry one (webhook, flows). Those pins only hold within one
+# process; with several workers a sender's next message may hit a replica.
+
+
+class WriteMark:
+    """Wall-clock time of `caller`'s last write, as carried by the entry point (None = unknown)."""
+
+    __slots__ = ("caller", "at")
+
+    def __init__(self, caller: Optional[str], at: Optional[float] = None) -> None:
+        self.caller = caller
+        self.at = at
+
+
+_caller: ContextVar[Optional[str]] = ContextVar("db_caller", default=None)
+_write_mark: ContextVar[Optional[WriteMark]] = ContextVar("db_write_mark", default=None)
+_last_write: Dict[str, float] = {}
+
+
+def set_caller(caller: Optional[str]) -> Token:
+    return _caller.set(caller)
+
+
+def reset_caller(token: Token) -> None:
+    _caller.reset(token)
+
+
+def set_write_mark(mark: Optional[WriteMark]) -> Token:
+    """Use `mark` for this context; note_write updates it in place, so the entry point sees writes made in worker threads."""
+    return _write_mark.set(mark)
+
+
+def reset_write_mark(token: Token) -> None:
+    _write_mark.reset(token)
+
+
+def note_write(caller: Optional[str] = None) -> None:
+    """Pin `caller` (default: the current one) to the primary for REPLICA_PIN_S."""
+    if not replica_engines:
+        return
+    caller = caller or _caller.get()
+    mark = _write_mark.get()
+    if mark is not None and mark.caller == caller:
+        mark.at = time.time()
+    if not caller:
+        return
+    now = time.monotonic()
+    if len(_last_write) > 10_000:
+        for k in [k for k, t in _last_write.items() if now - t > config.REPLICA_PIN_S]:
+            _last_write.pop(k, None)
+    _last_write[caller] = now
+
+
+def _pinned_to_primary() -> bool:
+    caller = _caller.get()
+    mark = _write_mark.get()
+    if mark is not None and mark.caller == caller and mark.at is not None and time.time() - mark.at < config.REPLICA_PIN_S:
+        return True
+    if caller is None:
+        return False
+    t = _last_write.get(caller)
+    return t is not None and time.monotonic() - t < config.REPLICA_PIN_S
+
+
+class RoutingSession(Session):
+    """Session that sends a read-only session's SELECTs to a replica and everything else to the primary."""
+
+    def __init__(self, *args, read_only: bool = False, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.read_only = read_only
+        # one replica per session so a unit of work reads a consistent snapshot
+        self._replica = next(_replica_cycle) if read_only and _replica_cycle else None
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        primary = tenant_engine()
+        if primary is not engine:
+            return primary  # replicas serve the default database only
+        if (
+            self._replica is not None
+            and not self._flushing
+            and not isinstance(clause, (Insert, Update, Delete))
+            and not _pinned_to_primary()
+        ):
+            return self._replica
+        return engine
+
+    def execute(self, statement, *args, **kwargs):
+        # not a do_orm_execute hook: any listener there disables legacy Query.yield_per
+        if isinstance(statement, (Insert, Update, Delete)):
+            self.info["wrote"] = True
+        return super().execute(statement, *args, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _flushed(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _committed(session):
+    if session.info.pop("wrote", False):
+        note_write()
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _rolled_back(session):
+    session.info.pop("wrote", None)
+
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=RoutingSession)
 Base = declarative_base()
 
 @event.listens_for(engine, "connect")
 def _on_connect(dbapi_connection, connection_record):
     logger.info("DB connection opened: %s", engine.url)
 
+def upsert_insert(bind) -> Optional[Callable]:
+    """
+    Dialect `insert` construct supporting ON CONFLICT (Postgres/SQLite), or
+    None when the backend has no such clause and callers must fall back.
+    """
+    name = bind.dialect.name
+    if name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    return None
+
+
 def get_db() -> Generator[Session, None, None]:
     db = SessionLocal()
     try:
@@ -33,12 +268,84 @@ def get_db() -> Generator[Session, None, None]:
     finally:
         db.close()
 
+
+def get_read_db() -> Generator[Session, None, None]:
+    """Like get_db, for endpoints that only read: served by a replica when one is configured."""
+    db = SessionLocal(read_only=True)
+    try:
+        yield db
+    finally:
+        db.close()
+
 def check_db_connection() -> None:
     with engine.connect() as conn:
-        v = conn.execute(
-            text("select version(), current_database()")
-        ).fetchone()
-        logger.info("Connected to: %s | db=%s", v[0], v[1])
+        if engine.dialect.name == "postgresql":
+            v = conn.execute(
+                text("select version(), current_database()")
+            ).fetchone()
+            logger.info("Connected to: %s | db=%s", v[0], v[1])
+        else:
+            conn.execute(text("select 1"))
+            logger.info("Connected to: %s", engine.url)
+
+
+SCHEMA_STATE_KEY = "models"
+
+
+def schema_fingerprint() -> str:
+    """
+    sha256 over the tables/columns/indexes declared on Base, rendered for the
+    current dialect. Changes whenever a model changes shape.
+    """
+    from app import models  # noqa: F401  registers models on this Base
+
+    dialect = engine.dialect
+    h = hashlib.sha256(dialect.name.encode())
+    for table in sorted(Base.metadata.tables.values(), key=lambda t: t.name):
+        h.update(f"T:{table.name}".encode())
+        for col in table.columns:
+            try:
+                col_type = col.type.compile(dialect=dialect)
+            except Exception:
+                col_type = repr(col.type)
+            h.update(f"C:{col.name}:{col_type}:{col.nullable}:{col.primary_key}".encode())
+        for idx in sorted(table.indexes, key=lambda i: i.name or ""):
+            h.update(f"I:{idx.name}:{','.join(c.name for c in idx.columns)}:{idx.unique}".encode())
+    return h.hexdigest()
+
+
+def _stored_fingerprint() -> Optional[str]:
+    """Fingerprint recorded by the last full init_db, or None (also when the table is missing)."""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(
+                text("select fingerprint from schema_state where key = :k"), {"k": SCHEMA_STATE_KEY}
+            ).scalar()
+    except SQLAlchemyError:
+        return None
+
+
+def _store_fingerprint(fingerprint: str) -> None:
+    from app.models import SchemaState
+
+    with SessionLocal() as db:
+        db.merge(SchemaState(key=SCHEMA_STATE_KEY, fingerprint=fingerprint))
+        db.commit()
+
+
+def schema_is_current() -> bool:
+    """
+    Fast-start check: one round-trip that both proves connectivity and compares
+    the stored fingerprint with the models.
+    """
+    stored = _stored_fingerprint()
+    if stored is None:
+        logger.info("No stored schema fingerprint; full init required")
+        return False
+    if stored != schema_fingerprint():
+        logger.info("Schema fingerprint changed; full init required")
+        return False
+    return True
 
 def _live_db_objects() -> Dict[str, Dict[str, List[str]]]:
     """
@@ -69,11 +376,53 @@ def _live_db_objects() -> Dict[str, Dict[str, List[str]]]:
             out[sch or "default"] = {"tables": tables, "views": views}
     return out
 
-def init_db() -> None:
+def _ensure_indexes() -> None:
+    """create_all only builds indexes together with new tables; add any declared later on existing ones."""
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for idx in table.indexes:
+                idx.create(bind=conn, checkfirst=True)
+
+
+def _add_missing_columns(bind: Optional[Engine] = None) -> List[str]:
+    """
+    create_all never alters existing tables: add declared columns they lack.
+    New NOT NULL columns need a server_default. Returns "table.column" names added.
+    """
+    bind = bind or engine
+    schema = (bind.get_execution_options().get("schema_translate_map") or {}).get(None)  # schema tenants
+    prep = bind.dialect.identifier_preparer
+    added: List[str] = []
+    with bind.begin() as conn:
+        insp = inspect(conn)
+        for table in Base.metadata.sorted_tables:
+            if not insp.has_table(table.name, schema=schema):
+                continue
+            present = {c["name"] for c in insp.get_columns(table.name, schema=schema)}
+            for col in table.columns:
+                if col.name in present:
+                    continue
+                if not col.nullable and col.server_default is None:
+                    logger.error("Cannot add NOT NULL column %s.%s without a server_default", table.name, col.name)
+                    continue
+                ddl = CreateColumn(col).compile(dialect=bind.dialect)
+                target = f"{prep.quote_schema(schema)}.{prep.quote(table.name)}" if schema else prep.quote(table.name)
+                conn.execute(text(f"ALTER TABLE {target} ADD COLUMN {ddl}"))
+                added.append(f"{table.name}.{col.name}")
+    if added:
+        logger.info("Added columns: %s", ", ".join(added))
+    return added
+
+
+def init_db() -> List[str]:
+    """Create tables, columns and indexes declared on the models. Returns the columns added to existing tables."""
     try:
         logger.info("Importing models and creating tables …")
         from app import models  # IMPORTANT: registers models on this Base
         Base.metadata.create_all(bind=engine)
+        added = _add_missing_columns()
+        _ensure_indexes()
+        _store_fingerprint(schema_fingerprint())
 
         # Log what the **database** actually has:
         live = _live_db_objects()
@@ -81,6 +430,7 @@ def init_db() -> None:
             logger.info("Schema=%s | tables: %s", schema, ", ".join(objs["tables"]) or "(none)")
             if objs["views"]:
                 logger.info("Schema=%s | views: %s", schema, ", ".join(objs["views"]))
+        return added
     except Exception:
         logger.exception("Failed to create database tables")
         raise
@@ -0,0 +1,155 @@
+# app/core/dbpool.py
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+_SAMPLES = 2048
+
+
+class PoolStats:
+    """Thread-safe counters for one engine's connection pool."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._waits: Deque[float] = deque(maxlen=_SAMPLES)  # recent checkout waits, ms
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._waits.clear()
+            self.counters: Dict[str, int] = {
+                "checkouts": 0, "checkins": 0, "timeouts": 0, "overflow_checkouts": 0,
+                "connects": 0, "closes": 0, "invalidations": 0,
+            }
+            self.wait_ms_total = 0.0
+            self.wait_ms_max = 0.0
+            self.in_use = 0
+            self.in_use_peak = 0
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.counters[key] += 1
+
+    def waited(self, ms: float) -> None:
+        with self._lock:
+            self._waits.append(ms)
+            self.wait_ms_total += ms
+            self.wait_ms_max = max(self.wait_ms_max, ms)
+
+    def checked_out(self) -> None:
+        with self._lock:
+            self.counters["checkouts"] += 1
+            self.in_use += 1
+            self.in_use_peak = max(self.in_use_peak, self.in_use)
+
+    def checked_in(self) -> None:
+        with self._lock:
+            self.counters["checkins"] += 1
+            self.in_use = max(0, self.in_use - 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = sorted(self._waits)
+            counters = dict(self.counters)
+
+            def pct(p: float) -> float:
+                return round(waits[min(len(waits) - 1, int(p * len(waits)))], 3) if waits else 0.0
+
+            return {
+                **counters,
+                "in_use": self.in_use,
+                "in_use_peak": self.in_use_peak,
+                "wait_ms": {
+                    "avg": round(self.wait_ms_total / counters["checkouts"], 3) if counters["checkouts"] else 0.0,
+                    "p50": pct(0.50),
+                    "p95": pct(0.95),
+                    "p99": pct(0.99),
+                    "max": round(self.wait_ms_max, 3),
+                },
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times every checkout (queue wait + connect) into its own PoolStats."""
+
+    def __init__(self, *args: Any, stats: Optional[PoolStats] = None, **kw: Any) -> None:
+        super().__init__(*args, **kw)
+        self.stats = stats or PoolStats()
+
+    def recreate(self) -> "InstrumentedQueuePool":
+        new = super().recreate()  # dispose()/invalidation swap the pool; keep counting into the same stats
+        new.stats = self.stats
+        return new
+
+    def _inc_overflow(self) -> bool:
+        # called for every new connection; it is an overflow one once the count passes pool_size
+        opened = super()._inc_overflow()
+        if opened and self._overflow > 0:
+            self.stats.count("overflow_checkouts")
+        return opened
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.count("timeouts")
+            raise
+        self.stats.waited((time.perf_counter() - t0) * 1000)
+        return conn
+
+
+def pool_stats(engine: Engine) -> Optional[PoolStats]:
+    """Counters of an instrumented engine's pool (None for other pools, e.g. in-memory SQLite)."""
+    return getattr(engine.pool, "stats", None)
+
+
+def instrument(engine: Engine) -> None:
+    """Count checkouts/checkins and connection churn via pool events, into the engine's own PoolStats."""
+    stats = pool_stats(engine)
+    if stats is None:
+        return
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        stats.checked_out()
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        stats.checked_in()
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        stats.count("connects")
+
+    @event.listens_for(engine, "close")
+    def _close(dbapi_connection, connection_record):
+        stats.count("closes")
+
+    @event.listens_for(engine, "invalidate")
+    def _invalidate(dbapi_connection, connection_record, exception):
+        stats.count("invalidations")
+
+
+def pool_status(engine: Engine) -> Dict[str, Any]:
+    pool = engine.pool
+    out: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        out.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+            "timeout_s": pool.timeout(),
+        })
+    stats = pool_stats(engine)
+    if stats is not None:
+        out["stats"] = stats.snapshot()
+    return out
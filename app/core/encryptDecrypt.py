@@ -1,12 +1,9 @@
 import json
 import os
 from base64 import b64decode, b64encode
+from functools import lru_cache
 from typing import Dict, Optional
 
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.asymmetric.padding import MGF1, OAEP
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.primitives.serialization import load_pem_private_key
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field
 
@@ -39,13 +36,25 @@ PRIVATE_KEY = os.environ.get("PRIVATE_KEY")
 KEY_PASS = os.environ.get("KEY_PASS")
 
 
+@lru_cache(maxsize=1)
+def _private_key():
+    """Parse the PEM key once, on the first flow request rather than at import/startup."""
+    from cryptography.hazmat.primitives.serialization import load_pem_private_key
+
+    return load_pem_private_key(PRIVATE_KEY.encode("utf-8"), password=KEY_PASS.encode("utf-8"))
+
+
 def decryptRequest(encrypted_flow_data_b64, encrypted_aes_key_b64, initial_vector_b64):
     flow_data = b64decode(encrypted_flow_data_b64)
     iv = b64decode(initial_vector_b64)
     print("decrypt1")
     encrypted_aes_key = b64decode(encrypted_aes_key_b64)
 
-    private_key = load_pem_private_key(PRIVATE_KEY.encode("utf-8"), password=KEY_PASS.encode("utf-8"))
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric.padding import MGF1, OAEP
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+    private_key = _private_key()
     print("decrypt2")
     aes_key = private_key.decrypt(
         encrypted_aes_key,
@@ -62,6 +71,8 @@ def decryptRequest(encrypted_flow_data_b64, encrypted_aes_key_b64, initial_vecto
 
 
 def encryptResponse(response, aes_key, iv):
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
     flipped_iv = bytearray(iv)
     for i in range(len(flipped_iv)):
         flipped_iv[i] ^= 0xFF
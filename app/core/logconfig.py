@@ -7,25 +7,53 @@ from logging.config import dictConfig
 _LOG_FILES = {
     "app.main":               "logs/app_main.log",
     "app.db":                 "logs/app_db.log",
+    "app.background":         "logs/app_background.log",
+    "app.tenants":            "logs/app_tenants.log",
     "flows.boutique":         "logs/flows_boutique.log",
     "routers.webhook":        "logs/webhook.log",
     "services.message_logic": "logs/message_logic.log",
+    "services.batch_writer":  "logs/batch_writer.log",
+    "services.campaigns":     "logs/campaigns.log",
+    "services.archive":       "logs/archive.log",
+    "services.images":        "logs/images.log",
+    "services.idempotency":   "logs/idempotency.log",
+    "services.holds":         "logs/holds.log",
+    "services.low_stock":     "logs/low_stock.log",
+    "services.catalog_sync":  "logs/catalog_sync.log",
     "app.whatsapp":           "logs/whatsapp.log",
     "routers.products":  "logs/routers_products.log",
     "routers.inventory": "logs/routers_inventory.log",
     "routers.orders":    "logs/routers_orders.log",
+    "routers.reports":   "logs/routers_reports.log",
+    "routers.campaigns": "logs/routers_campaigns.log",
+    "routers.messages":  "logs/routers_messages.log",
+    "routers.diagnostics": "logs/routers_diagnostics.log",
 }
 
 _LOG_LEVELS = {
     "app.main": "INFO",
     "app.db": "INFO",
+    "app.background": "INFO",
+    "app.tenants": "INFO",
     "flows.boutique": "DEBUG",
     "routers.webhook": "INFO",
     "services.message_logic": "INFO",
+    "services.batch_writer": "INFO",
+    "services.campaigns": "INFO",
+    "services.archive": "INFO",
+    "services.images": "INFO",
+    "services.idempotency": "INFO",
+    "services.holds": "INFO",
+    "services.low_stock": "INFO",
+    "services.catalog_sync": "INFO",
     "app.whatsapp": "INFO",
     "routers.products":  "INFO",
     "routers.inventory": "INFO",
     "routers.orders":    "INFO",
+    "routers.reports":   "INFO",
+    "routers.campaigns": "INFO",
+    "routers.messages":  "INFO",
+    "routers.diagnostics": "INFO",
 }
 
 
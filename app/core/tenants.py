@@ -0,0 +1,173 @@
+# app/core/tenants.py
+"""
+Tenant (boutique) registry.
+
+Every tenant is one WhatsApp number with its own Graph credentials, flow and
+data location. The registry comes from TENANTS_FILE (JSON list); the legacy
+single-shop settings (PHONE_NUMBER_ID, WHATSAPP_TOKEN, FLOW_ID,
+DATABASE_URL) always form the "default" tenant, so an unconfigured
+deployment behaves exactly as before.
+
+  [{"id": "rose", "phone_number_id": "1234", "whatsapp_token": "...",
+    "flow_id": "...", "database_url": null, "schema": "rose",
+    "owner_number": "+91...", "api_key": "..."}]
+
+`database_url` null means the default database; `schema` (Postgres) puts the
+tenant's tables in their own schema on the same connection pool (create it
+with `python -m app.manage provision-tenants`). `api_key` is the tenant's
+REST credential (X-Api-Key); it is required for every tenant, the default
+one included (API_KEY), as soon as there is more than one.
+"""
+import hmac
+import json
+import logging
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
+from typing import Callable, Dict, Generic, Iterator, List, Optional, TypeVar
+
+from app.core import config
+
+log = logging.getLogger("app.tenants")
+
+DEFAULT_TENANT_ID = "default"
+
+_SCHEMA_RE = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+@dataclass(frozen=True)
+class Tenant:
+    id: str
+    phone_number_id: str
+    whatsapp_token: str
+    flow_id: str = ""
+    database_url: Optional[str] = None
+    schema: Optional[str] = None
+    owner_number: str = ""  # low-stock digests
+    api_key: str = ""       # REST credential (X-Api-Key)
+
+    def __post_init__(self) -> None:
+        if self.schema is not None and not _SCHEMA_RE.match(self.schema):
+            raise ValueError(f"Tenant {self.id!r}: schema must match {_SCHEMA_RE.pattern}")
+
+
+def _load_registry() -> Dict[str, Tenant]:
+    tenants: Dict[str, Tenant] = {
+        DEFAULT_TENANT_ID: Tenant(
+            id=DEFAULT_TENANT_ID,
+            phone_number_id=config.PHONE_NUMBER_ID,
+            whatsapp_token=config.WHATSAPP_TOKEN,
+            flow_id=config.FLOW_ID,
+            owner_number=config.LOW_STOCK_NOTIFY_NUMBER,
+            api_key=config.API_KEY,
+        )
+    }
+    if config.TENANTS_FILE:
+        with open(config.TENANTS_FILE, encoding="utf-8") as f:
+            for raw in json.load(f):
+                t = Tenant(**raw)
+                if t.id in tenants:
+                    raise ValueError(f"Duplicate tenant id {t.id!r} in {config.TENANTS_FILE}")
+                tenants[t.id] = t
+    if len(tenants) > 1:
+        keyless = [t.id for t in tenants.values() if not t.api_key]
+        if keyless:
+            raise ValueError(f"Tenants without api_key (API_KEY for the default one): {', '.join(keyless)}")
+        if len({t.api_key for t in tenants.values()}) != len(tenants):
+            raise ValueError("Tenants must not share an api_key")
+    return tenants
+
+
+_registry: Dict[str, Tenant] = _load_registry()
+_by_phone_number_id: Dict[str, Tenant] = {t.phone_number_id: t for t in _registry.values() if t.phone_number_id}
+_current: ContextVar[Optional[Tenant]] = ContextVar("tenant", default=None)
+
+
+def all_tenants() -> List[Tenant]:
+    return list(_registry.values())
+
+
+def get_tenant(tenant_id: str) -> Optional[Tenant]:
+    return _registry.get(tenant_id)
+
+
+def default_tenant() -> Tenant:
+    return _registry[DEFAULT_TENANT_ID]
+
+
+def api_keys_required() -> bool:
+    """False only for a single-shop deployment without API_KEY (REST API open, as before tenants)."""
+    return any(t.api_key for t in _registry.values())
+
+
+def tenant_for_api_key(api_key: str) -> Optional[Tenant]:
+    for t in _registry.values():
+        if t.api_key and hmac.compare_digest(t.api_key.encode(), api_key.encode()):
+            return t
+    return None
+
+
+def resolve_phone_number_id(phone_number_id: Optional[str]) -> Optional[Tenant]:
+    """Tenant owning a webhook's metadata.phone_number_id; single-tenant setups accept anything."""
+    if phone_number_id and phone_number_id in _by_phone_number_id:
+        return _by_phone_number_id[phone_number_id]
+    return default_tenant() if len(_registry) == 1 else None
+
+
+def current_tenant() -> Tenant:
+    return _current.get() or default_tenant()
+
+
+def set_tenant(tenant: Optional[Tenant]) -> Token:
+    return _current.set(tenant)
+
+
+def reset_tenant(token: Token) -> None:
+    _current.reset(token)
+
+
+@contextmanager
+def use_tenant(tenant: Tenant) -> Iterator[Tenant]:
+    token = _current.set(tenant)
+    try:
+        yield tenant
+    finally:
+        _current.reset(token)
+
+
+T = TypeVar("T")
+
+
+class TenantLocal(Generic[T]):
+    """
+    One instance of a cache per tenant, created on first use. At most
+    `max_tenants` are kept (least recently used are dropped and rebuilt
+    lazily), which bounds total memory however many tenants are served.
+    Attribute access forwards to the current tenant's instance, so module
+    singletons keep their call sites.
+    """
+
+    def __init__(self, factory: Callable[[], T], max_tenants: int) -> None:
+        self._factory = factory
+        self._max = max(1, max_tenants)
+        self._items: "OrderedDict[str, T]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        tid = current_tenant().id
+        with self._lock:
+            item = self._items.get(tid)
+            if item is None:
+                item = self._items[tid] = self._factory()
+                while len(self._items) > self._max:
+                    evicted, _ = self._items.popitem(last=False)
+                    log.info("Evicted %s cache for tenant %s", type(item).__name__, evicted)
+            else:
+                self._items.move_to_end(tid)
+            return item
+
+    def __getattr__(self, name: str):
+        return getattr(self.get(), name)
@@ -5,7 +5,6 @@ import logging
 import traceback
 
 from fastapi import APIRouter, Depends, HTTPException, Response
-from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 
 from app.core.encryptDecrypt import (
@@ -14,10 +13,13 @@ from app.core.encryptDecrypt import (
     decryptRequest,
     encryptResponse,
 )
-from app.core.database import get_db
+from app.core.database import get_read_db, set_caller
+from app.core.tenants import get_tenant, set_tenant
 from app.routers import orders as orders_router
-from app.routers import products as products_router
-from app.services import orders as orders_service
+from app.services.search import search_variants
+from app.flows_operations.services.budget import find_more, fit
+from app.flows_operations.services.loader import ScreenLoader
+from app.flows_operations.services.screens import SCREEN_BLOCKS, screen_data
 from app.models import OrderStatus
 
 router = APIRouter()
@@ -35,45 +37,6 @@ def _status_from_any(v: Optional[str]) -> Optional[OrderStatus]:
         return None
 
 
-def _map_categories(cats) -> List[Dict[str, str]]:
-    return [{"id": getattr(c, "id", ""), "title": getattr(c, "title", "")} for c in cats]
-
-
-def _map_variants(variants) -> List[Dict[str, str]]:
-    out: List[Dict[str, str]] = []
-    for v in variants:
-        vid = getattr(v, "sku", None) or getattr(v, "id", None)
-        title = getattr(v, "title", None)
-        if vid and title:
-            out.append({"id": vid, "title": title})
-    return out
-
-
-def _map_orders(orders) -> List[Dict[str, str]]:
-    opts: List[Dict[str, str]] = []
-    for o in orders:
-        oid = getattr(o, "id", None)
-        name = getattr(o, "customer_name", "")
-        status = getattr(o, "status", "")
-        if oid:
-            opts.append({"id": oid, "title": f"{oid} — {name} ({status})"})
-    print(f"opts{opts}")
-    return opts
-
-
-def _all_variant_options_via_services(db: Session) -> List[Dict[str, str]]:
-    items: List[Dict[str, str]] = []
-    cats = products_router.list_categories(db)
-    for c in cats:
-        cid = getattr(c, "id", None)
-        if not cid:
-            continue
-        vs = products_router.list_variants_by_category(db, cid)
-        items.extend(_map_variants(vs))
-        print(f"items{items}")
-    return items
-
-
 def _get_str(o: Any, name: str, default: str = "") -> str:
     val = getattr(o, name, default)
     return "" if val is None else str(val)
@@ -133,7 +96,7 @@ def _format_order_text(o: Any) -> str:
 
     items = getattr(o, "items", []) or []
     rows: List[Tuple[str, str, str, str]] = []
-    total = 0
+    total = getattr(o, "total_amount", 0) or 0  # maintained on write; no need to re-add the lines
 
     for it in items:
         title = _get_str(it, "title") or _get_str(it, "sku")
@@ -147,7 +110,6 @@ def _format_order_text(o: Any) -> str:
         unit = getattr(it, "unit_price", None)
         sub = (unit or 0) * qty
         rows.append((title, str(qty), _inr(unit), _inr(sub)))
-        total += sub
 
     # Header
     out: List[str] = []
@@ -206,17 +168,29 @@ def _format_order_text(o: Any) -> str:
 # ---------- main flow logic ----------
 
 
-async def processingDecryptedData_boutique(dd: DecryptedRequestData, db: Session) -> Dict[str, Any]:
+async def processingDecryptedData_boutique(
+    dd: DecryptedRequestData, db: Session, loader: Optional[ScreenLoader] = None
+) -> Dict[str, Any]:
     log.debug("Flow request: action=%s screen=%s", dd.action, dd.screen)
 
     if dd.action == "ping":
         return {"version": "3.0", "data": {"status": "active"}}
+    loader = loader or ScreenLoader()
 
     screen: str = dd.screen or ""
     data_in: Dict[str, Any] = dd.data or {}
     action: Optional[str] = dd.action
     trigger: Optional[str] = (data_in.get("trigger") or "").strip() or None
 
+    # "Load more" link on a trimmed list: the screen again, with that list from `offset` on
+    more = find_more(data_in) if action == "data_exchange" else None
+    if more and more[0] in SCREEN_BLOCKS.get(screen, []):
+        block, offset, arg = more
+        data, blocks, args = await screen_data(screen, loader, arg)
+        log.debug("%s load_more: block=%s offset=%d of %d", screen, block, offset, len(data[block]))
+        data[block] = data[block][offset:]
+        return {"version": "3.0", "screen": screen, "data": fit(data, blocks, offsets={block: offset}, args=args)}
+
     # VIEW_ORDER
     if screen == "VIEW_ORDER":
         log.debug("VIEW_ORDER: action=%s trigger=%s", action, trigger)
@@ -224,10 +198,10 @@ async def processingDecryptedData_boutique(dd: DecryptedRequestData, db: Session
         # filter by status
         if action == "data_exchange" and trigger == "apply_filter":
             filters_raw = data_in.get("filter") or "ALL"
-            opts = orders_service.orders_list_for_dropdown(db, filters_raw)
-            orders_payload = jsonable_encoder(opts)
-            print(f"filtered: {orders_payload}")
-            return {"version": "3.0", "screen": "VIEW_ORDER", "data": {"orders": orders_payload}}
+            arg = ",".join(filters_raw) if isinstance(filters_raw, list) else str(filters_raw)
+            data, blocks, args = await screen_data(screen, loader, arg)
+            log.debug("VIEW_ORDER filter=%s -> %d orders", arg, len(data["orders"]))
+            return {"version": "3.0", "screen": "VIEW_ORDER", "data": fit(data, blocks, args=args)}
 
         # view_order → navigate to details screen
         if action == "data_exchange" and trigger == "select_order":
@@ -241,7 +215,6 @@ async def processingDecryptedData_boutique(dd: DecryptedRequestData, db: Session
             try:
                 order = orders_router.get_order(order_id, db)
                 detail = _format_order_text(order)
-                print(f"detail{detail}")
                 return {
                     "version": "3.0",
                     "screen": "VIEW_ORDER_DETAILS",
@@ -258,9 +231,9 @@ async def processingDecryptedData_boutique(dd: DecryptedRequestData, db: Session
                 }
 
         # initial load
-        all_orders = orders_router.list_orders(db, status=None)
-        log.debug("VIEW_ORDER initial: %d orders", len(all_orders))
-        return {"version": "3.0", "screen": "VIEW_ORDER", "data": {"orders": _map_orders(all_orders)}}
+        data, blocks, args = await screen_data(screen, loader)
+        log.debug("VIEW_ORDER initial: %d orders", len(data["orders"]))
+        return {"version": "3.0", "screen": "VIEW_ORDER", "data": fit(data, blocks, args=args)}
 
     # VIEW_ORDER_DETAILS (direct load allowed)
     if screen == "VIEW_ORDER_DETAILS":
@@ -275,13 +248,19 @@ async def processingDecryptedData_boutique(dd: DecryptedRequestData, db: Session
         return {"version": "3.0", "screen": "VIEW_ORDER_DETAILS", "data": data_in}
 
     # MANAGE_INVENTORY
+    if screen == "MANAGE_INVENTORY" and action == "data_exchange" and trigger == "search_items":
+        query = (data_in.get("query") or "").strip()
+        data, blocks, args = await screen_data(screen, loader)
+        if query:
+            data["items"] = [{"id": v.id, "title": v.title} for v in search_variants(db, query, limit=20)]
+            data["isItemsFilterEnabled"] = True
+        log.debug("MANAGE_INVENTORY search: q=%s -> %d items", query, len(data["items"]))
+        return {"version": "3.0", "screen": "MANAGE_INVENTORY", "data": fit(data, blocks, args=args)}
+
     if screen == "MANAGE_INVENTORY":
-        categories = _map_categories(products_router.list_categories(db))
-        items = _all_variant_options_via_services(db)
-        print(f"categories{categories} \n items{items}")
-        log.debug("MANAGE_INVENTORY hydrated: %d categories, %d items", len(categories), len(items))
-        return {"version": "3.0", "screen": "MANAGE_INVENTORY", "data": {"categories": categories, "items": items,
-                "isQuantityEnabled": False, "isItemsFilterEnabled": False}}
+        data, blocks, args = await screen_data(screen, loader)
+        log.debug("MANAGE_INVENTORY hydrated: %d categories, %d items", len(data["categories"]), len(data["items"]))
+        return {"version": "3.0", "screen": "MANAGE_INVENTORY", "data": fit(data, blocks, args=args)}
 
     # Fallback
     log.debug("Fallback screen: %s", screen)
@@ -293,7 +272,7 @@ async def processingDecryptedData_boutique(dd: DecryptedRequestData, db: Session
 @router.post("/boutiqueFlow")
 async def boutique_flow_handler(
     request: RequestData,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     decrypted_data: Optional[DecryptedRequestData] = None
     try:
@@ -303,10 +282,19 @@ async def boutique_flow_handler(
             request.initial_vector,
         )
         decrypted_data = DecryptedRequestData(**decryptedDataDict)
-        print(f"decrypted_data{decrypted_data}")
+        # flow_token is "biz_boutique:<tenant>:<phone>": that tenant's data, and the same
+        # caller as the phone's webhook writes. Older tokens carry only the phone.
+        parts = (decrypted_data.flow_token or "").split(":")
+        if len(parts) == 3:
+            tenant = get_tenant(parts[1])
+            if tenant is None:
+                raise ValueError(f"Unknown tenant in flow token: {parts[1]!r}")
+            set_tenant(tenant)
+        if len(parts) >= 2:
+            set_caller(parts[-1])
         log.debug("Decrypted flow: action=%s screen=%s", decrypted_data.action, decrypted_data.screen)
 
-        response_dict = await processingDecryptedData_boutique(decrypted_data, db)
+        response_dict = await processingDecryptedData_boutique(decrypted_data, db, ScreenLoader())
         encrypted_response = encryptResponse(response_dict, aes_key, iv)
         return Response(content=encrypted_response, media_type="application/octet-stream")
 
@@ -0,0 +1,82 @@
+# app/flows_operations/services/budget.py
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core import config
+
+
+def payload_size(obj: Any) -> int:
+    """Bytes of obj as the flow response serializes it (compact UTF-8 JSON)."""
+    return len(json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8"))
+
+
+def more_keys(block: str, offset: int, remaining: int, arg: str = "") -> Dict[str, Any]:
+    """
+    Continuation of `block` as screen data: the flow shows a "Load more" link
+    while `<block>_has_more` and posts back trigger=load_more with the offset/arg.
+    """
+    return {
+        f"{block}_has_more": remaining > 0,
+        f"{block}_more_label": f"Load more… ({remaining} left)" if remaining else "",
+        f"{block}_more_offset": str(offset),
+        f"{block}_more_arg": arg,
+    }
+
+
+def find_more(data: Dict[str, Any]) -> Optional[Tuple[str, int, str]]:
+    """(block, offset, arg) of a trigger=load_more data_exchange, else None."""
+    if data.get("trigger") != "load_more":
+        return None
+    try:
+        return str(data.get("block") or ""), int(data.get("offset") or 0), str(data.get("arg") or "")
+    except (TypeError, ValueError):
+        return None
+
+
+def fit(
+    data: Dict[str, Any],
+    blocks: Sequence[str],
+    max_bytes: Optional[int] = None,
+    offsets: Optional[Dict[str, int]] = None,
+    args: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """
+    Trim the list-valued `blocks` of a flow `data` dict so the whole dict
+    serializes to at most max_bytes (FLOW_PAYLOAD_MAX_BYTES by default).
+
+    Lists must already be most-useful-first (newest orders, catalogue order):
+    each block keeps a prefix. Entries are granted round-robin across blocks
+    so one long list cannot starve the others. Every block also gets its
+    more_keys (has_more is false when nothing was cut). `offsets` is where
+    each list starts in the full result (for follow-up pages). Returns a new dict.
+    """
+    max_bytes = max_bytes or config.FLOW_PAYLOAD_MAX_BYTES
+    offsets, args = offsets or {}, args or {}
+    out = dict(data)
+    lists: Dict[str, List[Any]] = {b: list(data.get(b) or []) for b in blocks}
+    for b in blocks:
+        out[b] = []
+
+    # room for every block's continuation keys, sized for the widest values
+    for b in blocks:
+        out.update(more_keys(b, 10**6, 10**6, args.get(b, "")))
+    used = payload_size(out)
+
+    kept: Dict[str, int] = {b: 0 for b in blocks}
+    open_blocks = [b for b in blocks if lists[b]]
+    while open_blocks:
+        for b in list(open_blocks):
+            entry = lists[b][kept[b]]
+            cost = payload_size(entry) + (1 if kept[b] else 0)  # separating comma
+            if used + cost > max_bytes:
+                open_blocks.remove(b)
+                continue
+            out[b].append(entry)
+            used += cost
+            kept[b] += 1
+            if kept[b] == len(lists[b]):
+                open_blocks.remove(b)
+
+    for b in blocks:
+        out.update(more_keys(b, offsets.get(b, 0) + kept[b], len(lists[b]) - kept[b], args.get(b, "")))
+    return out
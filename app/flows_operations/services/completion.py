@@ -0,0 +1,185 @@
+# app/flows_operations/services/completion.py
+"""
+Flow completion (nfm_reply) → domain writes.
+
+The boutique flow's terminal screens post their form payloads as the
+`response_json` of an interactive nfm_reply message:
+  NEW_ORDER        -> {"new_order": {...}}
+  MANAGE_INVENTORY -> {"inventory_update": {...}}
+  VIEW_ORDER       -> {"order": {"id", "new_status", "note"}, "status_filter": ...}
+"""
+import json
+import logging
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from sqlalchemy.orm import Session
+
+from app.core import config
+from app.schemas import InventoryAdjustmentIn, InventoryOut, OrderCreate, OrderItemIn, OrderStatusUpdate
+from app.services import inventory as inventory_service
+from app.services import orders as orders_service
+from app.services.batch_writer import MicroBatchWriter
+
+log = logging.getLogger("flows.boutique")
+
+# (kind, payload): "create_order" -> OrderCreate, "adjust_inventory" -> InventoryAdjustmentIn,
+# "update_status" -> (order_id, OrderStatusUpdate)
+FlowOp = Tuple[str, Any]
+
+
+# ---------- parsing ----------
+
+
+def _blank(v: Any) -> Optional[str]:
+    if v is None:
+        return None
+    s = str(v).strip()
+    return s or None
+
+
+def _int(v: Any, default: Optional[int] = None) -> Optional[int]:
+    s = _blank(v)
+    if s is None:
+        return default
+    try:
+        return int(float(s))
+    except ValueError:
+        raise ValueError(f"Not a number: {s!r}")
+
+
+def _date(v: Any) -> Optional[date]:
+    s = _blank(v)
+    if s is None:
+        return None
+    if s.isdigit():  # older DatePicker versions send epoch millis
+        return datetime.fromtimestamp(int(s) / 1000, tz=timezone.utc).date()
+    return date.fromisoformat(s[:10])
+
+
+def flow_response(message: dict) -> Optional[Dict[str, Any]]:
+    """Decoded response_json of an nfm_reply message, or None for other interactive types."""
+    interactive = message.get("interactive") or {}
+    if interactive.get("type") != "nfm_reply":
+        return None
+    raw = (interactive.get("nfm_reply") or {}).get("response_json") or "{}"
+    try:
+        data = json.loads(raw) if isinstance(raw, str) else raw
+    except json.JSONDecodeError:
+        log.warning("nfm_reply with invalid response_json: %.200s", raw)
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def parse_operations(resp: Dict[str, Any]) -> List[FlowOp]:
+    ops: List[FlowOp] = []
+
+    new_order = resp.get("new_order")
+    if isinstance(new_order, dict):
+        cust = new_order.get("customer") or {}
+        item = None
+        if _blank(new_order.get("item_variant")):
+            item = OrderItemIn(
+                category=_blank(new_order.get("category")) or "",
+                item_variant=_blank(new_order.get("item_variant")),
+                size=_blank(new_order.get("size")),
+                color=_blank(new_order.get("color")),
+                quantity=_int(new_order.get("quantity"), 1),
+                unit_price=_int(new_order.get("unit_price")),
+            )
+        ops.append(("create_order", OrderCreate(
+            customer_name=_blank(cust.get("name")) or "",
+            customer_phone=_blank(cust.get("phone")) or "",
+            customer_email=_blank(cust.get("email")),
+            customer_address=_blank(cust.get("address")),
+            fulfillment_date=_date(new_order.get("fulfillment_date")),
+            note=_blank(new_order.get("notes")),
+            items=[item] if item else [],
+        )))
+
+    inv = resp.get("inventory_update")
+    if isinstance(inv, dict):
+        ops.append(("adjust_inventory", InventoryAdjustmentIn(
+            category=_blank(inv.get("category")) or "",
+            sku=_blank(inv.get("item_variant") or inv.get("sku")),
+            action=_blank(inv.get("action")) or "",
+            qty=_int(inv.get("qty"), 0),
+            notes=_blank(inv.get("notes")),
+        )))
+
+    upd = resp.get("order")
+    if isinstance(upd, dict) and _blank(upd.get("id")) and _blank(upd.get("new_status")):
+        statuses = orders_service.normalize_statuses(upd.get("new_status")) or []
+        if not statuses:
+            raise ValueError(f"Unknown status {upd.get('new_status')!r}")
+        ops.append(("update_status", (_blank(upd.get("id")), OrderStatusUpdate(status=statuses[0], note=_blank(upd.get("note"))))))
+
+    return ops
+
+
+# ---------- batched apply ----------
+
+
+def _apply_one(db: Session, op: FlowOp) -> Any:
+    kind, payload = op
+    if kind == "create_order":
+        return orders_service.create_order(db, payload, commit=False)
+    if kind == "update_status":
+        order_id, upd = payload
+        return orders_service.update_order_status(db, order_id, upd, commit=False)
+    if kind == "adjust_inventory":
+        return inventory_service.apply_adjustments(db, [payload], commit=False)[0]
+    raise ValueError(f"Unknown flow operation {kind!r}")
+
+
+def apply_flow_batch(db: Session, ops: List[FlowOp]) -> List[Union[Any, Exception]]:
+    """
+    Apply a batch of flow operations in one transaction. Inventory
+    adjustments go through a single bulk apply; each op is isolated in a
+    savepoint so one bad submission does not sink the rest of the batch.
+    """
+    results: List[Union[Any, Exception]] = [None] * len(ops)
+    inv_idx = [i for i, (kind, _) in enumerate(ops) if kind == "adjust_inventory"]
+    pending = [i for i, (kind, _) in enumerate(ops) if kind != "adjust_inventory"]
+
+    if inv_idx:
+        try:
+            with db.begin_nested():
+                outs = inventory_service.apply_adjustments(db, [ops[i][1] for i in inv_idx], commit=False)
+            for i, out in zip(inv_idx, outs):
+                results[i] = out
+        except ValueError:
+            pending = sorted(pending + inv_idx)  # retry one by one to isolate the bad one(s)
+
+    for i in pending:
+        try:
+            with db.begin_nested():
+                results[i] = _apply_one(db, ops[i])
+        except Exception as e:
+            log.warning("Flow op %s failed: %s", ops[i][0], e)
+            results[i] = e
+
+    db.commit()
+    levels = {r.sku: r.quantity for r in results if isinstance(r, InventoryOut)}
+    if levels:
+        inventory_service.stock_changed(db, levels)
+    return results
+
+
+flow_writer: MicroBatchWriter[FlowOp] = MicroBatchWriter(
+    "flow_completion",
+    apply_flow_batch,
+    max_batch=config.FLOW_BATCH_MAX_SIZE,
+    max_wait_ms=config.FLOW_BATCH_MAX_WAIT_MS,
+)
+
+
+def describe_result(op: FlowOp, res: Any) -> str:
+    kind, _ = op
+    if isinstance(res, Exception):
+        return f"❌ {kind.replace('_', ' ')} failed: {res}"
+    if kind == "create_order":
+        return f"✅ Order {res.id} created ({len(res.items)} item(s))"
+    if kind == "update_status":
+        return f"✅ Order {res.id} → {getattr(res.status, 'value', res.status)}"
+    return f"✅ Stock for {res.sku} is now {res.quantity}"
@@ -1,5 +1,8 @@
-from sqlalchemy.orm import Session
-from app.core import config
+import asyncio
+import logging
+from typing import Optional
+
+from app.core.tenants import current_tenant
 from app.flows_operations.schema import (
     FlowMessage,
     Interactive,
@@ -8,18 +11,28 @@ from app.flows_operations.schema import (
     InteractiveActionParametersFlowActionPayload,
     InteractiveBody,
 )
-from app.routers import products as products_router
-from app.routers import orders as orders_router
+from app.flows_operations.services.budget import fit
+from app.flows_operations.services.loader import ScreenLoader
+from app.flows_operations.services.screens import screen_data
+
+log = logging.getLogger("flows.boutique")
 
 
-def seller_flow(to_number: str, db: Session) -> FlowMessage:
+async def seller_flow(to_number: str, loader: Optional[ScreenLoader] = None) -> FlowMessage:
     """
-    Build the interactive flow message
+    Build the interactive flow message. CHOOSE_NAV carries the data of the
+    screens it navigates to; their category/variant/order lists are trimmed
+    to FLOW_PAYLOAD_MAX_BYTES, with "Load more" continuations.
     """
-    categories = products_router.categories(db)
-    variants = products_router.all_variants(db)
-    orders = orders_router.list_all_orders(db)
-    print(f"categories{categories} variants{variants} orders{orders}")
+    loader = loader or ScreenLoader()
+    (orders, _, order_args), (inventory, _, _) = await asyncio.gather(
+        screen_data("VIEW_ORDER", loader), screen_data("MANAGE_INVENTORY", loader)
+    )
+    data = {**orders, **inventory, "isApplyFilterEnabled": False, "isUpdateChipEnabled": False}
+    tenant = current_tenant()
+    log.debug(
+        "Seller flow data: %d categories, %d items, %d orders", len(data["categories"]), len(data["items"]), len(data["orders"])
+    )
     return FlowMessage(
         to=to_number,
         interactive=Interactive(
@@ -27,21 +40,13 @@ def seller_flow(to_number: str, db: Session) -> FlowMessage:
             action=InteractiveAction(
                 parameters=InteractiveActionFlowParameters(
                     flow_message_version="3",
-                    flow_token="biz_boutique",
+                    flow_token=f"biz_boutique:{tenant.id}:{to_number}",
                     flow_cta="Start",
-                    flow_id=config.FLOW_ID,
+                    flow_id=tenant.flow_id,
                     flow_action_payload=InteractiveActionParametersFlowActionPayload(
                         screen="CHOOSE_NAV",
-                        data={
-                            "categories": categories,
-                            "items": variants,
-                            "orders": orders,
-                            "isApplyFilterEnabled": False,
-                            "isUpdateChipEnabled": False,
-                            "isItemsFilterEnabled": False,
-                            "isQuantityEnabled": False
-                        }
-                        ),
+                        data=fit(data, ["orders", "items", "categories"], args=order_args),
+                    ),
                 )
             ),
         ),
@@ -0,0 +1,40 @@
+# app/flows_operations/services/loader.py
+import asyncio
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from app.core.database import SessionLocal
+
+Query = Callable[..., Any]  # query(db, *args) -> plain data (must not need the session afterwards)
+
+
+def _run(query: Query, args: Tuple[Any, ...]) -> Any:
+    with SessionLocal(read_only=True) as db:
+        return query(db, *args)
+
+
+class ScreenLoader:
+    """
+    Request-scoped loader for flow screens.
+
+    Each distinct (query, args) runs once per loader, in a worker thread on
+    its own read-only session/connection, so independent lookups overlap and
+    a screen costs its slowest query rather than the sum. Identical lookups
+    from different parts of the same request share one result.
+    """
+
+    def __init__(self) -> None:
+        self._pending: Dict[Tuple[Hashable, ...], asyncio.Future] = {}
+
+    def load(self, query: Query, *args: Hashable) -> "asyncio.Future[Any]":
+        key = (query, *args)
+        fut = self._pending.get(key)
+        if fut is None:
+            fut = self._pending[key] = asyncio.ensure_future(asyncio.to_thread(_run, query, args))
+        return fut
+
+    async def gather(self, **queries: Tuple[Query, ...]) -> Dict[str, Any]:
+        """gather(name=(query, *args), ...) -> {name: result}, all issued concurrently."""
+        names = list(queries)
+        results = await asyncio.gather(*(self.load(q[0], *q[1:]) for q in queries.values()))
+        return dict(zip(names, results))
+
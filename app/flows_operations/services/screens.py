@@ -0,0 +1,59 @@
+# app/flows_operations/services/screens.py
+from typing import Any, Dict, List, Sequence, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+from app.flows_operations.services.loader import ScreenLoader
+from app.routers import products as products_router
+from app.services.orders import orders_list_for_dropdown
+from app.services.products import list_variant_rows
+
+# budgeted list blocks shown on each screen
+SCREEN_BLOCKS: Dict[str, List[str]] = {
+    "VIEW_ORDER": ["orders"],
+    "MANAGE_INVENTORY": ["categories", "items"],
+}
+
+ScreenData = Tuple[Dict[str, Any], List[str], Dict[str, str]]  # (data, blocks, args)
+
+
+def variant_options(categories: List[Dict[str, str]], rows: Sequence[Tuple[str, str, str]]) -> List[Dict[str, str]]:
+    """Variant options grouped in category order, from one (sku, title, category_id) query."""
+    by_cat: Dict[str, List[Dict[str, str]]] = {}
+    for sku, title, category_id in rows:
+        if sku and title:
+            by_cat.setdefault(category_id, []).append({"id": sku, "title": title})
+    items: List[Dict[str, str]] = []
+    for c in categories:
+        items.extend(by_cat.get(c["id"], []))
+    return items
+
+
+async def order_options(loader: ScreenLoader, status_arg: str = "") -> List[Dict[str, Any]]:
+    """Order dropdown options, newest first; status_arg is the comma-joined status filter ("" = all)."""
+    statuses = tuple(status_arg.split(",")) if status_arg else None
+    return jsonable_encoder(await loader.load(orders_list_for_dropdown, statuses))
+
+
+async def screen_data(screen: str, loader: ScreenLoader, arg: str = "") -> ScreenData:
+    """
+    Full (untrimmed) data of a screen with budgeted lists, plus which keys are
+    budgeted and their continuation args. First pages and load-more pages are
+    both cut from this, so offsets always index the same list.
+    """
+    if screen == "VIEW_ORDER":
+        return {"orders": await order_options(loader, arg)}, SCREEN_BLOCKS[screen], {"orders": arg}
+    if screen == "MANAGE_INVENTORY":
+        data = await loader.gather(categories=(products_router.categories,), variants=(list_variant_rows,))
+        categories = data["categories"]
+        return (
+            {
+                "categories": categories,
+                "items": variant_options(categories, data["variants"]),
+                "isQuantityEnabled": False,
+                "isItemsFilterEnabled": False,
+            },
+            SCREEN_BLOCKS[screen],
+            {},
+        )
+    raise ValueError(f"Screen {screen!r} has no budgeted lists")
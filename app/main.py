@@ -1,10 +1,39 @@
 # app/main.py
-import logging
-from fastapi import FastAPI
-from app.core.logconfig import configure_logging
-from app.routers import orders, inventory, products, webhook
-from app.flows_operations.routers import test_flow
-from app.core.database import init_db, check_db_connection
+import math
+import time
+
+_IMPORT_T0 = time.perf_counter()
+
+import logging  # noqa: E402
+from typing import Optional, Tuple  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from app.core import config  # noqa: E402
+from app.core import background  # noqa: E402
+from app.core.logconfig import configure_logging  # noqa: E402
+from app.core.signature import read_write_time, sign_write_time, signature_required  # noqa: E402
+from app.core.tenants import Tenant, api_keys_required, default_tenant, reset_tenant, set_tenant, tenant_for_api_key  # noqa: E402
+from app.routers import campaigns, diagnostics, messages, orders, inventory, products, reports, webhook  # noqa: E402
+from app.flows_operations.routers import test_flow  # noqa: E402
+from app.core.database import (  # noqa: E402
+    SessionLocal, WriteMark, init_db, check_db_connection, reset_caller, reset_write_mark, schema_is_current, set_caller, set_write_mark,
+)
+from app.flows_operations.services.completion import flow_writer  # noqa: E402
+from app.services.archive import archive_orders  # noqa: E402
+from app.services.campaigns import campaign_runner  # noqa: E402
+from app.services.catalog_sync import purge_changes  # noqa: E402
+from app.services.holds import sweep_expired  # noqa: E402
+from app.services.idempotency import purge_expired  # noqa: E402
+from app.services.images import shutdown_pool  # noqa: E402
+from app.services.inventory import compact_inventory  # noqa: E402
+from app.services.low_stock import send_digest  # noqa: E402
+from app.services.message import drain_bursts  # noqa: E402
+from app.services.message_status import status_writer  # noqa: E402
+from app.services.orders import backfill_order_totals  # noqa: E402
+from app.services.reports import ensure_daily_sales  # noqa: E402
+from app.utils.timing import PhaseTimer  # noqa: E402
+
+_IMPORT_MS = (time.perf_counter() - _IMPORT_T0) * 1000
 
 # Basic logging config
 configure_logging()
@@ -12,16 +41,128 @@ configure_logging()
 
 app = FastAPI(title="Boutique Flow Backend", version="1.0.0")
 
+
+
+# Authenticated by their own means (Meta signature, flow encryption + token) or
+# public by design (content-addressed image renditions fetched by WhatsApp).
+_PUBLIC_PATHS = ("/webhook", "/flows/", "/products/images/", "/docs", "/redoc", "/openapi.json")
+_WRITE_COOKIE = "last_write"
+
+
+def _request_tenant(request: Request) -> Tuple[Optional[Tenant], int, str]:
+    """Tenant bound to the request's X-Api-Key; X-Tenant-Id, when sent, must name that tenant."""
+    if request.url.path.startswith(_PUBLIC_PATHS):
+        return default_tenant(), 200, ""  # webhook/flow handlers switch to the payload's tenant
+    api_key = request.headers.get("x-api-key")
+    if api_key:
+        tenant = tenant_for_api_key(api_key)
+        if tenant is None:
+            return None, 401, "Invalid API key"
+    elif api_keys_required():
+        return None, 401, "Missing X-Api-Key"
+    else:
+        tenant = default_tenant()
+    tenant_id = request.headers.get("x-tenant-id")
+    if tenant_id and tenant_id != tenant.id:
+        return None, 403, f"API key does not belong to tenant {tenant_id!r}"
+    return tenant, 200, ""
+
+
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    """
+    Tenant (from the API key, see _request_tenant) and caller identity for
+    read-your-writes replica pinning (see core.database). The webhook and flow
+    endpoints refine both from their payloads.
+
+    A request that wrote gets a signed last-write cookie; sent back (or echoed
+    as X-Last-Write) it pins the caller's reads to the primary in any worker
+    sharing REPLICA_PIN_SECRET.
+    """
+    tenant, status, detail = _request_tenant(request)
+    if tenant is None:
+        return JSONResponse(status_code=status, content={"detail": detail})
+    caller = request.headers.get("x-caller-id") or (request.client.host if request.client else None)
+    carried = read_write_time(caller, request.cookies.get(_WRITE_COOKIE) or request.headers.get("x-last-write"))
+    mark = WriteMark(caller, carried)
+    tenant_token, caller_token, mark_token = set_tenant(tenant), set_caller(caller), set_write_mark(mark)
+    try:
+        response = await call_next(request)
+    finally:
+        reset_write_mark(mark_token)
+        reset_caller(caller_token)
+        reset_tenant(tenant_token)
+    if caller and mark.at is not None and mark.at != carried:
+        # wrote: carry the pin to whichever process serves this caller next
+        response.set_cookie(
+            _WRITE_COOKIE, sign_write_time(caller, mark.at), max_age=max(1, math.ceil(config.REPLICA_PIN_S)), httponly=True, samesite="lax"
+        )
+    return response
+
+
 # Routers
 app.include_router(test_flow.router, prefix="/flows", tags=["flows"])
 app.include_router(orders.router, prefix="/orders", tags=["orders"])
 app.include_router(inventory.router, prefix="/inventory", tags=["inventory"])
 app.include_router(products.router, prefix="/products", tags=["products"])
+app.include_router(reports.router, prefix="/reports", tags=["reports"])
+app.include_router(campaigns.router, prefix="/campaigns", tags=["campaigns"])
+app.include_router(messages.router, prefix="/messages", tags=["messages"])
+app.include_router(diagnostics.router, prefix="/diagnostics", tags=["diagnostics"])
 app.include_router(webhook.router, prefix="", tags=["webhook"])
 
 
 @app.on_event("startup")
 def on_startup():
-    check_db_connection()
-    init_db()
-    logging.getLogger("app.main").info("Startup complete.")
+    log = logging.getLogger("app.main")
+    timer = PhaseTimer()
+    timer.record("imports", _IMPORT_MS)
+
+    fast = False
+    if config.FAST_START:
+        # one query: proves connectivity and compares the stored schema fingerprint
+        with timer.phase("fingerprint_check"):
+            fast = schema_is_current()
+
+    if not fast:
+        with timer.phase("db_check"):
+            check_db_connection()
+        with timer.phase("init_db"):
+            added = init_db()
+        if {"orders.total_amount", "orders.item_count"} & set(added):
+            with timer.phase("backfill_order_totals"), SessionLocal() as db:
+                log.info("Backfilled totals on %d orders", backfill_order_totals(db))
+
+    with timer.phase("daily_sales_check"), SessionLocal() as db:
+        rows = ensure_daily_sales(db)
+    if rows:
+        log.info("Built daily_sales rollup from existing orders (%d rows)", rows)
+
+    log.info("Startup timing | mode=%s %s", "fast" if fast else "full", timer.summary())
+    if not signature_required():
+        log.warning("APP_SECRET is not set and ALLOW_UNSIGNED_WEBHOOKS=true: webhook signatures are NOT verified")
+    elif not config.APP_SECRET:
+        log.error("APP_SECRET is not set: every webhook POST will be rejected")
+    log.info("Startup complete.")
+
+
+@app.on_event("startup")
+async def start_background_jobs():
+    background.start_periodic("inventory_compaction", config.INVENTORY_COMPACTION_INTERVAL_S, compact_inventory)
+    background.start_periodic("order_archive", config.ORDER_ARCHIVE_INTERVAL_S, archive_orders)
+    background.start_periodic("idempotency_purge", config.IDEMPOTENCY_PURGE_INTERVAL_S, purge_expired)
+    background.start_periodic("catalog_changes_purge", config.CATALOG_CHANGES_PURGE_INTERVAL_S, purge_changes)
+    background.start_periodic("stock_hold_sweep", config.STOCK_HOLD_SWEEP_INTERVAL_S, sweep_expired)
+    background.start_periodic_async("low_stock_digest", config.LOW_STOCK_DIGEST_INTERVAL_S, send_digest)
+    background.start_periodic_async("campaign_resume", config.CAMPAIGN_LEASE_S, campaign_runner.resume_tenant)
+    await campaign_runner.resume_running()
+
+
+@app.on_event("shutdown")
+async def stop_background_jobs():
+    await campaign_runner.stop()
+    await drain_bursts()
+    await flow_writer.close()
+    await status_writer.close()
+    shutdown_pool()
+    await background.stop_all()
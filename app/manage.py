@@ -0,0 +1,104 @@
+# app/manage.py
+"""
+Maintenance commands:
+
+  python -m app.manage backfill-order-totals [--tenant ID]
+  python -m app.manage rebuild-daily-sales [--tenant ID]
+  python -m app.manage archive-orders [--tenant ID] [--days N]
+  python -m app.manage provision-tenants [--tenant ID]
+"""
+import argparse
+import logging
+from datetime import datetime, timedelta
+from typing import List
+
+from app.core import config
+from app.core.database import SessionLocal, init_db, provision_tenant
+from app.core.logconfig import configure_logging
+from app.core.tenants import DEFAULT_TENANT_ID, Tenant, all_tenants, get_tenant, use_tenant
+from app.services.archive import archive_orders
+from app.services.orders import backfill_order_totals
+from app.services.reports import ensure_daily_sales, rebuild_daily_sales
+
+log = logging.getLogger("app.main")
+
+
+def _tenants(args: argparse.Namespace) -> List[Tenant]:
+    if not args.tenant:
+        return all_tenants()
+    tenant = get_tenant(args.tenant)
+    if tenant is None:
+        raise SystemExit(f"Unknown tenant {args.tenant!r}")
+    return [tenant]
+
+
+def _backfill_order_totals(args: argparse.Namespace) -> None:
+    init_db()  # adds the columns on older databases
+    for tenant in _tenants(args):
+        with use_tenant(tenant), SessionLocal() as db:
+            n = backfill_order_totals(db, chunk=args.chunk)
+        log.info("Backfilled order totals | tenant=%s orders=%d", tenant.id, n)
+        print(f"{tenant.id}: {n} orders")
+
+
+def _rebuild_daily_sales(args: argparse.Namespace) -> None:
+    init_db()
+    for tenant in _tenants(args):
+        with use_tenant(tenant), SessionLocal() as db:
+            n = rebuild_daily_sales(db)
+        log.info("Rebuilt daily sales | tenant=%s rows=%d", tenant.id, n)
+        print(f"{tenant.id}: {n} daily_sales rows")
+
+
+def _archive_orders(args: argparse.Namespace) -> None:
+    init_db()
+    cutoff = datetime.utcnow() - timedelta(days=args.days)
+    for tenant in _tenants(args):
+        with use_tenant(tenant), SessionLocal() as db:
+            n = archive_orders(db, cutoff=cutoff)
+        print(f"{tenant.id}: {n} orders archived")
+
+
+def _provision_tenants(args: argparse.Namespace) -> None:
+    for tenant in _tenants(args):
+        if tenant.id == DEFAULT_TENANT_ID:
+            added = init_db()  # same as startup
+        elif tenant.database_url or tenant.schema:
+            added = provision_tenant(tenant)
+        else:
+            print(f"{tenant.id}: uses the default database")
+            continue
+        with use_tenant(tenant), SessionLocal() as db:
+            rollup = ensure_daily_sales(db)  # a fresh daily_sales next to existing orders
+        print(f"{tenant.id}: provisioned ({len(added)} columns added, {rollup} daily_sales rows built)")
+
+
+def main() -> None:
+    configure_logging()
+    parser = argparse.ArgumentParser(prog="python -m app.manage")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("backfill-order-totals", help="recompute orders.total_amount / item_count from order_items")
+    p.add_argument("--tenant", help="only this tenant id (default: all)")
+    p.add_argument("--chunk", type=int, default=1000, help="orders per transaction")
+    p.set_defaults(func=_backfill_order_totals)
+
+    p = sub.add_parser("rebuild-daily-sales", help="recompute the daily_sales rollup from live and archived orders")
+    p.add_argument("--tenant", help="only this tenant id (default: all)")
+    p.set_defaults(func=_rebuild_daily_sales)
+
+    p = sub.add_parser("archive-orders", help="move old Delivered/Cancelled orders to orders_archive now")
+    p.add_argument("--tenant", help="only this tenant id (default: all)")
+    p.add_argument("--days", type=int, default=config.ORDER_ARCHIVE_AFTER_DAYS, help="archive orders older than this")
+    p.set_defaults(func=_archive_orders)
+
+    p = sub.add_parser("provision-tenants", help="create tenant schemas/tables (run before routing traffic to a new tenant)")
+    p.add_argument("--tenant", help="only this tenant id (default: all)")
+    p.set_defaults(func=_provision_tenants)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@ import enum
 import uuid
 from datetime import datetime
 from sqlalchemy import (
-    Column, String, Integer, DateTime, Date, Enum, ForeignKey, Text, UniqueConstraint
+    Boolean, Column, String, Integer, DateTime, Date, Enum, ForeignKey, Index, Text, UniqueConstraint
 )
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -17,6 +17,12 @@ class OrderStatus(str, enum.Enum):
     Cancelled = "Cancelled"
 
 
+class CampaignStatus(str, enum.Enum):
+    Running = "Running"
+    Paused = "Paused"
+    Completed = "Completed"
+
+
 class ProductCategory(Base):
     __tablename__ = "product_categories"
     id = Column(String, primary_key=True)          # e.g., "skirt"
@@ -46,11 +52,87 @@ class Inventory(Base):
     variant = relationship("ProductVariant", back_populates="inventory")
 
 
+class CatalogChange(Base):
+    """
+    Append-only log of SKUs whose variant row or stock level changed; the
+    in-memory catalog indexes of every process replay it to stay current.
+    Purged after CATALOG_CHANGES_RETAIN_S.
+    """
+    __tablename__ = "catalog_changes"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    sku = Column(String, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
+class InventoryMovement(Base):
+    """Append-only stock ledger. Inventory.quantity is the materialized current level."""
+    __tablename__ = "inventory_movements"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    sku = Column(ForeignKey("product_variants.sku"), nullable=False)
+    delta = Column(Integer, nullable=False)
+    action = Column(String, nullable=False)        # add | remove | set | opening | hold | release
+    notes = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    __table_args__ = (
+        Index("ix_inventory_movements_sku_created_at", "sku", "created_at"),
+    )
+
+
+class ReorderThreshold(Base):
+    """
+    Reorder point for one SKU (kind="sku") or every SKU of a category
+    (kind="category"); a SKU's own row wins over its category's.
+    """
+    __tablename__ = "reorder_thresholds"
+    kind = Column(String, primary_key=True)   # sku | category
+    ref = Column(String, primary_key=True)    # sku or category id
+    threshold = Column(Integer, nullable=False)
+
+
+class LowStockAlert(Base):
+    """SKUs currently at or below their reorder point that the owner was told about (cleared on recovery)."""
+    __tablename__ = "low_stock_alerts"
+    sku = Column(ForeignKey("product_variants.sku"), primary_key=True)
+    level = Column(Integer, nullable=False)
+    threshold = Column(Integer, nullable=False)
+    alerted_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class LowStockPending(Base):
+    """SKUs whose stock changed since the last low-stock digest, with their latest level (drained by the digest)."""
+    __tablename__ = "low_stock_pending"
+    sku = Column(String, primary_key=True)
+    level = Column(Integer, nullable=False)
+    noted_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class InventorySnapshot(Base):
+    """Compacted stock level of a SKU: sum of all its movements with created_at <= as_of."""
+    __tablename__ = "inventory_snapshots"
+    sku = Column(ForeignKey("product_variants.sku"), primary_key=True)
+    as_of = Column(DateTime, primary_key=True)
+    quantity = Column(Integer, nullable=False)
+
+
+class VariantImage(Base):
+    """
+    Current photo of a variant. The source and its renditions are files under
+    MEDIA_DIR addressed by source_sha256, so re-uploading the same photo
+    reuses what was already rendered.
+    """
+    __tablename__ = "variant_images"
+    sku = Column(ForeignKey("product_variants.sku"), primary_key=True)
+    source_sha256 = Column(String(64), nullable=False, index=True)
+    width = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class Order(Base):
     __tablename__ = "orders"
     id = Column(String, primary_key=True, default=lambda: f"BTQ-{uuid.uuid4().hex[:8].upper()}")
     customer_name = Column(String, nullable=False)
-    customer_phone = Column(String, nullable=False)
+    customer_phone = Column(String, nullable=False, index=True)
     customer_email = Column(String, nullable=True)
     customer_address = Column(Text, nullable=True)
 
@@ -60,7 +142,15 @@ class Order(Base):
 
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
+    # denormalized from order_items, kept in step by the services that write lines
+    total_amount = Column(Integer, nullable=False, default=0, server_default="0")  # Σ quantity × unit_price
+    item_count = Column(Integer, nullable=False, default=0, server_default="0")    # Σ quantity
+
     items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
+    __table_args__ = (
+        Index("ix_orders_status_created_at", "status", "created_at"),   # status filter + newest-first
+        Index("ix_orders_created_at_id", "created_at", "id"),           # unfiltered newest-first listing
+    )
 
 
 class OrderItem(Base):
@@ -73,7 +163,7 @@ class OrderItem(Base):
     category_id = Column(ForeignKey("product_categories.id"), nullable=False)
     category = relationship("ProductCategory")
 
-    sku = Column(ForeignKey("product_variants.sku"), nullable=False)
+    sku = Column(ForeignKey("product_variants.sku"), index=True, nullable=False)
     variant = relationship("ProductVariant")
 
     size = Column(String, nullable=True)
@@ -83,3 +173,158 @@ class OrderItem(Base):
     __table_args__ = (
         UniqueConstraint("order_id", "sku", name="uq_order_sku"),
     )
+
+
+class HoldStatus(str, enum.Enum):
+    Held = "held"            # units taken out of Inventory.quantity, awaiting confirmation
+    Converted = "converted"  # order confirmed: the units are sold
+    Released = "released"    # expired or cancelled: units returned to stock
+
+
+class StockHold(Base):
+    """Units of one SKU reserved for one order, from creation until confirmation (or expiry)."""
+    __tablename__ = "stock_holds"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    order_id = Column(ForeignKey("orders.id"), index=True, nullable=False)
+    sku = Column(ForeignKey("product_variants.sku"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    status = Column(Enum(HoldStatus), nullable=False, default=HoldStatus.Held)
+    expires_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    __table_args__ = (
+        Index("ix_stock_holds_status_expires_at", "status", "expires_at"),  # sweeper scan
+    )
+
+
+class OrderArchive(Base):
+    """
+    Cold tier of `orders`: Delivered/Cancelled orders past ORDER_ARCHIVE_AFTER_DAYS
+    are moved here by the archiver so everyday queries only scan live orders.
+    Same columns as Order, plus when the row was archived.
+    """
+    __tablename__ = "orders_archive"
+    id = Column(String, primary_key=True)
+    customer_name = Column(String, nullable=False)
+    customer_phone = Column(String, nullable=False, index=True)
+    customer_email = Column(String, nullable=True)
+    customer_address = Column(Text, nullable=True)
+
+    fulfillment_date = Column(Date, nullable=True)
+    status = Column(Enum(OrderStatus), nullable=False)
+    note = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, nullable=False)
+    total_amount = Column(Integer, nullable=False, default=0, server_default="0")
+    item_count = Column(Integer, nullable=False, default=0, server_default="0")
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    items = relationship("OrderItemArchive", back_populates="order", cascade="all, delete-orphan")
+
+
+class OrderItemArchive(Base):
+    __tablename__ = "order_items_archive"
+    id = Column(Integer, primary_key=True)  # keeps the id it had in order_items
+
+    order_id = Column(ForeignKey("orders_archive.id"), index=True, nullable=False)
+    order = relationship("OrderArchive", back_populates="items")
+
+    category_id = Column(ForeignKey("product_categories.id"), nullable=False)
+    sku = Column(ForeignKey("product_variants.sku"), index=True, nullable=False)
+    variant = relationship("ProductVariant")
+
+    size = Column(String, nullable=True)
+    color = Column(String, nullable=True)
+    quantity = Column(Integer, default=1, nullable=False)
+    unit_price = Column(Integer, nullable=True)
+
+
+class DailySales(Base):
+    """
+    Per-day, per-SKU sales rollup keyed by order creation day (UTC).
+    units/revenue cover booked (non-cancelled) orders; delivered_* is the
+    delivered subset; cancelled_* what was booked and then cancelled.
+    """
+    __tablename__ = "daily_sales"
+    day = Column(Date, primary_key=True)
+    sku = Column(ForeignKey("product_variants.sku"), primary_key=True)
+    lines = Column(Integer, nullable=False, default=0)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Integer, nullable=False, default=0)
+    cancelled_units = Column(Integer, nullable=False, default=0)
+    cancelled_revenue = Column(Integer, nullable=False, default=0)
+    delivered_units = Column(Integer, nullable=False, default=0)
+    delivered_revenue = Column(Integer, nullable=False, default=0)
+
+
+class Campaign(Base):
+    """
+    Broadcast to every distinct orders.customer_phone. Recipients are walked
+    in phone order; `cursor` is the last phone of the last committed chunk,
+    so a restarted sender resumes after it. Only the worker holding the lease
+    (`owner` until `lease_until`, renewed at each checkpoint) sends.
+    """
+    __tablename__ = "campaigns"
+    id = Column(String, primary_key=True, default=lambda: f"CMP-{uuid.uuid4().hex[:8].upper()}")
+    name = Column(String, nullable=False)
+    message = Column(Text, nullable=False)
+    status = Column(Enum(CampaignStatus), nullable=False, default=CampaignStatus.Running)
+    cursor = Column(String, nullable=True)
+    sent_count = Column(Integer, nullable=False, default=0)
+    failed_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
+    owner = Column(String, nullable=True)
+    lease_until = Column(DateTime, nullable=True)
+
+
+class CampaignRecipient(Base):
+    __tablename__ = "campaign_recipients"
+    campaign_id = Column(ForeignKey("campaigns.id"), primary_key=True)
+    phone = Column(String, primary_key=True)
+    ok = Column(Boolean, nullable=False)
+    error = Column(Text, nullable=True)
+    sent_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class MessageStatus(Base):
+    """
+    Delivery/read callbacks for outbound messages (webhook `value.statuses`).
+    One row per (message, status): Meta retries are absorbed on insert.
+    """
+    __tablename__ = "message_status"
+    message_id = Column(String, primary_key=True)   # wamid of our outbound message
+    status = Column(String, primary_key=True)       # sent | delivered | read | failed
+    recipient_id = Column(String, nullable=True)
+    timestamp = Column(DateTime, nullable=False)
+    conversation_id = Column(String, nullable=True)
+    pricing_category = Column(String, nullable=True)
+    error_code = Column(Integer, nullable=True)
+    error_title = Column(String, nullable=True)
+    received_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class SchemaState(Base):
+    """Fingerprint of the declared schema, written by a full init_db (see FAST_START)."""
+    __tablename__ = "schema_state"
+    key = Column(String, primary_key=True)
+    fingerprint = Column(String, nullable=False)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class IdempotencyKey(Base):
+    """
+    One row per Idempotency-Key seen on a mutating endpoint: the request's
+    hash while it runs ("pending"), then the response to replay ("done").
+    Rows are ignored after expires_at and purged periodically.
+    """
+    __tablename__ = "idempotency_keys"
+    scope = Column(String, primary_key=True)                 # e.g. "POST /orders"
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    state = Column(String, nullable=False, default="pending")  # pending | done
+    response_status = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)               # JSON
+    owner_token = Column(String, nullable=True)               # claim that may finish a pending key
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
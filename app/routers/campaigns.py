@@ -0,0 +1,56 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+import logging
+
+from app.core.database import get_db, get_read_db
+from app.models import CampaignStatus
+from app.schemas import CampaignCreate, CampaignOut
+from app.services import campaigns as campaigns_service
+from app.services.campaigns import campaign_runner
+
+router = APIRouter()
+log = logging.getLogger("routers.campaigns")
+
+
+@router.post("", response_model=CampaignOut, status_code=202)
+async def create_campaign(payload: CampaignCreate, db: Session = Depends(get_db)):
+    log.debug("POST /campaigns | name=%s", payload.name)
+    # async for campaign_runner.start (needs the loop); the DB work runs in the threadpool
+    camp = await run_in_threadpool(campaigns_service.create_campaign, db, payload)
+    campaign_runner.start(camp.id)
+    log.info("Campaign %s started", camp.id)
+    return camp
+
+
+@router.get("/{campaign_id}", response_model=CampaignOut)
+def get_campaign(campaign_id: str, db: Session = Depends(get_read_db)):
+    log.debug("GET /campaigns/%s", campaign_id)
+    try:
+        return campaigns_service.get_campaign(db, campaign_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.post("/{campaign_id}/pause", response_model=CampaignOut)
+def pause_campaign(campaign_id: str, db: Session = Depends(get_db)):
+    """The sender stops after the chunk in flight is checkpointed."""
+    log.debug("POST /campaigns/%s/pause", campaign_id)
+    try:
+        camp = campaigns_service.set_campaign_status(db, campaign_id, CampaignStatus.Paused)
+    except ValueError as e:
+        raise HTTPException(status_code=409 if "completed" in str(e) else 404, detail=str(e))
+    log.info("Campaign %s paused at cursor=%s", campaign_id, camp.cursor)
+    return camp
+
+
+@router.post("/{campaign_id}/resume", response_model=CampaignOut)
+async def resume_campaign(campaign_id: str, db: Session = Depends(get_db)):
+    log.debug("POST /campaigns/%s/resume", campaign_id)
+    try:
+        camp = await run_in_threadpool(campaigns_service.set_campaign_status, db, campaign_id, CampaignStatus.Running)
+    except ValueError as e:
+        raise HTTPException(status_code=409 if "completed" in str(e) else 404, detail=str(e))
+    campaign_runner.start(campaign_id)
+    log.info("Campaign %s resumed from cursor=%s", campaign_id, camp.cursor)
+    return camp
@@ -0,0 +1,28 @@
+from fastapi import APIRouter
+import logging
+
+from app.core.database import engine_pools
+from app.core.dbpool import pool_status
+from app.services.wa import graph_breaker
+
+router = APIRouter()
+log = logging.getLogger("routers.diagnostics")
+
+
+@router.get("/graph")
+def graph_client():
+    """The calling tenant's Graph API circuit breaker: state and shed/reject counters."""
+    snap = graph_breaker.snapshot()
+    log.debug("GET /diagnostics/graph | state=%s", snap["state"])
+    return snap
+
+
+@router.get("/db-pool")
+def db_pool():
+    """
+    Per pool (primary, each replica, each tenant with its own database):
+    occupancy plus checkout wait, overflow, timeout and churn counters since start.
+    """
+    pools = engine_pools()
+    log.debug("GET /diagnostics/db-pool | %s", ", ".join(f"{k}: {e.pool.status()}" for k, e in pools.items()))
+    return {label: pool_status(eng) for label, eng in pools.items()}
@@ -1,18 +1,44 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date, datetime, time
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
+from typing import List, Optional
 import logging
 
-from app.core.database import get_db
-from app.schemas import InventoryAdjustmentIn, InventoryOut
-from app.services.inventory import adjust_inventory
+from app.core.database import get_db, get_read_db
+from app.schemas import InventoryAdjustmentIn, InventoryOut, LowStockOut, ReorderThresholdIn, StockAtOut
+from app.services import idempotency, low_stock
+from app.services.inventory import adjust_inventory, apply_adjustments, stock_at, stock_changed
 
 router = APIRouter()
 log = logging.getLogger("routers.inventory")
 
 
 @router.post("/adjust", response_model=InventoryOut)
-def adjust(adj: InventoryAdjustmentIn, db: Session = Depends(get_db)):
-    log.debug("POST /inventory/adjust | sku=%s action=%s qty=%s", adj.sku, adj.action, adj.qty)
+def adjust(
+    adj: InventoryAdjustmentIn,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(default=None),
+):
+    log.debug("POST /inventory/adjust | sku=%s action=%s qty=%s key=%s", adj.sku, adj.action, adj.qty, idempotency_key)
+    if idempotency_key:
+        def work():
+            try:
+                return 200, apply_adjustments(db, [adj], commit=False)[0].model_dump(mode="json")
+            except ValueError as e:
+                return 400, {"detail": str(e)}
+
+        try:
+            status, body, replayed = idempotency.run_once(db, "POST /inventory/adjust", idempotency_key, adj, work)
+        except (idempotency.IdempotencyInProgress, idempotency.IdempotencyConflict) as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        if status == 200 and not replayed:
+            stock_changed(db, {body["sku"]: body["quantity"]})
+        log.info("Inventory adjust | key=%s status=%s replayed=%s", idempotency_key, status, replayed)
+        return JSONResponse(status_code=status, content=body, headers={"Idempotent-Replayed": str(replayed).lower()})
+
     try:
         out = adjust_inventory(db, adj)
         log.info("Inventory updated | sku=%s -> qty=%s", out.sku, out.quantity)
@@ -20,3 +46,37 @@ def adjust(adj: InventoryAdjustmentIn, db: Session = Depends(get_db)):
     except ValueError as e:
         log.warning("Inventory adjust failed | sku=%s reason=%s", adj.sku, e)
         raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.put("/thresholds", response_model=ReorderThresholdIn)
+def set_threshold(rule: ReorderThresholdIn, db: Session = Depends(get_db)):
+    log.debug("PUT /inventory/thresholds | kind=%s ref=%s threshold=%s", rule.kind, rule.ref, rule.threshold)
+    try:
+        out = low_stock.set_threshold(db, rule)
+        log.info("Reorder threshold set | %s=%s -> %s", out.kind, out.ref, out.threshold)
+        return out
+    except ValueError as e:
+        log.warning("Set threshold failed | %s=%s reason=%s", rule.kind, rule.ref, e)
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.get("/low-stock", response_model=List[LowStockOut])
+def low_stock_list(db: Session = Depends(get_read_db)):
+    log.debug("GET /inventory/low-stock")
+    resp = low_stock.list_low_stock(db)
+    log.info("Returned %d low-stock SKUs", len(resp))
+    return resp
+
+
+@router.get("/{sku}/stock", response_model=StockAtOut)
+def stock(
+    sku: str,
+    on: Optional[date] = Query(default=None, description="End of this day (UTC)"),
+    at: Optional[datetime] = Query(default=None, description="Exact point in time (UTC)"),
+    db: Session = Depends(get_read_db),
+):
+    when = at or (datetime.combine(on, time.max) if on else datetime.utcnow())
+    log.debug("GET /inventory/%s/stock | at=%s", sku, when)
+    qty = stock_at(db, sku, when)
+    log.info("Stock at | sku=%s at=%s qty=%s", sku, when, qty)
+    return StockAtOut(sku=sku, at=when, quantity=qty)
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from typing import List
+import logging
+
+from app.core.database import get_read_db
+from app.schemas import MessageStatusOut
+from app.services import message_status as message_status_service
+
+router = APIRouter()
+log = logging.getLogger("routers.messages")
+
+
+@router.get("/{message_id}/statuses", response_model=List[MessageStatusOut])
+def message_statuses(message_id: str, db: Session = Depends(get_read_db)):
+    """Delivery/read history of one outbound message (flushed statuses only)."""
+    log.debug("GET /messages/%s/statuses", message_id)
+    rows = message_status_service.list_statuses(db, message_id)
+    log.info("Message %s | %d statuses", message_id, len(rows))
+    return rows
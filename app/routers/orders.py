@@ -1,13 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import logging
 
-from app.core.database import get_db
-from app.schemas import DropDownOption, OrderCreate, OrderOut, OrderStatusUpdate
+from app.core.database import get_db, get_read_db
+from app.schemas import (
+    BulkStatusOut, BulkStatusResult, BulkStatusUpdate, DropDownOption, OrderCreate, OrderOut, OrderStatusUpdate
+)
 from app.services import orders as orders_service
+from app.services import export as export_service
+from app.services import idempotency
+from app.services.notifications import notify_status_changes
 # from app.models import OrderStatus
 
 router = APIRouter()
@@ -16,7 +22,7 @@ log = logging.getLogger("routers.orders")
 
 @router.get("", response_model=List[DropDownOption])
 def list_orders(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     status: Optional[List] = Query(default=None)
 ):
     # Normalize to a list of statuses or None
@@ -39,7 +45,7 @@ def list_orders(
 
 
 @router.get("", response_model=List[OrderOut])
-def list_all_orders(db: Session = Depends(get_db)):
+def list_all_orders(db: Session = Depends(get_read_db)):
     log.debug("GET /orders (all)")
     resp = orders_service.list_all_orders(db)
     log.info("Returned %d order summaries", len(resp))
@@ -47,8 +53,28 @@ def list_all_orders(db: Session = Depends(get_db)):
 
 
 @router.post("", response_model=OrderOut, status_code=201)
-def create_order(order: OrderCreate, db: Session = Depends(get_db)):
-    log.debug("POST /orders (create)")
+def create_order(
+    order: OrderCreate,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(default=None),
+):
+    log.debug("POST /orders (create) | idempotency_key=%s", idempotency_key)
+    if idempotency_key:
+        def work():
+            try:
+                return 201, jsonable_encoder(orders_service.create_order(db, order, commit=False))
+            except ValueError as e:
+                return 400, {"detail": str(e)}
+
+        try:
+            status, body, replayed = idempotency.run_once(db, "POST /orders", idempotency_key, order, work)
+        except (idempotency.IdempotencyInProgress, idempotency.IdempotencyConflict) as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        log.info("Create order | key=%s status=%s replayed=%s", idempotency_key, status, replayed)
+        return JSONResponse(status_code=status, content=body, headers={"Idempotent-Replayed": str(replayed).lower()})
+
     try:
         out = orders_service.create_order(db, order)
         log.info("Created order id=%s with %d items", out.id, len(out.items or []))
@@ -58,6 +84,68 @@ def create_order(order: OrderCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail=str(e))
 
 
+_EXPORT_MEDIA = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+@router.get("/export")
+def export_orders(
+    format: str = Query(default="csv", pattern="^(csv|ndjson|xlsx)$"),
+    status: Optional[List[str]] = Query(default=None),
+):
+    statuses = orders_service.normalize_statuses(status)
+    log.debug("GET /orders/export | format=%s status=%s", format, statuses or "ALL")
+
+    rows = export_service.iter_order_rows(statuses)
+    if format == "csv":
+        body = export_service.stream_csv(rows)
+    elif format == "ndjson":
+        body = export_service.stream_ndjson(rows)
+    else:
+        body = export_service.stream_xlsx(rows)
+
+    log.info("Streaming order export | format=%s", format)
+    return StreamingResponse(
+        body,
+        media_type=_EXPORT_MEDIA[format],
+        headers={"Content-Disposition": f'attachment; filename="orders.{format}"'},
+    )
+
+
+@router.patch("/status/bulk", response_model=BulkStatusOut)
+async def bulk_update_status(upd: BulkStatusUpdate, db: Session = Depends(get_db)):
+    log.debug("PATCH /orders/status/bulk | n=%d -> %s", len(upd.order_ids), upd.status)
+    try:
+        found, missing = await run_in_threadpool(
+            orders_service.bulk_update_status, db, upd.order_ids, upd.status, upd.note
+        )
+    except ValueError as e:
+        log.warning("Bulk status update failed | -> %s reason=%s", upd.status, e)
+        raise HTTPException(status_code=409, detail=str(e))
+
+    notified = {}
+    if upd.notify:
+        targets = [(oid, phone) for oid, phone, changed in found if changed and phone]
+        notified = await notify_status_changes(targets, upd.status)
+
+    results = [
+        BulkStatusResult(
+            order_id=oid,
+            updated=changed,
+            notified=notified[oid][0] if oid in notified else None,
+            error=notified[oid][1] if oid in notified else None,
+        )
+        for oid, _, changed in found
+    ] + [BulkStatusResult(order_id=oid, updated=False, error="Order not found") for oid in missing]
+
+    n_updated = sum(1 for r in results if r.updated)
+    log.info("Bulk status update | -> %s updated=%d missing=%d", upd.status, n_updated, len(missing))
+    return BulkStatusOut(status=upd.status, updated=n_updated, results=results)
+
+
 @router.patch("/{order_id}/status", response_model=OrderOut)
 def update_status(order_id: str, upd: OrderStatusUpdate, db: Session = Depends(get_db)):
     log.debug("PATCH /orders/%s/status -> %s", order_id, upd.status)
@@ -67,11 +155,11 @@ def update_status(order_id: str, upd: OrderStatusUpdate, db: Session = Depends(g
         return out
     except ValueError as e:
         log.warning("Update status failed | id=%s reason=%s", order_id, e)
-        raise HTTPException(status_code=404, detail=str(e))
+        raise HTTPException(status_code=404 if str(e) == "Order not found" else 409, detail=str(e))
 
 
 @router.get("/{order_id}", response_model=OrderOut)
-def get_order(order_id: str, db: Session = Depends(get_db)):
+def get_order(order_id: str, db: Session = Depends(get_read_db)):
     log.debug("GET /orders/%s", order_id)
     try:
         out = orders_service.get_order_out(db=db, order_id=order_id)
@@ -1,21 +1,27 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import logging
 
-from app.core.database import get_db
+from app.core import config
+from app.core.database import get_db, get_read_db
+from app.core.signature import BodyTooLarge, read_capped_body
 from app.services.products import (
     list_all_variants, list_categories, list_variants_by_category,
     upsert_category, upsert_variant
 )
-from app.schemas import CategoryOut, VariantOut
+from app.services.facets import query_facets
+from app.services import images as images_service
+from app.services.search import search_variants
+from app.schemas import CategoryOut, FacetQueryOut, VariantImageOut, VariantOut
 
 router = APIRouter()
 log = logging.getLogger("routers.products")
 
 
 @router.get("/categories", response_model=List[CategoryOut])
-def categories(db: Session = Depends(get_db)):
+def categories(db: Session = Depends(get_read_db)):
     log.debug("GET /products/categories")
     cats = list_categories(db)
     resp = [{"id": c.id, "title": c.title} for c in cats]
@@ -24,7 +30,7 @@ def categories(db: Session = Depends(get_db)):
 
 
 @router.get("/variants", response_model=List[VariantOut])
-def all_variants(db: Session = Depends(get_db)):
+def all_variants(db: Session = Depends(get_read_db)):
     log.debug("GET /products/variants")
     resp = list_all_variants(db)
     log.info("Returned %d variants", len(resp))
@@ -32,13 +38,37 @@ def all_variants(db: Session = Depends(get_db)):
 
 
 @router.get("/variants_by_category", response_model=List[VariantOut])
-def variants(category: str, db: Session = Depends(get_db)):
+def variants(category: str, db: Session = Depends(get_read_db)):
     log.debug("GET /products/variants_by_category | category=%s", category)
     resp = list_variants_by_category(db, category)
     log.info("Returned %d variants for category=%s", len(resp), category)
     return resp
 
 
+@router.get("/search", response_model=List[VariantOut])
+def search(q: str = Query(min_length=1), limit: int = Query(default=10, ge=1, le=100), db: Session = Depends(get_read_db)):
+    log.debug("GET /products/search | q=%s limit=%s", q, limit)
+    resp = search_variants(db, q, limit)
+    log.info("Returned %d matches for q=%s", len(resp), q)
+    return resp
+
+
+@router.get("/facets", response_model=FacetQueryOut)
+def facets(
+    category: Optional[List[str]] = Query(default=None),
+    size: Optional[List[str]] = Query(default=None),
+    color: Optional[List[str]] = Query(default=None),
+    in_stock: Optional[bool] = Query(default=None),
+    limit: int = Query(default=50, ge=1, le=500),
+    offset: int = Query(default=0, ge=0),
+    db: Session = Depends(get_read_db),
+):
+    log.debug("GET /products/facets | category=%s size=%s color=%s in_stock=%s", category, size, color, in_stock)
+    resp = query_facets(db, category, size, color, in_stock, limit, offset)
+    log.info("Facet query matched %d variants", resp.total)
+    return resp
+
+
 @router.post("/categories", response_model=CategoryOut, status_code=201)
 def add_category(id: str, title: str, db: Session = Depends(get_db)):
     log.debug("POST /products/categories | id=%s", id)
@@ -53,3 +83,48 @@ def add_variant(sku: str, title: str, category_id: str, size: str = None, color:
     v = upsert_variant(db, sku, title, category_id, size, color)
     log.info("Upserted variant sku=%s", v.sku)
     return {"id": v.sku, "title": v.title, "size": v.size, "color": v.color}
+
+
+@router.put("/variants/{sku}/image", response_model=VariantImageOut)
+async def upload_variant_image(sku: str, request: Request, db: Session = Depends(get_db)):
+    """Raw image bytes as the request body (any Content-Type Pillow can read)."""
+    try:
+        raw = await read_capped_body(request, config.IMAGE_MAX_UPLOAD_BYTES)
+    except BodyTooLarge:
+        raise HTTPException(status_code=413, detail="Image too large")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    log.debug("PUT /products/variants/%s/image | %d bytes", sku, len(raw))
+    try:
+        out = await images_service.save_variant_image(db, sku, raw)
+    except ValueError as e:
+        log.warning("Variant image rejected | sku=%s reason=%s", sku, e)
+        raise HTTPException(status_code=404 if str(e) == "Variant not found" else 400, detail=str(e))
+    log.info("Stored image for sku=%s (%dx%d)", sku, out.width, out.height)
+    return out
+
+
+@router.get("/variants/{sku}/image", response_model=VariantImageOut)
+def variant_image(sku: str, db: Session = Depends(get_read_db)):
+    log.debug("GET /products/variants/%s/image", sku)
+    try:
+        return images_service.get_variant_image(db, sku)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.get("/images/{key}")
+def image_file(key: str, request: Request):
+    """
+    A rendition by content key. The key changes whenever the bytes would, so
+    responses are cacheable forever; Range requests are served by FileResponse.
+    """
+    path = images_service.rendition_path(key)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    etag = f'"{key}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type="image/jpeg", headers=headers)
@@ -0,0 +1,51 @@
+from datetime import date, datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+import logging
+
+from app.core.database import get_read_db
+from app.schemas import BestSellerOut, SalesSummaryOut
+from app.services import reports as reports_service
+
+router = APIRouter()
+log = logging.getLogger("routers.reports")
+
+
+def _range(start: Optional[date], end: Optional[date]):
+    end = end or datetime.utcnow().date()  # rollup days are UTC (orders.created_at)
+    start = start or (end - timedelta(days=29))
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must be on or before end")
+    return start, end
+
+
+@router.get("/sales", response_model=SalesSummaryOut)
+def sales(
+    start: Optional[date] = Query(default=None),
+    end: Optional[date] = Query(default=None),
+    db: Session = Depends(get_read_db),
+):
+    start, end = _range(start, end)
+    log.debug("GET /reports/sales | %s..%s", start, end)
+    out = reports_service.sales_summary(db, start, end)
+    log.info("Sales summary %s..%s | days=%d revenue=%s", start, end, len(out.daily), out.totals.revenue)
+    return out
+
+
+@router.get("/best-sellers", response_model=List[BestSellerOut])
+def best_sellers(
+    start: Optional[date] = Query(default=None),
+    end: Optional[date] = Query(default=None),
+    limit: int = Query(default=10, ge=1, le=100),
+    by: str = Query(default="units"),
+    db: Session = Depends(get_read_db),
+):
+    start, end = _range(start, end)
+    log.debug("GET /reports/best-sellers | %s..%s by=%s limit=%s", start, end, by, limit)
+    try:
+        resp = reports_service.best_sellers(db, start, end, limit=limit, by=by)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    log.info("Returned %d best sellers", len(resp))
+    return resp
@@ -1,9 +1,11 @@
+import json
 import logging
 from typing import Any, Dict, Optional
 
 from fastapi import APIRouter, HTTPException, Query, Request, Response
 
 from app.core import config
+from app.core.signature import BodyTooLarge, read_capped_body, verify_signature
 from app.services.message import handle_webhook_event
 
 router = APIRouter(prefix="", tags=["webhook"])
@@ -33,9 +35,24 @@ async def receive_webhook(request: Request):
     """
     WhatsApp Cloud API will POST message events here.
     We delegate to handle_webhook_event which replies (hi/hello/menu).
+
+    The raw body is read once (up to WEBHOOK_MAX_BODY_BYTES): the signature is
+    checked on those bytes (before any parsing or DB work) and the JSON is
+    parsed from the same buffer.
     """
     try:
-        body: Dict[str, Any] = await request.json()
+        raw = await read_capped_body(request, config.WEBHOOK_MAX_BODY_BYTES)
+    except BodyTooLarge:
+        log.warning("Rejected webhook body over %d bytes", config.WEBHOOK_MAX_BODY_BYTES)
+        raise HTTPException(status_code=413, detail="Payload too large")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not verify_signature(raw, request.headers.get("x-hub-signature-256")):
+        log.warning("Rejected webhook with bad signature (%d bytes)", len(raw))
+        raise HTTPException(status_code=403, detail="Invalid signature")
+
+    try:
+        body: Dict[str, Any] = json.loads(raw)
     except Exception as e:
         print(f"[Webhook][POST] JSON parse error: {e}")
         raise HTTPException(status_code=400, detail="Invalid JSON")
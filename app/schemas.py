@@ -1,7 +1,8 @@
 from datetime import date, datetime
-from typing import Optional, List
-from pydantic import BaseModel, ConfigDict
-from app.models import OrderStatus
+from typing import Dict, Optional, List
+from pydantic import BaseModel, ConfigDict, Field
+from app.core import config
+from app.models import CampaignStatus, OrderStatus
 
 # ----- Products / Inventory -----
 
@@ -16,6 +17,20 @@ class VariantOut(BaseModel):
     title: str
 
 
+class VariantImageOut(BaseModel):
+    sku: str
+    source_sha256: str
+    width: int
+    height: int
+    renditions: Dict[str, str]  # name -> URL
+
+
+class FacetQueryOut(BaseModel):
+    total: int
+    items: List[VariantOut]
+    counts: Dict[str, Dict[str, int]]
+
+
 class InventoryAdjustmentIn(BaseModel):
     category: str
     sku: Optional[str] = None
@@ -28,6 +43,25 @@ class InventoryOut(BaseModel):
     sku: str
     quantity: int
 
+
+class StockAtOut(BaseModel):
+    sku: str
+    at: datetime
+    quantity: int
+
+
+class ReorderThresholdIn(BaseModel):
+    kind: str = Field(pattern="^(sku|category)$")
+    ref: str = Field(min_length=1)  # sku or category id
+    threshold: int = Field(ge=0)    # 0 = no alerts
+
+
+class LowStockOut(BaseModel):
+    sku: str
+    level: int
+    threshold: int
+    alerted_at: datetime
+
 # ----- Orders -----
 
 
@@ -71,6 +105,8 @@ class OrderOut(BaseModel):
     fulfillment_date: Optional[date]
     note: Optional[str]
     items: List[OrderOutItem]
+    total_amount: int = 0
+    item_count: int = 0
     model_config = ConfigDict(use_enum_values=True)
 
 
@@ -79,6 +115,97 @@ class OrderStatusUpdate(BaseModel):
     note: Optional[str] = None
 
 
+class BulkStatusUpdate(BaseModel):
+    order_ids: List[str] = Field(min_length=1, max_length=config.BULK_STATUS_MAX_ORDERS)
+    status: OrderStatus
+    note: Optional[str] = None
+    notify: bool = True
+
+
+class BulkStatusResult(BaseModel):
+    order_id: str
+    updated: bool
+    notified: Optional[bool] = None
+    error: Optional[str] = None
+
+
+class BulkStatusOut(BaseModel):
+    status: OrderStatus
+    updated: int
+    results: List[BulkStatusResult]
+    model_config = ConfigDict(use_enum_values=True)
+
+
+# ----- Reports -----
+
+
+class SalesTotals(BaseModel):
+    lines: int = 0
+    units: int = 0
+    revenue: int = 0
+    cancelled_units: int = 0
+    cancelled_revenue: int = 0
+    delivered_units: int = 0
+    delivered_revenue: int = 0
+
+
+class SalesDayOut(BaseModel):
+    day: date
+    units: int
+    revenue: int
+
+
+class SalesSummaryOut(BaseModel):
+    start: date
+    end: date
+    totals: SalesTotals
+    daily: List[SalesDayOut]
+
+
+class BestSellerOut(BaseModel):
+    sku: str
+    title: str
+    units: int
+    revenue: int
+
+
+# ----- Campaigns -----
+
+
+class CampaignCreate(BaseModel):
+    name: str = Field(min_length=1)
+    message: str = Field(min_length=1, max_length=4096)
+
+
+class CampaignOut(BaseModel):
+    id: str
+    name: str
+    message: str
+    status: CampaignStatus
+    cursor: Optional[str] = None
+    sent_count: int
+    failed_count: int
+    created_at: datetime
+    updated_at: datetime
+    completed_at: Optional[datetime] = None
+    model_config = ConfigDict(from_attributes=True, use_enum_values=True)
+
+
+# ----- Messages -----
+
+
+class MessageStatusOut(BaseModel):
+    message_id: str
+    status: str
+    recipient_id: Optional[str] = None
+    timestamp: datetime
+    conversation_id: Optional[str] = None
+    pricing_category: Optional[str] = None
+    error_code: Optional[int] = None
+    error_title: Optional[str] = None
+    model_config = ConfigDict(from_attributes=True)
+
+
 # ----- Flows: data_exchange -----
 
 
@@ -0,0 +1,70 @@
+# app/services/archive.py
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import DateTime, delete, insert, literal, select
+from sqlalchemy.orm import Session
+
+from app.core import config
+from app.models import Order, OrderArchive, OrderItem, OrderItemArchive, OrderStatus, StockHold
+
+log = logging.getLogger("services.archive")
+
+TERMINAL_STATUSES = (OrderStatus.Delivered, OrderStatus.Cancelled)
+
+_ORDER_COLS = [c.name for c in OrderArchive.__table__.c if c.name != "archived_at"]
+_ITEM_COLS = [c.name for c in OrderItemArchive.__table__.c]
+
+
+def _move(db: Session, ids: List[str], now: datetime) -> None:
+    """
+    Copy orders + lines to the archive tables and delete them from the hot
+    ones, along with their settled stock holds (caller commits).
+    """
+    hot_orders, hot_items = Order.__table__, OrderItem.__table__
+    db.execute(
+        insert(OrderArchive).from_select(
+            _ORDER_COLS + ["archived_at"],
+            select(*[hot_orders.c[c] for c in _ORDER_COLS], literal(now, DateTime)).where(hot_orders.c.id.in_(ids)),
+        )
+    )
+    db.execute(
+        insert(OrderItemArchive).from_select(
+            _ITEM_COLS, select(*[hot_items.c[c] for c in _ITEM_COLS]).where(hot_items.c.order_id.in_(ids))
+        )
+    )
+    db.execute(delete(StockHold).where(StockHold.order_id.in_(ids)), execution_options={"synchronize_session": False})
+    db.execute(delete(OrderItem).where(OrderItem.order_id.in_(ids)), execution_options={"synchronize_session": False})
+    db.execute(delete(Order).where(Order.id.in_(ids)), execution_options={"synchronize_session": False})
+
+
+def archive_orders(db: Session, cutoff: Optional[datetime] = None, batch: Optional[int] = None) -> int:
+    """
+    Move Delivered/Cancelled orders created before `cutoff` (default: now -
+    ORDER_ARCHIVE_AFTER_DAYS) to orders_archive/order_items_archive, oldest
+    first, `batch` orders per transaction. Selected rows are locked (skipping
+    ones another writer holds), so an order cannot change status mid-move.
+    Returns the number of orders archived.
+    """
+    cutoff = cutoff or datetime.utcnow() - timedelta(days=config.ORDER_ARCHIVE_AFTER_DAYS)
+    batch = batch or config.ORDER_ARCHIVE_BATCH
+    moved = 0
+    while True:
+        ids = [
+            oid
+            for (oid,) in db.query(Order.id)
+            .filter(Order.status.in_(TERMINAL_STATUSES), Order.created_at < cutoff)
+            .order_by(Order.created_at, Order.id)
+            .limit(batch)
+            .with_for_update(skip_locked=True)
+        ]
+        if not ids:
+            break
+        _move(db, ids, datetime.utcnow())
+        db.commit()
+        moved += len(ids)
+        log.debug("Archived batch of %d orders (last=%s)", len(ids), ids[-1])
+    if moved:
+        log.info("Archived %d orders created before %s", moved, cutoff.isoformat())
+    return moved
@@ -0,0 +1,182 @@
+# app/services/batch_writer.py
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.core.tenants import Tenant, current_tenant, use_tenant
+
+log = logging.getLogger("services.batch_writer")
+
+Op = TypeVar("Op")
+
+# apply_batch(db, ops) -> one result (or Exception instance) per op, in order.
+# It owns the transaction: commit once for the whole batch.
+ApplyBatch = Callable[[Session, List[Any]], List[Any]]
+
+_STOP = object()
+
+
+class MicroBatchWriter(Generic[Op]):
+    """
+    Coalesce writes arriving in a burst into one transaction per batch.
+
+    submit() enqueues an op and waits for its own result; enqueue() is the
+    fire-and-forget variant for writes nobody waits on. A single worker
+    collects ops until max_batch is reached or max_wait_ms has passed since
+    the first one, then runs apply_batch in a thread with a fresh session,
+    once per tenant present in the batch (each op keeps its submitter's tenant).
+
+    max_queue bounds the ops waiting (0 = unbounded): submit() then waits for
+    room and enqueue() drops the op. A batch whose apply_batch raises is tried
+    again up to `retries` times with exponential backoff; only use retries
+    when apply_batch is idempotent. If the worker itself dies, the ops it held
+    or had queued fail (submit() raises) and the next op starts a new worker.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        apply_batch: ApplyBatch,
+        max_batch: int = 50,
+        max_wait_ms: int = 50,
+        max_queue: int = 0,
+        retries: int = 0,
+        retry_delay_s: float = 0.5,
+    ) -> None:
+        self.name = name
+        self._apply = apply_batch
+        self._max_batch = max(1, max_batch)
+        self._max_wait = max(0, max_wait_ms) / 1000
+        self._max_queue = max(0, max_queue)
+        self._retries = max(0, retries)
+        self._retry_delay = max(0.0, retry_delay_s)
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.dropped = 0  # ops refused by enqueue() because the queue was full
+
+    def _ensure_worker(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self._max_queue)
+        if self._worker is None or self._worker.done():  # (re)start on the same queue: nothing queued is lost
+            self._worker = asyncio.get_running_loop().create_task(self._run(), name=f"batch_writer:{self.name}")
+        return self._queue
+
+    async def submit(self, op: Op) -> Any:
+        fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        await self._ensure_worker().put((op, fut, current_tenant()))
+        return await fut
+
+    def enqueue(self, op: Op) -> bool:
+        """Queue op without waiting; False (op dropped) when the queue is full."""
+        try:
+            self._ensure_worker().put_nowait((op, None, current_tenant()))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                log.warning("[%s] queue full (%d waiting); dropped %d op(s) so far", self.name, self._max_queue, self.dropped)
+            return False
+        return True
+
+    async def _collect(self) -> Tuple[List[Tuple[Op, Optional[asyncio.Future], Tenant]], bool]:
+        """Returns (batch, stop_requested)."""
+        q = self._queue
+        first = await q.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self._max_wait
+        while len(batch) < self._max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(q.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run_batch(self, ops: List[Op]) -> List[Any]:
+        with SessionLocal() as db:
+            return self._apply(db, ops)
+
+    async def _run_tenant(self, tenant: Tenant, batch: List[Tuple[Op, Optional[asyncio.Future], Tenant]]) -> None:
+        ops = [op for op, _, _ in batch]
+        t0 = time.monotonic()
+        for attempt in range(self._retries + 1):
+            try:
+                with use_tenant(tenant):  # to_thread copies this context
+                    results = await asyncio.to_thread(self._run_batch, ops)
+                break
+            except Exception as e:
+                if attempt < self._retries:
+                    delay = self._retry_delay * 2 ** attempt
+                    log.warning("[%s] batch of %d failed (tenant=%s): %s; retry %d in %.1fs", self.name, len(ops), tenant.id, e, attempt + 1, delay)
+                    await asyncio.sleep(delay)
+                    continue
+                log.exception("[%s] batch of %d failed (tenant=%s); giving up", self.name, len(ops), tenant.id)
+                results = [e] * len(ops)
+        log.info("[%s] committed batch size=%d tenant=%s in %.1fms", self.name, len(ops), tenant.id, (time.monotonic() - t0) * 1000)
+        for (_, fut, _), res in zip(batch, results):
+            if fut is None or fut.done():
+                continue
+            if isinstance(res, Exception):
+                fut.set_exception(res)
+            else:
+                fut.set_result(res)
+
+    def _abandon(self, batch: List[Tuple[Op, Optional[asyncio.Future], Tenant]]) -> None:
+        """The worker died: fail its in-flight batch and everything queued so no submit() waits forever."""
+        items = list(batch)
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            if item is not _STOP:
+                items.append(item)
+        err = RuntimeError(f"batch writer {self.name} stopped")
+        lost = 0
+        for _, fut, _ in items:
+            if fut is None:
+                lost += 1
+            elif not fut.done():
+                fut.set_exception(err)
+        if items:
+            log.error("[%s] worker stopped with %d op(s) pending; failed their callers, dropped %d queued write(s)", self.name, len(items), lost)
+
+    async def _run(self) -> None:
+        batch: List[Tuple[Op, Optional[asyncio.Future], Tenant]] = []
+        stopped = False
+        try:
+            while True:
+                batch, stop = await self._collect()
+                if not batch:
+                    stopped = True
+                    return
+                by_tenant: Dict[str, List[Tuple[Op, Optional[asyncio.Future], Tenant]]] = {}
+                for item in batch:
+                    by_tenant.setdefault(item[2].id, []).append(item)
+                for items in by_tenant.values():
+                    await self._run_tenant(items[0][2], items)
+                batch = []
+                if stop:
+                    stopped = True
+                    return
+        finally:
+            if not stopped:
+                self._abandon(batch)
+
+    async def close(self) -> None:
+        """Drain ops queued so far, then stop the worker."""
+        if self._worker is None or self._worker.done():
+            return
+        await self._queue.put(_STOP)
+        await self._worker
+        self._worker = None
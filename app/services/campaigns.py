@@ -0,0 +1,281 @@
+# app/services/campaigns.py
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, or_, select, union
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core import config
+from app.core.database import SessionLocal, upsert_insert
+from app.core.tenants import all_tenants, use_tenant
+from app.models import Campaign, CampaignRecipient, CampaignStatus, Order, OrderArchive
+from app.schemas import CampaignCreate
+from app.services.wa import canonical, send_text
+from app.utils.ratelimit import AsyncTokenBucket
+
+log = logging.getLogger("services.campaigns")
+
+Outcome = Tuple[str, bool, Optional[str]]  # (phone, ok, error)
+
+
+# ---------- DB helpers (sync; run in worker threads) ----------
+
+
+def create_campaign(db: Session, payload: CampaignCreate) -> Campaign:
+    camp = Campaign(name=payload.name, message=payload.message, status=CampaignStatus.Running)
+    db.add(camp)
+    db.commit()
+    db.refresh(camp)
+    return camp
+
+
+def get_campaign(db: Session, campaign_id: str) -> Campaign:
+    camp = db.query(Campaign).get(campaign_id)
+    if not camp:
+        raise ValueError("Campaign not found")
+    return camp
+
+
+def set_campaign_status(db: Session, campaign_id: str, status: CampaignStatus) -> Campaign:
+    camp = get_campaign(db, campaign_id)
+    if camp.status == CampaignStatus.Completed:
+        raise ValueError("Campaign already completed")
+    camp.status = status
+    db.commit()
+    db.refresh(camp)
+    return camp
+
+
+def audience_chunk(db: Session, after: Optional[str], limit: int) -> List[str]:
+    """
+    Next `limit` distinct customer phones after `after`: a keyset range scan
+    on the customer_phone index, so each page costs the same however far
+    into the audience we are. Covers live and archived orders.
+    """
+    def _page(model) -> Any:
+        q = select(model.customer_phone).distinct()
+        if after is not None:
+            q = q.where(model.customer_phone > after)
+        page = q.order_by(model.customer_phone).limit(limit).subquery()
+        return select(page.c.customer_phone)
+
+    # archived orders' customers are still customers: each tier contributes its next page
+    phones = union(_page(Order), _page(OrderArchive)).subquery()
+    rows = db.execute(select(phones.c.customer_phone).order_by(phones.c.customer_phone).limit(limit))
+    return [p for (p,) in rows if p]
+
+
+def _claim(db: Session, campaign_id: str, owner: str) -> bool:
+    """Take or renew the campaign's lease; False while another worker holds it or it is not Running."""
+    now = datetime.utcnow()
+    won = (
+        db.query(Campaign)
+        .filter(
+            Campaign.id == campaign_id,
+            Campaign.status == CampaignStatus.Running,
+            or_(Campaign.owner == owner, Campaign.lease_until.is_(None), Campaign.lease_until < now),
+        )
+        .update({"owner": owner, "lease_until": now + timedelta(seconds=config.CAMPAIGN_LEASE_S)}, synchronize_session=False)
+    ) == 1
+    db.commit()
+    return won
+
+
+def _release(db: Session, campaign_id: str, owner: str) -> None:
+    db.query(Campaign).filter(Campaign.id == campaign_id, Campaign.owner == owner).update(
+        {"owner": None, "lease_until": None}, synchronize_session=False
+    )
+    db.commit()
+
+
+def _fresh_recipients(db: Session, campaign_id: str, phones: List[str]) -> List[str]:
+    """
+    Canonical, de-duplicated phones of a chunk that this campaign has not
+    messaged yet: "+91 98765…" and "9198765…" are one customer even though
+    the audience scan sees two values.
+    """
+    canon = list(dict.fromkeys(c for c in map(canonical, phones) if c))
+    if not canon:
+        return []
+    sent = {
+        p for (p,) in db.query(CampaignRecipient.phone)
+        .filter(CampaignRecipient.campaign_id == campaign_id, CampaignRecipient.phone.in_(canon))
+    }
+    return [p for p in canon if p not in sent]
+
+
+def _checkpoint(db: Session, campaign_id: str, owner: str, outcomes: List[Outcome], cursor: str) -> Optional[CampaignStatus]:
+    """
+    Record a chunk's outcomes in bulk, advance the cursor and renew the lease
+    in one transaction. None (nothing recorded) if the lease was lost.
+    """
+    rows = [
+        {"campaign_id": campaign_id, "phone": p, "ok": ok, "error": (err or "")[:500] or None, "sent_at": datetime.utcnow()}
+        for p, ok, err in outcomes
+    ]
+    dialect_insert = upsert_insert(db.get_bind())
+    if rows:
+        if dialect_insert is not None:
+            # a chunk re-sent after a crash keeps its first outcome
+            db.execute(dialect_insert(CampaignRecipient).on_conflict_do_nothing(), rows)
+        else:
+            db.execute(insert(CampaignRecipient), rows)
+
+    n_ok = sum(1 for _, ok, _ in outcomes if ok)
+    renewed = (
+        db.query(Campaign)
+        .filter(Campaign.id == campaign_id, Campaign.owner == owner)
+        .update(
+            {
+                "cursor": cursor,
+                "sent_count": Campaign.sent_count + n_ok,
+                "failed_count": Campaign.failed_count + (len(outcomes) - n_ok),
+                "lease_until": datetime.utcnow() + timedelta(seconds=config.CAMPAIGN_LEASE_S),
+            },
+            synchronize_session=False,
+        )
+    ) == 1
+    if not renewed:
+        db.rollback()
+        return None
+    db.commit()
+    return get_campaign(db, campaign_id).status
+
+
+def _complete(db: Session, campaign_id: str, owner: str) -> None:
+    db.query(Campaign).filter(Campaign.id == campaign_id, Campaign.owner == owner).update(
+        {"status": CampaignStatus.Completed, "completed_at": datetime.utcnow(), "owner": None, "lease_until": None},
+        synchronize_session=False,
+    )
+    db.commit()
+
+
+def _running_ids(db: Session) -> List[str]:
+    return [cid for (cid,) in db.query(Campaign.id).filter(Campaign.status == CampaignStatus.Running)]
+
+
+def _in_session(fn: Callable[..., Any], *args: Any) -> Any:
+    with SessionLocal() as db:
+        return fn(db, *args)
+
+
+# ---------- sender ----------
+
+
+class CampaignRunner:
+    """
+    One asyncio task per running campaign. All campaigns share one token
+    bucket (CAMPAIGN_RATE_PER_S) and each uses CAMPAIGN_WORKERS concurrent
+    senders per chunk. Progress is checkpointed after every chunk, so a
+    restart (resume_running) continues from the stored cursor. With several
+    server processes, a campaign is sent only by the one holding its lease.
+    """
+
+    def __init__(self) -> None:
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._bucket: Optional[AsyncTokenBucket] = None
+        self._owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+    def _limiter(self) -> AsyncTokenBucket:
+        if self._bucket is None:  # created lazily so its lock binds to the serving loop
+            self._bucket = AsyncTokenBucket(config.CAMPAIGN_RATE_PER_S, capacity=config.CAMPAIGN_RATE_PER_S)
+        return self._bucket
+
+    def is_active(self, campaign_id: str) -> bool:
+        t = self._tasks.get(campaign_id)
+        return t is not None and not t.done()
+
+    def start(self, campaign_id: str) -> None:
+        if self.is_active(campaign_id):
+            return
+        self._tasks[campaign_id] = asyncio.get_running_loop().create_task(self._run(campaign_id), name=f"campaign:{campaign_id}")
+
+    async def resume_running(self) -> None:
+        for tenant in all_tenants():
+            with use_tenant(tenant):  # the campaign task inherits this context
+                try:
+                    await self.resume_tenant()
+                except SQLAlchemyError:
+                    log.exception("Cannot resume campaigns of tenant %s (not provisioned?)", tenant.id)
+
+    async def resume_tenant(self) -> int:
+        """
+        Start Running campaigns of the current tenant that have no task here
+        (periodic job: picks up campaigns whose owner stopped renewing).
+        Each task claims its lease first, so only one worker sends.
+        """
+        running = [cid for cid in await asyncio.to_thread(_in_session, _running_ids) if not self.is_active(cid)]
+        for cid in running:
+            self.start(cid)
+        return len(running)
+
+    async def stop(self) -> None:
+        for t in self._tasks.values():
+            t.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+
+    async def _send_chunk(self, phones: List[str], message: str) -> List[Outcome]:
+        queue: asyncio.Queue = asyncio.Queue()
+        for p in phones:
+            queue.put_nowait(p)
+        outcomes: List[Outcome] = []
+        limiter = self._limiter()
+
+        async def worker() -> None:
+            while True:
+                try:
+                    phone = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await limiter.acquire()
+                try:
+                    ok, body = await send_text(phone, message)
+                    outcomes.append((phone, ok, None if ok else body))
+                except Exception as e:
+                    outcomes.append((phone, False, str(e)))
+
+        await asyncio.gather(*(worker() for _ in range(max(1, config.CAMPAIGN_WORKERS))))
+        return outcomes
+
+    async def _run(self, campaign_id: str) -> None:
+        owner = self._owner
+        try:
+            if not await asyncio.to_thread(_in_session, _claim, campaign_id, owner):
+                log.debug("Campaign %s is not running or is leased by another worker", campaign_id)
+                return
+            log.info("Campaign %s claimed by %s", campaign_id, owner)
+            camp = await asyncio.to_thread(_in_session, get_campaign, campaign_id)
+            message, cursor, status = camp.message, camp.cursor, camp.status
+            while status == CampaignStatus.Running:
+                chunk = await asyncio.to_thread(_in_session, audience_chunk, cursor, config.CAMPAIGN_CHUNK_SIZE)
+                if not chunk:
+                    await asyncio.to_thread(_in_session, _complete, campaign_id, owner)
+                    log.info("Campaign %s completed", campaign_id)
+                    return
+                phones = await asyncio.to_thread(_in_session, _fresh_recipients, campaign_id, chunk)
+                outcomes = await self._send_chunk(phones, message)
+                cursor = chunk[-1]
+                status = await asyncio.to_thread(_in_session, _checkpoint, campaign_id, owner, outcomes, cursor)
+                if status is None:
+                    log.warning("Campaign %s lease lost to another worker; stopping here", campaign_id)
+                    return
+                log.info(
+                    "Campaign %s checkpoint | cursor=%s ok=%d failed=%d",
+                    campaign_id, cursor, sum(1 for o in outcomes if o[1]), sum(1 for o in outcomes if not o[1]),
+                )
+            await asyncio.to_thread(_in_session, _release, campaign_id, owner)
+            log.info("Campaign %s stopped with status=%s", campaign_id, status)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log.exception("Campaign %s sender crashed; resumes from the last checkpoint once its lease expires", campaign_id)
+
+
+campaign_runner = CampaignRunner()
@@ -0,0 +1,99 @@
+# app/services/catalog_sync.py
+"""
+Cross-process freshness for the in-memory catalog indexes (search, facets).
+
+Every variant or stock write appends the SKUs it touched to catalog_changes.
+Each index remembers the last change id it has applied; before serving a
+query it reads the log head (one indexed query on the primary) and, when
+other writers moved it, re-reads only the SKUs changed since. An index
+older than CATALOG_INDEX_MAX_AGE_S is rebuilt from scratch, which also
+covers a change whose log row was lost.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Iterable, Set
+
+from sqlalchemy import func, insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core import config
+from app.core.database import SessionLocal, tenant_engine
+from app.models import CatalogChange
+
+log = logging.getLogger("services.catalog_sync")
+
+
+def record_changes(db: Session, skus: Iterable[str]) -> None:
+    """Log changed SKUs inside the caller's transaction (committed with it)."""
+    rows = [{"sku": sku} for sku in set(skus)]
+    if rows:
+        db.execute(insert(CatalogChange), rows)
+
+
+def note_changed(skus: Iterable[str]) -> None:
+    """Log changed SKUs on a connection of their own, for writers that already committed."""
+    rows = [{"sku": sku} for sku in set(skus)]
+    if not rows:
+        return
+    try:
+        with tenant_engine().begin() as conn:
+            conn.execute(insert(CatalogChange), rows)
+    except SQLAlchemyError:
+        log.exception("Could not log %d catalog change(s); other processes see them after their next full reload", len(rows))
+
+
+def head(db: Session) -> int:
+    return db.query(func.max(CatalogChange.id)).scalar() or 0
+
+
+def changed_since(db: Session, after: int, upto: int) -> Set[str]:
+    return {
+        sku for (sku,) in db.query(CatalogChange.sku).filter(CatalogChange.id > after, CatalogChange.id <= upto).distinct()
+    }
+
+
+def purge_changes(db: Session) -> int:
+    """Delete log rows past CATALOG_CHANGES_RETAIN_S (periodic job). Returns rows deleted."""
+    cutoff = datetime.utcnow() - timedelta(seconds=config.CATALOG_CHANGES_RETAIN_S)
+    n = db.query(CatalogChange).filter(CatalogChange.created_at < cutoff).delete(synchronize_session=False)
+    db.commit()
+    return n
+
+
+class SyncedIndex:
+    """
+    Base of the per-process catalog indexes. Subclasses implement
+    load(db) (full build) and refresh(db, skus) (re-read some SKUs, dropping
+    ones that no longer exist).
+    """
+
+    def __init__(self) -> None:
+        self._sync_lock = threading.Lock()
+        self._cursor = 0
+        self._loaded_at = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        raise NotImplementedError
+
+    def load(self, db: Session) -> None:
+        raise NotImplementedError
+
+    def refresh(self, db: Session, skus: Set[str]) -> None:
+        raise NotImplementedError
+
+    def sync(self) -> None:
+        """Bring the index up to date with every process's writes. Reads the primary: replicas may lag the log."""
+        with self._sync_lock, SessionLocal() as db:
+            top = head(db)  # read first: anything logged later is replayed next time
+            if not self.loaded or time.monotonic() - self._loaded_at > config.CATALOG_INDEX_MAX_AGE_S:
+                self.load(db)
+                self._loaded_at = time.monotonic()
+            elif top > self._cursor:
+                skus = changed_since(db, self._cursor, top)
+                if skus:
+                    self.refresh(db, skus)
+            self._cursor = top
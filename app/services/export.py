@@ -0,0 +1,103 @@
+# app/services/export.py
+import csv
+import io
+import json
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.core.database import SessionLocal
+from app.models import Order, OrderItem, OrderStatus
+
+# one row per order line; orders without lines yield one row with empty item columns
+ORDER_COLUMNS = [
+    "order_id", "status", "created_at", "customer_name", "customer_phone",
+    "customer_email", "customer_address", "fulfillment_date", "note", "total_amount", "item_count",
+]
+ITEM_COLUMNS = ["sku", "category_id", "size", "color", "quantity", "unit_price"]
+COLUMNS = ORDER_COLUMNS + ITEM_COLUMNS
+
+CHUNK_ROWS = 1000
+FILE_CHUNK_BYTES = 64 * 1024
+
+
+def iter_order_rows(statuses: Optional[List[OrderStatus]] = None, chunk_rows: int = CHUNK_ROWS) -> Iterator[Dict[str, Any]]:
+    """
+    Stream flat order/line rows from a server-side cursor, oldest first.
+    Opens its own session: the generator outlives the request dependency.
+    """
+    with SessionLocal(read_only=True) as db:
+        q = (
+            db.query(
+                Order.id.label("order_id"), Order.status, Order.created_at,
+                Order.customer_name, Order.customer_phone, Order.customer_email,
+                Order.customer_address, Order.fulfillment_date, Order.note, Order.total_amount, Order.item_count,
+                OrderItem.sku, OrderItem.category_id, OrderItem.size, OrderItem.color,
+                OrderItem.quantity, OrderItem.unit_price,
+            )
+            .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+        )
+        if statuses is not None:
+            q = q.filter(Order.status.in_(statuses))
+        q = q.order_by(Order.created_at, Order.id, OrderItem.id).yield_per(chunk_rows)
+        for row in q:
+            d = row._asdict()
+            d["status"] = getattr(d["status"], "value", d["status"])
+            yield d
+
+
+def _plain(v: Any) -> Any:
+    return v.isoformat() if hasattr(v, "isoformat") else v
+
+
+def stream_csv(rows: Iterator[Dict[str, Any]], chunk_rows: int = CHUNK_ROWS) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(COLUMNS)
+    n = 0
+    for r in rows:
+        writer.writerow([_plain(r[c]) for c in COLUMNS])
+        n += 1
+        if n % chunk_rows == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate(0)
+    yield buf.getvalue()
+
+
+def stream_ndjson(rows: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    """One JSON object per order with its lines nested; relies on rows arriving grouped by order."""
+    current: Optional[Dict[str, Any]] = None
+    for r in rows:
+        if current is None or current["id"] != r["order_id"]:
+            if current is not None:
+                yield json.dumps(current, ensure_ascii=False) + "\n"
+            current = {"id": r["order_id"], **{c: _plain(r[c]) for c in ORDER_COLUMNS[1:]}, "items": []}
+        if r["sku"] is not None:
+            current["items"].append({c: r[c] for c in ITEM_COLUMNS})
+    if current is not None:
+        yield json.dumps(current, ensure_ascii=False) + "\n"
+
+
+def stream_xlsx(rows: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    """
+    XLSX is a zip container, so it cannot be emitted row by row: rows go to a
+    write-only workbook (openpyxl flushes each row to its own temp file instead
+    of keeping cells in memory), saved to a spooled temp file that is then
+    streamed in fixed-size blocks.
+    """
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("orders")
+    ws.append(COLUMNS)
+    for r in rows:
+        ws.append([r[c] for c in COLUMNS])
+
+    with tempfile.TemporaryFile() as tmp:
+        wb.save(tmp)
+        tmp.seek(0)
+        while True:
+            block = tmp.read(FILE_CHUNK_BYTES)
+            if not block:
+                break
+            yield block
@@ -0,0 +1,217 @@
+# app/services/facets.py
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core import config
+from app.core.tenants import TenantLocal
+from app.models import Inventory, ProductVariant
+from app.schemas import FacetQueryOut, VariantOut
+from app.services.catalog_sync import SyncedIndex
+
+FACETS = ("category", "size", "color")
+_INITIAL_CAPACITY = 1024
+
+
+class VariantFacetIndex(SyncedIndex):
+    """
+    Column-oriented facet index over variants: one boolean array per
+    category/size/colour value plus an in-stock array, aligned with a
+    compact SKU array. Filters and facet counts are vectorized AND/OR over
+    those arrays, so a query never touches the database.
+
+    Rows are appended on new SKUs (capacity doubles) and updated in place;
+    removed rows are masked out via `live` until the next full load. Stock
+    and catalog writes of other processes are picked up by sync() (see
+    catalog_sync), so the in-stock bits follow holds and adjustments made
+    anywhere.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._reset(_INITIAL_CAPACITY)
+
+    def _reset(self, capacity: int) -> None:
+        self._n = 0
+        self._cap = capacity
+        self._row: Dict[str, int] = {}
+        self._skus = np.empty(capacity, dtype=object)
+        self._titles = np.empty(capacity, dtype=object)
+        self._live = np.zeros(capacity, dtype=bool)
+        self._in_stock = np.zeros(capacity, dtype=bool)
+        self._attrs: List[Tuple[Optional[str], ...]] = []
+        self._bits: Dict[str, Dict[str, np.ndarray]] = {f: {} for f in FACETS}
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    @staticmethod
+    def _rows(db: Session, skus: Optional[Set[str]] = None) -> list:
+        q = db.query(
+            ProductVariant.sku, ProductVariant.title, ProductVariant.category_id,
+            ProductVariant.size, ProductVariant.color, Inventory.quantity,
+        ).outerjoin(Inventory, Inventory.sku == ProductVariant.sku)
+        if skus is not None:
+            q = q.filter(ProductVariant.sku.in_(list(skus)))
+        return q.all()
+
+    def load(self, db: Session) -> None:
+        rows = self._rows(db)
+        with self._lock:
+            self._reset(max(_INITIAL_CAPACITY, len(rows)))
+            for sku, title, category_id, size, color, qty in rows:
+                self._put(sku, title, (category_id, size, color), (qty or 0) > 0)
+            self._loaded = True
+
+    # ---------- writes ----------
+
+    def _grow(self) -> None:
+        cap = self._cap * 2
+
+        def grown(a: np.ndarray) -> np.ndarray:
+            b = np.zeros(cap, dtype=a.dtype) if a.dtype == bool else np.empty(cap, dtype=a.dtype)
+            b[: self._cap] = a
+            return b
+
+        self._skus, self._titles = grown(self._skus), grown(self._titles)
+        self._live, self._in_stock = grown(self._live), grown(self._in_stock)
+        for values in self._bits.values():
+            for v in values:
+                values[v] = grown(values[v])
+        self._cap = cap
+
+    def _put(self, sku: str, title: str, attrs: Tuple[Optional[str], ...], in_stock: Optional[bool]) -> None:
+        row = self._row.get(sku)
+        if row is None:
+            if self._n == self._cap:
+                self._grow()
+            row = self._row[sku] = self._n
+            self._n += 1
+            self._attrs.append((None,) * len(FACETS))
+        for facet, old, new in zip(FACETS, self._attrs[row], attrs):
+            if old is not None:
+                self._bits[facet][old][row] = False
+            if new is not None:
+                arr = self._bits[facet].get(new)
+                if arr is None:
+                    arr = self._bits[facet][new] = np.zeros(self._cap, dtype=bool)
+                arr[row] = True
+        self._attrs[row] = attrs
+        self._skus[row] = sku
+        self._titles[row] = title
+        self._live[row] = True
+        if in_stock is not None:
+            self._in_stock[row] = in_stock
+
+    def upsert(self, sku: str, title: str, category_id: str, size: Optional[str], color: Optional[str]) -> None:
+        """Reflect a catalog write (no-op until first load; the load will include it)."""
+        if not self._loaded:
+            return
+        with self._lock:
+            self._put(sku, title, (category_id, size, color), None)
+
+    def set_stock(self, levels: Iterable[Tuple[str, int]]) -> None:
+        if not self._loaded:
+            return
+        with self._lock:
+            for sku, qty in levels:
+                row = self._row.get(sku)
+                if row is not None:
+                    self._in_stock[row] = qty > 0
+
+    def remove(self, sku: str) -> None:
+        with self._lock:
+            row = self._row.get(sku)
+            if row is not None:
+                self._live[row] = False
+
+    def refresh(self, db: Session, skus: Set[str]) -> None:
+        """Re-read `skus` (attributes and stock) from the database; ones that no longer exist are masked out."""
+        rows = self._rows(db, skus)
+        with self._lock:
+            for sku, title, category_id, size, color, qty in rows:
+                self._put(sku, title, (category_id, size, color), (qty or 0) > 0)
+            for sku in skus - {r[0] for r in rows}:
+                self.remove(sku)
+
+    # ---------- reads ----------
+
+    def _facet_mask(self, facet: str, values: Optional[List[str]]) -> Optional[np.ndarray]:
+        if not values:
+            return None
+        n = self._n
+        mask = np.zeros(n, dtype=bool)
+        for v in values:
+            arr = self._bits[facet].get(v)
+            if arr is not None:
+                mask |= arr[:n]
+        return mask
+
+    def query(
+        self,
+        category: Optional[List[str]] = None,
+        size: Optional[List[str]] = None,
+        color: Optional[List[str]] = None,
+        in_stock: Optional[bool] = None,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> Tuple[int, List[Tuple[str, str]], Dict[str, Dict[str, int]]]:
+        """
+        OR within a facet, AND across facets. Counts are disjunctive: each
+        facet's counts apply every other active filter but not its own.
+        Returns (total, [(sku, title)] page, counts).
+        """
+        with self._lock:
+            n = self._n
+            live = self._live[:n]
+            masks: Dict[str, Optional[np.ndarray]] = {
+                "category": self._facet_mask("category", category),
+                "size": self._facet_mask("size", size),
+                "color": self._facet_mask("color", color),
+                "in_stock": None if in_stock is None else (self._in_stock[:n] == in_stock),
+            }
+
+            def combined(skip: Optional[str] = None) -> np.ndarray:
+                m = live.copy()
+                for name, mask in masks.items():
+                    if mask is not None and name != skip:
+                        m &= mask
+                return m
+
+            match = combined()
+            rows = np.flatnonzero(match)
+            page = rows[offset:offset + limit]
+
+            counts: Dict[str, Dict[str, int]] = {}
+            for facet in FACETS:
+                base = combined(skip=facet)
+                tally = {v: int(np.count_nonzero(base & arr[:n])) for v, arr in self._bits[facet].items()}
+                counts[facet] = {v: c for v, c in tally.items() if c}
+            base = combined(skip="in_stock")
+            stocked = int(np.count_nonzero(base & self._in_stock[:n]))
+            counts["in_stock"] = {"true": stocked, "false": int(np.count_nonzero(base)) - stocked}
+
+            return len(rows), list(zip(self._skus[page].tolist(), self._titles[page].tolist())), counts
+
+
+# one index per tenant; memory is bounded by TENANT_MAX_CACHED
+facet_index: TenantLocal[VariantFacetIndex] = TenantLocal(VariantFacetIndex, config.TENANT_MAX_CACHED)
+
+
+def query_facets(
+    db: Session,
+    category: Optional[List[str]] = None,
+    size: Optional[List[str]] = None,
+    color: Optional[List[str]] = None,
+    in_stock: Optional[bool] = None,
+    limit: int = 50,
+    offset: int = 0,
+) -> FacetQueryOut:
+    facet_index.sync()
+    total, page, counts = facet_index.query(category, size, color, in_stock, limit, offset)
+    return FacetQueryOut(total=total, items=[VariantOut(id=sku, title=title) for sku, title in page], counts=counts)
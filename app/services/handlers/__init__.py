@@ -1,13 +1,15 @@
 # app/services/handlers/__init__.py
-from typing import Awaitable, Callable, Dict, Optional
+from typing import Awaitable, Callable, Dict, List, Optional
 
 from app.services.handlers.text import handle_text_request
 from app.services.handlers.button import handle_button_request
 from app.services.handlers.location import handle_location_request
 from app.services.handlers.interactive import handle_interactive_request
 
-# Signature: handler(message, user) -> Awaitable[Optional[object]]
-Handler = Callable[[dict, Optional[dict]], Awaitable[Optional[object]]]
+# Signature: handler(message, user, batch) -> Awaitable[Optional[object]]
+# `message` is the sender's latest message of this type; `batch` is every message of
+# this type in the coalesced burst, oldest first (ends with `message`).
+Handler = Callable[[dict, Optional[dict], List[dict]], Awaitable[Optional[object]]]
 
 request_handlers: Dict[str, Handler] = {
     "text": handle_text_request,
@@ -1,7 +1,7 @@
 # app/services/handlers/button.py
-from typing import Optional
+from typing import List, Optional
 
 
-async def handle_button_request(message: dict, user: Optional[dict]):
+async def handle_button_request(message: dict, user: Optional[dict], batch: Optional[List[dict]] = None):
 
     return None
@@ -1,6 +1,40 @@
 # app/services/handlers/interactive.py
-from typing import Optional
+import asyncio
+import logging
+from typing import List, Optional
 
+from app.core.database import note_write
+from app.flows_operations.services import completion
+from app.services.wa import send_text
 
-async def handle_interactive_request(message: dict, user: Optional[dict]):
-    return None
+log = logging.getLogger("services.message_logic")
+
+
+async def handle_interactive_request(message: dict, user: Optional[dict], batch: Optional[List[dict]] = None):
+    """Apply completed flow submissions (nfm_reply) in a burst and confirm back to the sender once."""
+    to_number = message.get("from") or ""
+    msg_id = message.get("id") or ""
+    ops: List[completion.FlowOp] = []
+    errors: List[str] = []
+    for m in batch or [message]:
+        resp = completion.flow_response(m)
+        if resp is None:
+            continue
+        try:
+            parsed = completion.parse_operations(resp)
+        except ValueError as e:
+            log.warning("Invalid flow submission from %s: %s", to_number, e)
+            errors.append(f"❌ Could not process the form: {e}")
+            continue
+        if not parsed:
+            log.debug("nfm_reply without actionable payload: keys=%s", list(resp))
+        ops.extend(parsed)
+    if not ops and not errors:
+        return None
+
+    results = await asyncio.gather(*(completion.flow_writer.submit(op) for op in ops), return_exceptions=True)
+    note_write()  # committed by the shared writer; pin this sender's next flow screens to the primary
+    summary = "\n".join(errors + [completion.describe_result(op, res) for op, res in zip(ops, results)])
+    log.info("Flow submission from %s applied: %s", to_number, summary.replace("\n", " | "))
+    await send_text(to_number, summary, msg_id)
+    return results
@@ -1,7 +1,7 @@
 # app/services/handlers/location.py
-from typing import Optional
+from typing import List, Optional
 
 
-async def handle_location_request(message: dict, user: Optional[dict]):
+async def handle_location_request(message: dict, user: Optional[dict], batch: Optional[List[dict]] = None):
     # handle location payload
     return None
@@ -1,10 +1,38 @@
 # app/services/handlers/text.py
-from app.services.text_router import route_text
+import logging
+from typing import Dict, List, Optional
 
+from app.services.text_router import COMMANDS, route_text
 
-async def handle_text_request(msg: dict) -> None:
-    to_number = msg.get("from") or ""
-    to_number = to_number if to_number.startswith("+") else f"+{to_number}"
-    msg_id = msg.get("id") or ""
-    raw_text = ((msg.get("text") or {}).get("body") or "").strip()
-    await route_text(to_number, msg_id, raw_text)
+log = logging.getLogger("services.message_logic")
+
+
+def _body(msg: dict) -> str:
+    return ((msg.get("text") or {}).get("body") or "").strip()
+
+
+async def handle_text_request(msg: dict, user: Optional[dict] = None, batch: Optional[List[dict]] = None) -> None:
+    """
+    Reply to a burst of texts: every distinct recognised command is answered
+    once, in the order sent (repeats of the same command collapse). Without
+    any command, only the latest text gets the fallback reply; the earlier
+    ones are logged as skipped.
+    """
+    batch = batch or [msg]
+    commands: Dict[str, dict] = {}
+    for m in batch:
+        command = _body(m).lower()
+        if command in COMMANDS:
+            commands.setdefault(command, m)
+    chosen = list(commands.values()) or [msg]
+    answered = {id(m) for m in chosen}
+    skipped = [m for m in batch if id(m) not in answered]
+    if skipped:
+        log.info(
+            "Burst from %s: answering %d, skipped %d text(s): %s",
+            msg.get("from"), len(chosen), len(skipped), ", ".join(repr(_body(m)[:40]) for m in skipped),
+        )
+    for m in chosen:
+        to_number = m.get("from") or ""
+        to_number = to_number if to_number.startswith("+") else f"+{to_number}"
+        await route_text(to_number, m.get("id") or "", _body(m))
@@ -0,0 +1,180 @@
+# app/services/holds.py
+"""
+Stock reservations.
+
+Creating an order moves its units from Inventory.quantity (available stock)
+into StockHold rows with an expiry. Each take is one conditional UPDATE
+(`quantity = quantity - n WHERE quantity >= n`), so concurrent orders for
+the last unit serialize on that SKU's row lock only and exactly one wins.
+Confirming converts holds to sales; cancelling or expiry gives the units back.
+Every change to Inventory.quantity is mirrored in the movement ledger.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from app.core import config
+from app.models import HoldStatus, Inventory, InventoryMovement, StockHold
+from app.services.inventory import ledger_openings, note_stock_levels
+
+log = logging.getLogger("services.holds")
+
+
+def _take(db: Session, sku: str, qty: int) -> Optional[int]:
+    """Decrement available stock if at least qty is there; returns the new level, or None."""
+    row = db.execute(
+        update(Inventory)
+        .where(Inventory.sku == sku, Inventory.quantity >= qty)
+        .values(quantity=Inventory.quantity - qty)
+        .returning(Inventory.quantity),
+        execution_options={"synchronize_session": False},
+    ).first()
+    return None if row is None else row[0]
+
+
+def _give(db: Session, per_sku: Dict[str, int]) -> Dict[str, int]:
+    """Return units to available stock; returns the new levels."""
+    levels: Dict[str, int] = {}
+    for sku in sorted(per_sku):  # stable lock order
+        row = db.execute(
+            update(Inventory)
+            .where(Inventory.sku == sku)
+            .values(quantity=Inventory.quantity + per_sku[sku])
+            .returning(Inventory.quantity),
+            execution_options={"synchronize_session": False},
+        ).first()
+        if row is not None:
+            levels[sku] = row[0]
+    return levels
+
+
+def _ledger(db: Session, per_sku: Dict[str, int], sign: int, action: str, notes: str, levels: Dict[str, int]) -> None:
+    now = datetime.utcnow()
+    before = {sku: levels[sku] - sign * qty for sku, qty in per_sku.items() if sku in levels}
+    rows = ledger_openings(db, before) + [
+        {"sku": sku, "delta": sign * qty, "action": action, "notes": notes, "created_at": now}
+        for sku, qty in per_sku.items()
+        if sku in levels
+    ]
+    if rows:
+        db.execute(insert(InventoryMovement), rows)
+
+
+def _take_all(db: Session, per_sku: Dict[str, int], order_id: str) -> Dict[str, int]:
+    levels: Dict[str, int] = {}
+    for sku in sorted(per_sku):
+        level = _take(db, sku, per_sku[sku])
+        if level is None:
+            raise ValueError(f"Insufficient stock for {sku}")
+        levels[sku] = level
+    _ledger(db, per_sku, -1, "hold", f"order {order_id}", levels)
+    return levels
+
+
+def reserve(db: Session, order_id: str, lines: Iterable[Tuple[str, int]]) -> List[StockHold]:
+    """
+    Hold stock for an order's (sku, quantity) lines inside the caller's
+    transaction. Raises ValueError (nothing held) when any SKU is short; the
+    caller rolls back. SKUs without an inventory row are untracked (the shop
+    never entered stock for them) and are sold without a hold.
+    """
+    per_sku: Dict[str, int] = defaultdict(int)
+    for sku, qty in lines:
+        if qty > 0:
+            per_sku[sku] += qty
+    tracked = {sku for (sku,) in db.query(Inventory.sku).filter(Inventory.sku.in_(list(per_sku)))} if per_sku else set()
+    per_sku = {sku: qty for sku, qty in per_sku.items() if sku in tracked}
+    if not per_sku:
+        return []
+
+    levels = _take_all(db, per_sku, order_id)
+    expires = datetime.utcnow() + timedelta(seconds=config.STOCK_HOLD_TTL_S)
+    holds = [StockHold(order_id=order_id, sku=sku, quantity=qty, expires_at=expires) for sku, qty in per_sku.items()]
+    db.add_all(holds)
+    note_stock_levels(db, levels)
+    return holds
+
+
+def convert(db: Session, order_ids: List[str]) -> None:
+    """
+    Confirmation: live holds become sales. Holds that already lapsed are
+    re-taken from stock; ValueError if that stock is gone.
+    """
+    if not order_ids:
+        return
+    db.execute(
+        update(StockHold)
+        .where(StockHold.order_id.in_(order_ids), StockHold.status == HoldStatus.Held)
+        .values(status=HoldStatus.Converted),
+        execution_options={"synchronize_session": False},
+    )
+    lapsed = (
+        db.query(StockHold)
+        .filter(StockHold.order_id.in_(order_ids), StockHold.status == HoldStatus.Released)
+        .order_by(StockHold.id)
+        .all()
+    )
+    for order_id in sorted({h.order_id for h in lapsed}):
+        mine = [h for h in lapsed if h.order_id == order_id]
+        per_sku: Dict[str, int] = defaultdict(int)
+        for h in mine:
+            per_sku[h.sku] += h.quantity
+        note_stock_levels(db, _take_all(db, per_sku, order_id))
+        for h in mine:
+            h.status = HoldStatus.Converted
+
+
+def release(db: Session, order_ids: List[str], reason: str = "cancelled") -> int:
+    """Cancellation: held or sold units go back to stock. Returns holds released."""
+    if not order_ids:
+        return 0
+    holds = (
+        db.query(StockHold)
+        .filter(StockHold.order_id.in_(order_ids), StockHold.status != HoldStatus.Released)
+        .with_for_update()
+        .all()
+    )
+    return _release(db, holds, reason)
+
+
+def _release(db: Session, holds: List[StockHold], reason: str) -> int:
+    if not holds:
+        return 0
+    per_sku: Dict[str, int] = defaultdict(int)
+    for h in holds:
+        per_sku[h.sku] += h.quantity
+        h.status = HoldStatus.Released
+    levels = _give(db, per_sku)
+    _ledger(db, per_sku, 1, "release", reason, levels)
+    note_stock_levels(db, levels)
+    return len(holds)
+
+
+def sweep_expired(db: Session, batch: Optional[int] = None) -> int:
+    """
+    Release holds past expires_at, oldest first, `batch` per transaction.
+    Rows are locked with SKIP LOCKED so a concurrent confirmation is never
+    overridden and several sweepers can run. Returns holds released.
+    """
+    batch = batch or config.STOCK_HOLD_SWEEP_BATCH
+    released = 0
+    while True:
+        holds = (
+            db.query(StockHold)
+            .filter(StockHold.status == HoldStatus.Held, StockHold.expires_at <= datetime.utcnow())
+            .order_by(StockHold.expires_at, StockHold.id)
+            .limit(batch)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        if not holds:
+            break
+        released += _release(db, holds, "hold expired")
+        db.commit()
+    if released:
+        log.info("Released %d expired stock holds", released)
+    return released
@@ -0,0 +1,164 @@
+# app/services/idempotency.py
+import hashlib
+import json
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core import config
+from app.core.database import upsert_insert
+from app.models import IdempotencyKey
+
+log = logging.getLogger("services.idempotency")
+
+Outcome = Tuple[int, Any]  # (HTTP status, JSON body)
+
+
+class IdempotencyConflict(ValueError):
+    """The key was already used for a different request body."""
+
+
+class IdempotencyInProgress(ValueError):
+    """The original request with this key is still running."""
+
+
+def request_hash(payload: BaseModel) -> str:
+    canonical = json.dumps(payload.model_dump(mode="json"), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _claim(db: Session, scope: str, key: str, rh: str, token: str, now: datetime) -> bool:
+    """Insert the pending row; False when someone else holds the key."""
+    row = {
+        "scope": scope, "key": key, "request_hash": rh, "state": "pending", "owner_token": token,
+        "created_at": now, "expires_at": now + timedelta(seconds=config.IDEMPOTENCY_TTL_S),
+    }
+    dialect_insert = upsert_insert(db.get_bind())
+    try:
+        if dialect_insert is not None:
+            claimed = db.execute(dialect_insert(IdempotencyKey.__table__).on_conflict_do_nothing(), row).rowcount == 1
+        else:
+            db.execute(insert(IdempotencyKey.__table__), row)
+            claimed = True
+        db.commit()  # visible to duplicates before the work starts
+        return claimed
+    except IntegrityError:
+        db.rollback()
+        return False
+
+
+def _take_over(db: Session, row: IdempotencyKey, rh: str, token: str, now: datetime) -> bool:
+    """Re-claim a pending key whose owner went silent (crashed); only one contender wins."""
+    won = (
+        db.query(IdempotencyKey)
+        .filter(
+            IdempotencyKey.scope == row.scope,
+            IdempotencyKey.key == row.key,
+            IdempotencyKey.state == "pending",
+            IdempotencyKey.created_at == row.created_at,
+        )
+        .update({"created_at": now, "request_hash": rh, "owner_token": token}, synchronize_session=False)
+    ) == 1
+    db.commit()
+    return won
+
+
+def _finish(db: Session, scope: str, key: str, token: str, status: int, body: Any) -> bool:
+    """Store the response, only if this claim still owns the key (not taken over meanwhile)."""
+    return db.query(IdempotencyKey).filter(
+        IdempotencyKey.scope == scope,
+        IdempotencyKey.key == key,
+        IdempotencyKey.state == "pending",
+        IdempotencyKey.owner_token == token,
+    ).update(
+        {"state": "done", "response_status": status, "response_body": json.dumps(body)}, synchronize_session=False
+    ) == 1
+
+
+def _acquire(db: Session, scope: str, key: str, rh: str, token: str) -> Optional[Outcome]:
+    """Own the key under `token` (returns None), or return the stored outcome of a finished run."""
+    deadline = time.monotonic() + config.IDEMPOTENCY_WAIT_S
+    delay = 0.02
+    while True:
+        now = datetime.utcnow()
+        row = db.get(IdempotencyKey, (scope, key), populate_existing=True)
+        if row is not None and row.expires_at <= now:
+            db.delete(row)
+            db.commit()
+            row = None
+        if row is None:
+            if _claim(db, scope, key, rh, token, now):
+                return None
+            continue
+        if row.request_hash != rh:
+            raise IdempotencyConflict("Idempotency-Key was already used with a different request")
+        if row.state == "done":
+            log.info("Replayed %s key=%s -> %s", scope, key, row.response_status)
+            return row.response_status, json.loads(row.response_body)
+        if row.created_at <= now - timedelta(seconds=config.IDEMPOTENCY_STALE_S) and _take_over(db, row, rh, token, now):
+            log.warning("Took over stale %s key=%s", scope, key)
+            return None
+        if time.monotonic() >= deadline:
+            raise IdempotencyInProgress("A request with this Idempotency-Key is still being processed")
+        db.rollback()  # end the read transaction so the next poll sees the original's commit
+        time.sleep(delay)
+        delay = min(delay * 2, 0.25)
+
+
+def run_once(db: Session, scope: str, key: str, payload: BaseModel, work: Callable[[], Outcome]) -> Tuple[int, Any, bool]:
+    """
+    Run work() at most once per (scope, key) and return (status, body, replayed).
+
+    A completed key is answered from its stored response with one primary-key
+    lookup. A duplicate of a request still in flight polls that row until the
+    original finishes (IDEMPOTENCY_WAIT_S, then IdempotencyInProgress); the
+    poll sleeps in the caller's thread, i.e. holds a threadpool worker for a
+    sync endpoint. Reusing a key for a different body raises IdempotencyConflict.
+
+    work() must not commit: its writes and the stored response are committed
+    together, so a crash can never leave the work applied without its record.
+    Each claim carries a token and only the current owner can store the
+    response; an original that was taken over after IDEMPOTENCY_STALE_S
+    (still alive, just slow) rolls its work back and replays the winner's.
+    Outcomes with status >= 400 roll the work back and are stored as-is;
+    exceptions release the key so the client can retry.
+    """
+    if not key or len(key) > 255:
+        raise ValueError("Idempotency-Key must be 1-255 characters")
+    rh = request_hash(payload)
+    while True:
+        token = uuid.uuid4().hex
+        stored = _acquire(db, scope, key, rh, token)
+        if stored is not None:
+            return stored[0], stored[1], True
+
+        try:
+            status, body = work()
+        except Exception:
+            db.rollback()
+            db.query(IdempotencyKey).filter(
+                IdempotencyKey.scope == scope, IdempotencyKey.key == key, IdempotencyKey.owner_token == token
+            ).delete()
+            db.commit()
+            raise
+        if status >= 400:
+            db.rollback()
+        if _finish(db, scope, key, token, status, body):
+            db.commit()
+            return status, body, False
+        db.rollback()
+        log.warning("Lost %s key=%s to a takeover; discarded this run", scope, key)
+
+
+def purge_expired(db: Session) -> int:
+    """Delete keys past their TTL (periodic job). Returns rows deleted."""
+    n = db.query(IdempotencyKey).filter(IdempotencyKey.expires_at < datetime.utcnow()).delete(synchronize_session=False)
+    db.commit()
+    return n
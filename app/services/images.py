@@ -0,0 +1,158 @@
+# app/services/images.py
+import asyncio
+import contextlib
+import hashlib
+import logging
+import multiprocessing
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core import config
+from app.models import ProductVariant, VariantImage
+from app.schemas import VariantImageOut
+from app.utils import imaging
+
+log = logging.getLogger("services.images")
+
+# name -> longest edge in px. Changing a size changes the file names, so old renditions are never served stale.
+RENDITIONS: Dict[str, int] = {"thumb": 320, "whatsapp": 1024}
+
+_KEY_RE = re.compile(r"^[0-9a-f]{64}-[a-z]+\d+\.jpg$")
+
+_pool: Optional[ProcessPoolExecutor] = None
+_inflight: Dict[str, "asyncio.Future[None]"] = {}
+
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn, not fork: forking a process that holds DB pools, sockets and
+        # background threads can deadlock or share connections with the child
+        _pool = ProcessPoolExecutor(max_workers=max(1, config.IMAGE_WORKERS), mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _sharded(kind: str, name: str) -> str:
+    """MEDIA_DIR/<kind>/<first 2 hex chars>/<name>; keeps directories small."""
+    d = os.path.join(config.MEDIA_DIR, kind, name[:2])
+    os.makedirs(d, exist_ok=True)
+    return os.path.join(d, name)
+
+
+def rendition_key(source_sha256: str, name: str) -> str:
+    return f"{source_sha256}-{name}{RENDITIONS[name]}.jpg"
+
+
+def rendition_path(key: str) -> Optional[str]:
+    """Path of an existing rendition file, or None (also for keys that are not ours)."""
+    if not _KEY_RE.match(key):
+        return None
+    path = os.path.join(config.MEDIA_DIR, "renditions", key[:2], key)
+    return path if os.path.isfile(path) else None
+
+
+def rendition_url(key: str) -> str:
+    return f"{config.BASE_URL}/products/images/{key}"
+
+
+def _store_source(raw: bytes, digest: str) -> str:
+    path = _sharded("sources", digest)
+    if not os.path.exists(path):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(raw)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+    return path
+
+
+async def _ensure_rendition(src_path: str, source_sha256: str, name: str) -> str:
+    """Render once: an existing file is reused and concurrent requests for the same key share one job."""
+    key = rendition_key(source_sha256, name)
+    dest = _sharded("renditions", key)
+    if os.path.exists(dest):
+        return key
+    fut = _inflight.get(key)
+    if fut is None:
+        loop = asyncio.get_running_loop()
+        fut = _inflight[key] = asyncio.ensure_future(
+            loop.run_in_executor(_executor(), imaging.render, src_path, dest, RENDITIONS[name], config.IMAGE_JPEG_QUALITY)
+        )
+        fut.add_done_callback(lambda _: _inflight.pop(key, None))
+        log.info("Rendering %s", key)
+    await asyncio.shield(fut)
+    return key
+
+
+def image_out(img: VariantImage) -> VariantImageOut:
+    return VariantImageOut(
+        sku=img.sku,
+        source_sha256=img.source_sha256,
+        width=img.width,
+        height=img.height,
+        renditions={name: rendition_url(rendition_key(img.source_sha256, name)) for name in RENDITIONS},
+    )
+
+
+def get_variant_image(db: Session, sku: str) -> VariantImageOut:
+    img = db.get(VariantImage, sku)
+    if img is None:
+        raise ValueError("Image not found")
+    return image_out(img)
+
+
+def _variant_exists(db: Session, sku: str) -> bool:
+    return db.get(ProductVariant, sku) is not None
+
+
+def _record_image(db: Session, sku: str, digest: str, width: int, height: int) -> VariantImageOut:
+    img = db.get(VariantImage, sku)
+    if img is None:
+        img = VariantImage(sku=sku)
+        db.add(img)
+    img.source_sha256, img.width, img.height = digest, width, height
+    db.commit()
+    return image_out(img)
+
+
+async def save_variant_image(db: Session, sku: str, raw: bytes) -> VariantImageOut:
+    """
+    Store an uploaded photo for a variant and make sure all renditions exist.
+    Decoding and resizing run in the process pool, DB calls and file writes in
+    threads; the event loop only hashes the upload. Raises ValueError for
+    unknown SKUs or bad images.
+    """
+    if not await asyncio.to_thread(_variant_exists, db, sku):
+        raise ValueError("Variant not found")
+    if not raw:
+        raise ValueError("Empty image")
+
+    digest = hashlib.sha256(raw).hexdigest()
+    src_path = await asyncio.to_thread(_store_source, raw, digest)
+    loop = asyncio.get_running_loop()
+    try:
+        width, height, fmt = await loop.run_in_executor(_executor(), imaging.probe, src_path)
+    except ValueError:
+        with contextlib.suppress(FileNotFoundError):  # a concurrent upload of the same bytes may have removed it
+            os.remove(src_path)  # same bytes can never become valid, don't keep them
+        raise
+    await asyncio.gather(*(_ensure_rendition(src_path, digest, name) for name in RENDITIONS))
+
+    out = await asyncio.to_thread(_record_image, db, sku, digest, width, height)
+    log.info("Variant image set | sku=%s sha=%s %dx%d %s", sku, digest[:12], width, height, fmt)
+    return out
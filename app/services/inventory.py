@@ -1,30 +1,218 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import event, func, insert
 from sqlalchemy.orm import Session
-from app.models import Inventory, ProductVariant
+from app.core import config
+from app.core.database import RoutingSession
+from app.models import HoldStatus, Inventory, InventoryMovement, InventorySnapshot, ProductVariant, StockHold
 from app.schemas import InventoryAdjustmentIn, InventoryOut
+from app.services import low_stock
+from app.services.catalog_sync import note_changed
+from app.services.facets import facet_index
 
+ACTIONS = ("add", "remove", "set")
 
-def adjust_inventory(db: Session, adj: InventoryAdjustmentIn) -> InventoryOut:
-    if not adj.sku:
-        raise ValueError("sku is required for inventory adjustment")
+# created_at of "opening" movements: a level recorded when a SKU first enters
+# the ledger already existed before it, so stock_at reports it for any past date.
+OPENING_AT = datetime(1970, 1, 1)
+
+
+def _next_quantity(current: int, action: str, qty: int) -> int:
+    if action == "add":
+        return current + qty
+    if action == "remove":
+        return max(0, current - qty)
+    if action == "set":
+        return max(0, qty)
+    raise ValueError("Invalid action")
 
-    variant = db.query(ProductVariant).get(adj.sku)
-    if not variant:
+
+def apply_adjustments(
+    db: Session,
+    adjustments: Sequence[InventoryAdjustmentIn],
+    commit: bool = True,
+) -> List[InventoryOut]:
+    """
+    Apply adjustments in order: one read of the affected snapshot rows, one
+    bulk insert into the movement ledger, one update per touched SKU.
+    Returns the resulting level per adjustment.
+
+    Inventory.quantity is *available* stock: units held for unconfirmed
+    orders are not in it. "set" takes the counted on-hand quantity and nets
+    off live holds, so releasing or sweeping them later does not add those
+    units a second time. The Inventory row stays the materialized level (and
+    its lock serializes writers of a SKU): holds take stock with a conditional
+    UPDATE on it, which a level summed from the ledger could not guard.
+    """
+    for adj in adjustments:
+        if not adj.sku:
+            raise ValueError("sku is required for inventory adjustment")
+        if adj.action not in ACTIONS:
+            raise ValueError("Invalid action")
+    skus = sorted({adj.sku for adj in adjustments})
+    if not skus:
+        return []
+
+    known = {sku for (sku,) in db.query(ProductVariant.sku).filter(ProductVariant.sku.in_(skus))}
+    if len(known) != len(skus):
         raise ValueError("Unknown sku")
 
-    inv = db.query(Inventory).get(adj.sku)
-    if not inv:
-        inv = Inventory(sku=adj.sku, quantity=0)
-        db.add(inv)
-
-    if adj.action == "add":
-        inv.quantity += adj.qty
-    elif adj.action == "remove":
-        inv.quantity = max(0, inv.quantity - adj.qty)
-    elif adj.action == "set":
-        inv.quantity = max(0, adj.qty)
+    # lock snapshot rows in a stable order (no-op on SQLite)
+    rows: Dict[str, Inventory] = {
+        inv.sku: inv
+        for inv in db.query(Inventory).filter(Inventory.sku.in_(skus)).order_by(Inventory.sku).with_for_update()
+    }
+    in_ledger = {
+        sku for (sku,) in db.query(InventoryMovement.sku).filter(InventoryMovement.sku.in_(skus)).distinct()
+    }
+
+    held: Dict[str, int] = {}
+    if any(adj.action == "set" for adj in adjustments):
+        held = dict(
+            db.query(StockHold.sku, func.sum(StockHold.quantity))
+            .filter(StockHold.sku.in_(skus), StockHold.status == HoldStatus.Held)
+            .group_by(StockHold.sku)
+        )
+
+    now = datetime.utcnow()
+    movements: List[dict] = []
+    for sku in skus:
+        inv = rows.get(sku)
+        if inv is None:
+            inv = rows[sku] = Inventory(sku=sku, quantity=0)
+            db.add(inv)
+        elif sku not in in_ledger and inv.quantity:
+            # level predates the ledger: record it so history sums add up
+            movements.append({"sku": sku, "delta": inv.quantity, "action": "opening", "notes": None, "created_at": OPENING_AT})
+
+    out: List[InventoryOut] = []
+    for adj in adjustments:
+        inv = rows[adj.sku]
+        new_qty = _next_quantity(inv.quantity, adj.action, adj.qty)
+        if adj.action == "set":
+            new_qty = max(0, new_qty - held.get(adj.sku, 0))
+        movements.append({
+            "sku": adj.sku,
+            "delta": new_qty - inv.quantity,
+            "action": adj.action,
+            "notes": adj.notes,
+            "created_at": now,
+        })
+        inv.quantity = new_qty
+        out.append(InventoryOut(sku=adj.sku, quantity=new_qty))
+
+    db.execute(insert(InventoryMovement), movements)
+    if commit:
+        db.commit()
+        stock_changed(db, {sku: inv.quantity for sku, inv in rows.items()})
     else:
-        raise ValueError("Invalid action")
+        db.flush()
+    return out
+
+
+def stock_changed(db: Session, levels: Dict[str, int]) -> None:
+    """Post-commit hook for every stock write path; receives only the SKUs that changed."""
+    facet_index.set_stock(levels.items())
+    note_changed(levels)  # other processes' facet indexes replay this
+    low_stock.note_levels(levels)
+
+
+def note_stock_levels(db: Session, levels: Dict[str, int]) -> None:
+    """
+    For writers that do not own the commit (holds taken inside create_order):
+    stock_changed runs with these levels when the session commits, and is
+    skipped if it rolls back.
+    """
+    db.info.setdefault("stock_levels", {}).update(levels)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _stock_committed(session: Session) -> None:
+    levels = session.info.pop("stock_levels", None)
+    if levels:
+        stock_changed(session, levels)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _stock_rolled_back(session: Session) -> None:
+    session.info.pop("stock_levels", None)
+
+
+def ledger_openings(db: Session, levels_before: Dict[str, int]) -> List[dict]:
+    """Opening movements (at OPENING_AT) for SKUs whose level predates the ledger, so history sums add up."""
+    if not levels_before:
+        return []
+    in_ledger = {
+        sku for (sku,) in db.query(InventoryMovement.sku).filter(InventoryMovement.sku.in_(list(levels_before))).distinct()
+    }
+    return [
+        {"sku": sku, "delta": qty, "action": "opening", "notes": None, "created_at": OPENING_AT}
+        for sku, qty in levels_before.items()
+        if sku not in in_ledger and qty
+    ]
+
+
+def adjust_inventory(db: Session, adj: InventoryAdjustmentIn) -> InventoryOut:
+    return apply_adjustments(db, [adj])[0]
+
+
+def stock_at(db: Session, sku: str, at: datetime) -> int:
+    """
+    Stock level of `sku` as of `at`: latest snapshot at or before `at` plus the
+    movements after it. Work is bounded by the compaction interval.
+    """
+    snap: Optional[InventorySnapshot] = (
+        db.query(InventorySnapshot)
+        .filter(InventorySnapshot.sku == sku, InventorySnapshot.as_of <= at)
+        .order_by(InventorySnapshot.as_of.desc())
+        .first()
+    )
+    q = db.query(func.coalesce(func.sum(InventoryMovement.delta), 0)).filter(
+        InventoryMovement.sku == sku, InventoryMovement.created_at <= at
+    )
+    if snap:
+        q = q.filter(InventoryMovement.created_at > snap.as_of)
+    return (snap.quantity if snap else 0) + int(q.scalar() or 0)
+
+
+def compact_inventory(db: Session, cutoff: Optional[datetime] = None) -> int:
+    """
+    Write a snapshot at `cutoff` for every SKU with movements since its last
+    snapshot. Returns the number of snapshots written.
+
+    The cutoff is never later than now - INVENTORY_COMPACTION_GRACE_S:
+    stock_at skips movements at or before a snapshot, so one stamped before
+    the cutoff but committed after the snapshot would be lost for good.
+    """
+    latest = datetime.utcnow() - timedelta(seconds=config.INVENTORY_COMPACTION_GRACE_S)
+    cutoff = min(cutoff, latest) if cutoff else latest
+    last = (
+        db.query(InventorySnapshot.sku, func.max(InventorySnapshot.as_of).label("as_of"))
+        .group_by(InventorySnapshot.sku)
+        .subquery()
+    )
+    pending = (
+        db.query(InventoryMovement.sku, func.sum(InventoryMovement.delta))
+        .outerjoin(last, last.c.sku == InventoryMovement.sku)
+        .filter(InventoryMovement.created_at <= cutoff)
+        .filter((last.c.as_of.is_(None)) | (InventoryMovement.created_at > last.c.as_of))
+        .group_by(InventoryMovement.sku)
+        .all()
+    )
+    if not pending:
+        return 0
 
+    skus = [sku for sku, _ in pending]
+    base = dict(
+        db.query(InventorySnapshot.sku, InventorySnapshot.quantity)
+        .join(last, (last.c.sku == InventorySnapshot.sku) & (last.c.as_of == InventorySnapshot.as_of))
+        .filter(InventorySnapshot.sku.in_(skus))
+        .all()
+    )
+    db.execute(
+        insert(InventorySnapshot),
+        [{"sku": sku, "as_of": cutoff, "quantity": base.get(sku, 0) + int(delta or 0)} for sku, delta in pending],
+    )
     db.commit()
-    db.refresh(inv)
-    return InventoryOut(sku=inv.sku, quantity=inv.quantity)
+    return len(pending)
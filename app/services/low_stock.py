@@ -0,0 +1,232 @@
+# app/services/low_stock.py
+"""
+Incremental low-stock alerting.
+
+Stock write paths report the SKUs they changed (inventory.stock_changed ->
+note_levels); nothing ever scans the inventory table. Levels are coalesced
+per SKU in low_stock_pending until the next digest, so a restart between a
+stock write and the digest loses nothing. The digest checks only those SKUs
+against their reorder thresholds and sends the owner one WhatsApp message
+with every SKU that newly fell to its threshold. A SKU is reported once per
+dip: its low_stock_alerts row suppresses repeats and is cleared when stock
+recovers.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+from sqlalchemy import and_, bindparam, insert, or_, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core import config
+from app.core.database import SessionLocal, tenant_engine, upsert_insert
+from app.core.tenants import current_tenant
+from app.models import Inventory, LowStockAlert, LowStockPending, ProductVariant, ReorderThreshold
+from app.schemas import LowStockOut, ReorderThresholdIn
+from app.services.wa import send_text
+
+log = logging.getLogger("services.low_stock")
+
+Low = Tuple[str, str, int, int]  # (sku, title, level, threshold)
+
+_MAX_DIGEST_CHARS = 4000  # WhatsApp text bodies stop at 4096
+
+_pending = LowStockPending.__table__
+
+
+def _queue(conn: Connection, levels: Dict[str, int], overwrite: bool) -> None:
+    """Upsert pending levels; with overwrite=False SKUs already pending keep their (newer) level."""
+    now = datetime.utcnow()
+    rows = [{"sku": sku, "level": level, "noted_at": now} for sku, level in levels.items()]
+    dialect_insert = upsert_insert(conn)
+    if dialect_insert is not None:
+        stmt = dialect_insert(_pending)
+        if overwrite:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[_pending.c.sku], set_={"level": stmt.excluded.level, "noted_at": stmt.excluded.noted_at}
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing()
+        conn.execute(stmt, rows)
+        return
+    known = set(conn.execute(select(_pending.c.sku).where(_pending.c.sku.in_(list(levels)))).scalars())
+    if overwrite and known:
+        conn.execute(
+            update(_pending).where(_pending.c.sku == bindparam("b_sku")).values(level=bindparam("level"), noted_at=bindparam("noted_at")),
+            [{"b_sku": r["sku"], "level": r["level"], "noted_at": r["noted_at"]} for r in rows if r["sku"] in known],
+        )
+    fresh = [r for r in rows if r["sku"] not in known]
+    if fresh:
+        conn.execute(insert(_pending), fresh)
+
+
+def note_levels(levels: Dict[str, int], overwrite: bool = True) -> None:
+    """
+    Record the latest level of changed SKUs for the next digest. Uses its own
+    connection, so it also works from post-commit hooks.
+    """
+    if not levels:
+        return
+    try:
+        with tenant_engine().begin() as conn:
+            _queue(conn, levels, overwrite)
+    except SQLAlchemyError:
+        log.exception("Could not queue %d SKU(s) for the low-stock digest", len(levels))
+
+
+# ---------- thresholds ----------
+
+
+def thresholds_for(db: Session, skus: List[str]) -> Dict[str, Tuple[str, int]]:
+    """{sku: (title, threshold)} for the SKUs that have a reorder point (SKU row, else category row, else default)."""
+    variants = {
+        sku: (title, category_id)
+        for sku, title, category_id in db.query(ProductVariant.sku, ProductVariant.title, ProductVariant.category_id)
+        .filter(ProductVariant.sku.in_(skus))
+    }
+    if not variants:
+        return {}
+    categories = {c for _, c in variants.values()}
+    rules = {
+        (kind, ref): threshold
+        for kind, ref, threshold in db.query(ReorderThreshold.kind, ReorderThreshold.ref, ReorderThreshold.threshold).filter(
+            or_(
+                and_(ReorderThreshold.kind == "sku", ReorderThreshold.ref.in_(list(variants))),
+                and_(ReorderThreshold.kind == "category", ReorderThreshold.ref.in_(list(categories))),
+            )
+        )
+    }
+    out: Dict[str, Tuple[str, int]] = {}
+    for sku, (title, category_id) in variants.items():
+        threshold = rules.get(("sku", sku), rules.get(("category", category_id), config.REORDER_DEFAULT_THRESHOLD))
+        if threshold > 0:
+            out[sku] = (title, threshold)
+    return out
+
+
+def set_threshold(db: Session, rule: ReorderThresholdIn) -> ReorderThresholdIn:
+    """
+    Upsert a reorder point (0 switches alerts off for that SKU/category) and
+    queue the affected SKUs' current levels, so SKUs already below the new
+    point are reported in the next digest.
+    """
+    if rule.kind == "sku":
+        if db.get(ProductVariant, rule.ref) is None:
+            raise ValueError("Unknown sku")
+        skus = [rule.ref]
+    else:
+        skus = [sku for (sku,) in db.query(ProductVariant.sku).filter(ProductVariant.category_id == rule.ref)]
+        if not skus:
+            raise ValueError("Unknown category")
+    row = db.get(ReorderThreshold, (rule.kind, rule.ref))
+    if row is None:
+        db.add(ReorderThreshold(kind=rule.kind, ref=rule.ref, threshold=rule.threshold))
+    else:
+        row.threshold = rule.threshold
+    db.commit()
+    levels = dict.fromkeys(skus, 0)
+    levels.update(dict(db.query(Inventory.sku, Inventory.quantity).filter(Inventory.sku.in_(skus))))
+    note_levels(levels)
+    return rule
+
+
+def list_low_stock(db: Session) -> List[LowStockOut]:
+    rows = db.query(LowStockAlert).order_by(LowStockAlert.alerted_at.desc(), LowStockAlert.sku).all()
+    return [LowStockOut(sku=a.sku, level=a.level, threshold=a.threshold, alerted_at=a.alerted_at) for a in rows]
+
+
+# ---------- digest ----------
+
+
+def _in_session(fn: Callable[..., Any], *args: Any) -> Any:
+    with SessionLocal() as db:
+        return fn(db, *args)
+
+
+def evaluate(db: Session, levels: Dict[str, int]) -> List[Low]:
+    """
+    Check the changed SKUs against their thresholds: record newly low ones,
+    refresh ones already reported, clear recovered ones. Returns the new ones.
+    """
+    skus = list(levels)
+    rules = thresholds_for(db, skus)
+    alerts = {a.sku: a for a in db.query(LowStockAlert).filter(LowStockAlert.sku.in_(skus))}
+    fresh: List[Low] = []
+    for sku, level in levels.items():
+        alert = alerts.get(sku)
+        if sku in rules and level <= rules[sku][1]:
+            title, threshold = rules[sku]
+            if alert is None:
+                db.add(LowStockAlert(sku=sku, level=level, threshold=threshold, alerted_at=datetime.utcnow()))
+                fresh.append((sku, title, level, threshold))
+            else:
+                alert.level, alert.threshold = level, threshold
+        elif alert is not None:
+            db.delete(alert)
+    try:
+        db.commit()
+    except IntegrityError:
+        # another process reported the same SKUs first
+        db.rollback()
+        return []
+    return fresh
+
+
+def evaluate_pending(db: Session) -> List[Low]:
+    """
+    evaluate() the pending SKUs and drain them in the same transaction. A SKU
+    noted again meanwhile has a newer noted_at, so it stays for the next run.
+    """
+    taken = db.execute(select(_pending.c.sku, _pending.c.level, _pending.c.noted_at)).all()
+    if not taken:
+        return []
+    db.execute(
+        _pending.delete().where(and_(_pending.c.sku == bindparam("b_sku"), _pending.c.noted_at == bindparam("b_noted_at"))),
+        [{"b_sku": sku, "b_noted_at": noted_at} for sku, _, noted_at in taken],
+    )
+    return evaluate(db, {sku: level for sku, level, _ in taken})
+
+
+def _forget(db: Session, skus: List[str]) -> None:
+    db.query(LowStockAlert).filter(LowStockAlert.sku.in_(skus)).delete(synchronize_session=False)
+    db.commit()
+
+
+def digest_text(lows: List[Low]) -> str:
+    lines = [f"⚠️ Low stock: {len(lows)} item(s) at or below reorder level"]
+    used = len(lines[0])
+    for i, (sku, title, level, threshold) in enumerate(sorted(lows, key=lambda x: (x[2], x[0]))):
+        line = f"• {title} ({sku}): {level} left, reorder at {threshold}"
+        if used + len(line) + 40 > _MAX_DIGEST_CHARS:
+            lines.append(f"…and {len(lows) - i} more (GET /inventory/low-stock)")
+            break
+        lines.append(line)
+        used += len(line) + 1
+    return "\n".join(lines)
+
+
+async def send_digest() -> int:
+    """
+    One digest for the current tenant: evaluate the SKUs changed since the
+    last run and message the owner about newly low ones. If the send fails
+    those SKUs are un-reported and queued again (unless a newer level was
+    noted meanwhile), so they are retried next time. Returns SKUs reported.
+    """
+    lows: List[Low] = await asyncio.to_thread(_in_session, evaluate_pending)
+    if not lows:
+        return 0
+    owner = current_tenant().owner_number
+    if not owner:
+        log.warning("%d SKU(s) low on stock but no owner number configured", len(lows))
+        return len(lows)
+    ok, info = await send_text(owner, digest_text(lows))
+    if not ok:
+        log.warning("Low-stock digest failed (%s); retrying next run", info[:200])
+        await asyncio.to_thread(_in_session, _forget, [sku for sku, *_ in lows])
+        await asyncio.to_thread(note_levels, {sku: level for sku, _, level, _ in lows}, False)
+        return 0
+    log.info("Low-stock digest sent | skus=%d", len(lows))
+    return len(lows)
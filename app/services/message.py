@@ -1,14 +1,136 @@
 # app/services/message.py
+import asyncio
 import logging
-from typing import Any, Dict, Set
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
 from app.core import config
+from app.core.database import set_caller
+from app.core.tenants import Tenant, resolve_phone_number_id, set_tenant, use_tenant
+from app.services import wa
 from app.services.handlers import request_handlers
+from app.services.message_status import ingest_statuses
 from app.utils.datetime import now_ms_ist, now_str_ist
 
 log = logging.getLogger("services.message_logic")
 _seen_message_ids: Set[str] = set()
 
 
+class _Burst:
+    __slots__ = ("tenant", "messages", "user", "first", "last")
+
+    def __init__(self, tenant: Tenant) -> None:
+        self.tenant = tenant
+        self.messages: List[dict] = []
+        self.user: Optional[dict] = None
+        self.first = self.last = time.monotonic()
+
+
+_bursts: Dict[Tuple[str, str], _Burst] = {}  # (tenant id, sender) -> pending burst
+_flushers: Set[asyncio.Task] = set()
+
+
+async def _dispatch(tenant: Tenant, sender: str, messages: List[dict], user: Optional[dict]) -> None:
+    """
+    Handle one sender's burst: a single read receipt for the latest message
+    (it marks the earlier ones read too), then one handler call per message
+    type with the latest message of that type and the whole typed batch.
+    """
+    # runs in its own task: the context is discarded afterwards
+    set_tenant(tenant)
+    set_caller(sender)
+    by_type: Dict[str, List[dict]] = {}
+    for msg in messages:
+        by_type.setdefault(msg.get("type"), []).append(msg)
+
+    async def run_handlers() -> None:
+        with wa.suppress_receipts():
+            for msg_type, batch in by_type.items():
+                try:
+                    await request_handlers[msg_type](batch[-1], user, batch)
+                except Exception:
+                    log.exception("Handler for %s failed (sender=%s, batch=%d)", msg_type, sender, len(batch))
+
+    latest_id = messages[-1].get("id")
+    if len(messages) > 1:
+        log.info("Coalesced %d messages from %s", len(messages), sender)
+    if latest_id:
+        await asyncio.gather(wa.send_read_receipt(latest_id), run_handlers())
+    else:
+        await run_handlers()
+
+
+async def _flush_later(key: Tuple[str, str]) -> None:
+    window = config.INBOUND_DEBOUNCE_MS / 1000
+    cap = config.INBOUND_DEBOUNCE_MAX_MS / 1000
+    burst = _bursts[key]
+    try:
+        while True:
+            due = min(burst.last + window, burst.first + cap)
+            delay = due - time.monotonic()
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+    finally:
+        _bursts.pop(key, None)  # even if cancelled: the sender's next message starts a new burst
+    # fire-and-forget task: nobody awaits it, so failures are logged here
+    try:
+        await _dispatch(burst.tenant, key[1], burst.messages, burst.user)
+    except Exception:
+        log.exception("Dispatch of %d message(s) from %s failed (tenant=%s)", len(burst.messages), key[1], key[0])
+
+
+async def _enqueue(tenant: Tenant, sender: str, msg: dict, user: Optional[dict]) -> None:
+    if config.INBOUND_DEBOUNCE_MS <= 0:
+        await _dispatch(tenant, sender, [msg], user)
+        return
+    key = (tenant.id, sender)
+    burst = _bursts.get(key)
+    if burst is None:
+        burst = _bursts[key] = _Burst(tenant)
+        task = asyncio.get_running_loop().create_task(_flush_later(key), name=f"burst:{tenant.id}:{sender}")
+        _flushers.add(task)
+        task.add_done_callback(_flushers.discard)
+    burst.messages.append(msg)
+    burst.user = user or burst.user
+    burst.last = time.monotonic()
+
+
+async def drain_bursts() -> None:
+    """Handle bursts still inside their debounce window (shutdown)."""
+    await asyncio.gather(*list(_flushers), return_exceptions=True)
+
+
+async def _handle_change(tenant: Tenant, value: Dict[str, Any]) -> None:
+    if value.get("statuses"):
+        log.debug("Buffered %d message statuses", ingest_statuses(value))
+    contacts = {c.get("wa_id"): c for c in value.get("contacts", []) or [] if isinstance(c, dict)}
+    for msg in value.get("messages", []) or []:
+        msg_id = msg.get("id")
+        if msg_id and msg_id in _seen_message_ids:
+            continue
+        if msg_id:
+            _seen_message_ids.add(msg_id)
+
+        from_raw = msg.get("from")
+        if not from_raw:
+            continue
+        from_number = from_raw if from_raw.startswith("+") else f"+{from_raw}"
+
+        # optional allow-list
+        if getattr(config, "TARGET_WA_NUMBER", "") and from_number != config.TARGET_WA_NUMBER:
+            continue
+
+        # -------- route by WhatsApp message type --------
+        msg_type = msg.get("type")
+        if msg_type not in request_handlers:
+            # unknown/unsupported type → ignore or log
+            log.debug(f"Unhandled message type: {msg_type}")
+            continue
+
+        # Coalesce per sender; handlers get the latest message of each type plus the batch
+        await _enqueue(tenant, from_number, msg, contacts.get(from_raw))
+
+
 async def handle_webhook_event(body: Dict[str, Any]) -> None:
     recv_ts = now_ms_ist()
     log.info(f"[RECV] {recv_ts} ms | IST={now_str_ist()}")
@@ -16,29 +138,10 @@ async def handle_webhook_event(body: Dict[str, Any]) -> None:
     for entry in body.get("entry", []):
         for change in entry.get("changes", []):
             value = change.get("value", {}) or {}
-            for msg in value.get("messages", []) or []:
-                msg_id = msg.get("id")
-                if msg_id and msg_id in _seen_message_ids:
-                    continue
-                if msg_id:
-                    _seen_message_ids.add(msg_id)
-
-                from_raw = msg.get("from")
-                if not from_raw:
-                    continue
-                from_number = from_raw if from_raw.startswith("+") else f"+{from_raw}"
-
-                # optional allow-list
-                if getattr(config, "TARGET_WA_NUMBER", "") and from_number != config.TARGET_WA_NUMBER:
-                    continue
-
-                # -------- route by WhatsApp message type --------
-                msg_type = msg.get("type")
-                handler = request_handlers.get(msg_type)
-                if not handler:
-                    # unknown/unsupported type → ignore or log
-                    log.debug(f"Unhandled message type: {msg_type}")
-                    continue
-
-                # Pass the whole msg; the type handler decides what to do next
-                await handler(msg)
+            phone_number_id = (value.get("metadata") or {}).get("phone_number_id")
+            tenant = resolve_phone_number_id(phone_number_id)
+            if tenant is None:
+                log.warning("Webhook for unknown phone_number_id=%s ignored", phone_number_id)
+                continue
+            with use_tenant(tenant):
+                await _handle_change(tenant, value)
@@ -0,0 +1,90 @@
+# app/services/message_status.py
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.core import config
+from app.core.database import upsert_insert
+from app.models import MessageStatus
+from app.services.batch_writer import MicroBatchWriter
+
+log = logging.getLogger("services.message_logic")
+
+
+def parse_statuses(value: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Rows for message_status from a webhook change `value`; malformed entries are skipped."""
+    rows: List[Dict[str, Any]] = []
+    for st in value.get("statuses", []) or []:
+        if not isinstance(st, dict) or not st.get("id") or not st.get("status"):
+            continue
+        try:
+            ts = datetime.fromtimestamp(int(st.get("timestamp")), tz=timezone.utc).replace(tzinfo=None)
+        except (TypeError, ValueError):
+            ts = datetime.utcnow()
+        errors = st.get("errors")
+        err = errors[0] if isinstance(errors, list) and errors and isinstance(errors[0], dict) else {}
+        rows.append({
+            "message_id": st["id"],
+            "status": st["status"],
+            "recipient_id": st.get("recipient_id"),
+            "timestamp": ts,
+            "conversation_id": (st.get("conversation") or {}).get("id"),
+            "pricing_category": (st.get("pricing") or {}).get("category"),
+            "error_code": err.get("code"),
+            "error_title": err.get("title"),
+        })
+    return rows
+
+
+def apply_status_batch(db: Session, rows: List[Dict[str, Any]]) -> List[None]:
+    """One bulk insert per flush; duplicates (Meta retries) are dropped."""
+    now = datetime.utcnow()
+    unique: Dict[tuple, Dict[str, Any]] = {}
+    for r in rows:
+        unique.setdefault((r["message_id"], r["status"]), {**r, "received_at": now})
+
+    dialect_insert = upsert_insert(db.get_bind())
+    if dialect_insert is not None:
+        db.execute(dialect_insert(MessageStatus).on_conflict_do_nothing(), list(unique.values()))
+    else:
+        known = {
+            (m, s) for m, s in db.query(MessageStatus.message_id, MessageStatus.status)
+            .filter(MessageStatus.message_id.in_({m for m, _ in unique}))
+        }
+        fresh = [r for k, r in unique.items() if k not in known]
+        if fresh:
+            db.execute(insert(MessageStatus), fresh)
+    db.commit()
+    return [None] * len(rows)
+
+
+status_writer: MicroBatchWriter[Dict[str, Any]] = MicroBatchWriter(
+    "message_status",
+    apply_status_batch,
+    max_batch=config.STATUS_BATCH_MAX_SIZE,
+    max_wait_ms=config.STATUS_BATCH_MAX_WAIT_MS,
+    max_queue=config.STATUS_QUEUE_MAX,
+    retries=config.STATUS_BATCH_RETRIES,
+)
+
+
+def ingest_statuses(value: Dict[str, Any]) -> int:
+    """
+    Buffer the statuses of one webhook change for the next bulk flush. Never
+    blocks on the DB; returns how many were buffered (the rest were shed
+    because STATUS_QUEUE_MAX statuses are already waiting).
+    """
+    return sum(status_writer.enqueue(r) for r in parse_statuses(value))
+
+
+def list_statuses(db: Session, message_id: str) -> List[MessageStatus]:
+    return (
+        db.query(MessageStatus)
+        .filter(MessageStatus.message_id == message_id)
+        .order_by(MessageStatus.timestamp, MessageStatus.received_at)
+        .all()
+    )
+
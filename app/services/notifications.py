@@ -0,0 +1,49 @@
+# app/services/notifications.py
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from app.core import config
+from app.models import OrderStatus
+from app.services.wa import send_text
+
+log = logging.getLogger("services.message_logic")
+
+_STATUS_ICONS = {
+    OrderStatus.Pending: "⏳",
+    OrderStatus.Confirmed: "🟢",
+    OrderStatus.Preparing: "🧑‍🍳",
+    OrderStatus.OutForDelivery: "🚚",
+    OrderStatus.Delivered: "✅",
+    OrderStatus.Cancelled: "❌",
+}
+
+
+def status_message(order_id: str, status: OrderStatus) -> str:
+    return f"{_STATUS_ICONS.get(status, '')} Your order {order_id} is now *{status.value}*.".strip()
+
+
+async def notify_status_changes(
+    targets: List[Tuple[str, str]],
+    status: OrderStatus,
+    concurrency: Optional[int] = None,
+) -> Dict[str, Tuple[bool, Optional[str]]]:
+    """
+    Send a status message to each (order_id, phone) with at most
+    `concurrency` Graph calls in flight. Returns {order_id: (ok, error)}.
+    """
+    sem = asyncio.Semaphore(max(1, concurrency or config.NOTIFY_CONCURRENCY))
+
+    async def one(order_id: str, phone: str) -> Tuple[str, Tuple[bool, Optional[str]]]:
+        async with sem:
+            try:
+                ok, body = await send_text(phone, status_message(order_id, status))
+                return order_id, (ok, None if ok else body[:200])
+            except Exception as e:
+                log.exception("Status notification failed | order=%s", order_id)
+                return order_id, (False, str(e))
+
+    results = await asyncio.gather(*(one(oid, phone) for oid, phone in targets))
+    sent = sum(1 for _, (ok, _) in results if ok)
+    log.info("Status notifications | status=%s sent=%d/%d", status.value, sent, len(results))
+    return dict(results)
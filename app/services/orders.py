@@ -1,14 +1,56 @@
-from typing import List, Optional
-from sqlalchemy import cast, String, func
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from sqlalchemy import func, select, update
 from sqlalchemy.orm import Session, selectinload
-from app.models import Order, OrderItem, ProductVariant, ProductCategory, OrderStatus
+from app.models import Order, OrderArchive, OrderItem, OrderItemArchive, ProductVariant, ProductCategory, OrderStatus
+from app.core import config
 from app.schemas import DropDownOption, OrderCreate, OrderOut, OrderOutItem, OrderStatusUpdate
+from app.services import holds, reports
+from app.services.wa import canonical
 
 
-def create_order(db: Session, payload: OrderCreate) -> OrderOut:
+_STATUS_LOOKUP: Dict[str, OrderStatus] = {}
+for _s in OrderStatus:
+    for _k in (_s.name, _s.value, _s.value.replace(" ", "")):
+        _STATUS_LOOKUP[_k.lower()] = _s
+
+
+def normalize_statuses(statuses: Union[None, str, Iterable]) -> Optional[List[OrderStatus]]:
+    """
+    Map API/flow input ("pending", "OutForDelivery", "Out for delivery", "ALL", ...)
+    to OrderStatus members so the SQL filter is a plain IN on the indexed column.
+    Returns None for "no filter": nothing given, "ALL", or no known status
+    left once unknown values are dropped.
+    """
+    if statuses is None:
+        return None
+    if isinstance(statuses, (str, OrderStatus)):
+        statuses = [statuses]
+    out: List[OrderStatus] = []
+    for raw in statuses:
+        if isinstance(raw, OrderStatus):
+            st = raw
+        else:
+            key = str(raw or "").strip().lower()
+            if key in ("", "all"):
+                return None
+            st = _STATUS_LOOKUP.get(key)
+        if st is not None and st not in out:
+            out.append(st)
+    return out or None
+
+
+def _sync_holds(db: Session, order_ids: List[str], status: OrderStatus) -> None:
+    """Stock holds follow the order: cancelled gives units back, any step past Pending sells them."""
+    if status == OrderStatus.Cancelled:
+        holds.release(db, order_ids)
+    elif status != OrderStatus.Pending:
+        holds.convert(db, order_ids)
+
+
+def create_order(db: Session, payload: OrderCreate, commit: bool = True) -> OrderOut:
     order = Order(
         customer_name=payload.customer_name,
-        customer_phone=payload.customer_phone,
+        customer_phone=canonical(payload.customer_phone),
         customer_email=payload.customer_email,
         customer_address=payload.customer_address,
         fulfillment_date=payload.fulfillment_date,
@@ -18,12 +60,13 @@ def create_order(db: Session, payload: OrderCreate) -> OrderOut:
     db.add(order)
     db.flush()
 
+    lines: List[OrderItem] = []
     for it in payload.items:
         variant = db.query(ProductVariant).get(it.item_variant)
         category = db.query(ProductCategory).get(it.category)
         if not variant or not category:
             raise ValueError("Invalid category or SKU")
-        db.add(OrderItem(
+        line = OrderItem(
             order_id=order.id,
             category_id=category.id,
             sku=variant.sku,
@@ -31,47 +74,163 @@ def create_order(db: Session, payload: OrderCreate) -> OrderOut:
             color=it.color,
             quantity=it.quantity,
             unit_price=it.unit_price,
-        ))
-    db.commit()
-    db.refresh(order)
+        )
+        db.add(line)
+        lines.append(line)
+    order.total_amount = sum(ln.quantity * (ln.unit_price or 0) for ln in lines)
+    order.item_count = sum(ln.quantity for ln in lines)
+    if config.STOCK_HOLDS_ENABLED:
+        holds.reserve(db, order.id, [(ln.sku, ln.quantity) for ln in lines])
+    reports.record_order_created(db, order, lines)
+    if commit:
+        db.commit()
+        db.refresh(order)
+    else:
+        db.flush()
     return get_order_out(db, order.id)
 
 
-def update_order_status(db: Session, order_id: str, upd: OrderStatusUpdate) -> OrderOut:
-    order = db.query(Order).get(order_id)
+def _move_status(db: Session, orders: Iterable[Order], status: OrderStatus, note: Optional[str] = None) -> List[Order]:
+    """
+    Set `status` (and `note`) on the orders still in the status they were read
+    with: the old status is part of each UPDATE's WHERE clause, so when two
+    requests move the same order concurrently only one matches and only its
+    caller applies the rollup and hold side effects. Returns the orders this
+    call moved; Order.status on them is stale until refresh/commit.
+    """
+    by_old: Dict[OrderStatus, List[Order]] = {}
+    for o in orders:
+        if o.status != status:
+            by_old.setdefault(o.status, []).append(o)
+    values = {"status": status, **({"note": note} if note else {})}
+    returning = db.get_bind().dialect.update_returning
+    moved: List[Order] = []
+    for old, group in by_old.items():
+        if returning:
+            stmt = update(Order).where(Order.id.in_([o.id for o in group]), Order.status == old).values(**values).returning(Order.id)
+            ids = set(db.execute(stmt, execution_options={"synchronize_session": False}).scalars())
+        else:
+            ids = {
+                o.id for o in group
+                if db.execute(
+                    update(Order).where(Order.id == o.id, Order.status == old).values(**values),
+                    execution_options={"synchronize_session": False},
+                ).rowcount
+            }
+        moved.extend(o for o in group if o.id in ids)
+    return moved
+
+
+def _apply_moves(db: Session, moved: List[Order], status: OrderStatus, old: Dict[str, OrderStatus]) -> None:
+    reports.record_status_changes(db, [(o, old[o.id], status) for o in moved])
+    _sync_holds(db, [o.id for o in moved], status)
+
+
+def update_order_status(db: Session, order_id: str, upd: OrderStatusUpdate, commit: bool = True) -> OrderOut:
+    order = db.query(Order).options(selectinload(Order.items)).filter(Order.id == order_id).first()
     if not order:
         raise ValueError("Order not found")
-    order.status = upd.status
-    if upd.note:
+    old = {order.id: order.status}
+    moved = _move_status(db, [order], upd.status, upd.note)
+    if moved:
+        _apply_moves(db, moved, upd.status, old)
+    elif upd.note and order.status == upd.status:
         order.note = upd.note
-    db.commit()
-    db.refresh(order)
+    if commit:
+        db.commit()
+    else:
+        db.flush()
+    db.expire(order)
     return get_order_out(db, order_id)
 
 
+def bulk_update_status(
+    db: Session, order_ids: List[str], status: OrderStatus, note: Optional[str] = None
+) -> Tuple[List[Tuple[str, Optional[str], bool]], List[str]]:
+    """
+    Move many orders to `status` with one guarded UPDATE per current status
+    (see _move_status). Orders already there only get the note.
+    Returns ([(order_id, customer_phone, changed)], missing_ids), in request order.
+    """
+    ids = list(dict.fromkeys(order_ids))
+    orders = {
+        o.id: o
+        for o in db.query(Order).options(selectinload(Order.items)).filter(Order.id.in_(ids))
+    }
+    if orders:
+        old = {oid: o.status for oid, o in orders.items()}
+        moved = _move_status(db, orders.values(), status, note)
+        moved_ids = {o.id for o in moved}
+        # read what we report before commit expires the instances
+        found = [(oid, orders[oid].customer_phone, oid in moved_ids) for oid in ids if oid in orders]
+        if note:
+            unchanged = [oid for oid, st in old.items() if st == status]
+            if unchanged:
+                db.execute(
+                    update(Order).where(Order.id.in_(unchanged)).values(note=note),
+                    execution_options={"synchronize_session": False},
+                )
+        _apply_moves(db, moved, status, old)
+        db.commit()
+    else:
+        found = []
+
+    return found, [oid for oid in ids if oid not in orders]
+
+
 def list_orders(db: Session, status: Optional[OrderStatus] = None) -> List[OrderOut]:
     q = db.query(Order)
     if status:
         q = q.filter(Order.status == status)
-    orders = q.order_by(Order.created_at.desc()).all()
+    orders = q.order_by(Order.created_at.desc(), Order.id.desc()).all()
     print(f"orders{orders}")
     return [get_order_out(db, o.id) for o in orders]
 
 
 def list_all_orders(db: Session) -> List[dict]:
     q = db.query(Order)
-    orders = q.order_by(Order.created_at.desc()).all()
+    orders = q.order_by(Order.created_at.desc(), Order.id.desc()).all()
 
     result = []
     for o in orders:
         result.append({
             "id": o.id,
             "title": f"Id-{o.id}",
-            "metadata": f"{o.status} - {o.created_at}"
+            "metadata": f"{o.status} - ₹{o.total_amount or 0} - {o.created_at}"
         })
     return result
 
 
+def refresh_order_totals(db: Session, order_ids: Optional[Iterable[str]] = None) -> int:
+    """
+    Recompute total_amount/item_count from order_items in one UPDATE (every
+    order when order_ids is None). Call in the same transaction as any write
+    to order lines. Returns the number of orders updated.
+    """
+    amount = (
+        select(func.coalesce(func.sum(OrderItem.quantity * func.coalesce(OrderItem.unit_price, 0)), 0))
+        .where(OrderItem.order_id == Order.id)
+        .scalar_subquery()
+    )
+    count = select(func.coalesce(func.sum(OrderItem.quantity), 0)).where(OrderItem.order_id == Order.id).scalar_subquery()
+    stmt = update(Order).values(total_amount=amount, item_count=count)
+    if order_ids is not None:
+        stmt = stmt.where(Order.id.in_(list(order_ids)))
+    return db.execute(stmt, execution_options={"synchronize_session": False}).rowcount
+
+
+def backfill_order_totals(db: Session, chunk: int = 1000) -> int:
+    """Recompute totals for all orders in id-ordered chunks, one short transaction each."""
+    done, last = 0, ""
+    while True:
+        ids = [oid for (oid,) in db.query(Order.id).filter(Order.id > last).order_by(Order.id).limit(chunk)]
+        if not ids:
+            return done
+        done += refresh_order_totals(db, ids)
+        db.commit()
+        last = ids[-1]
+
+
 def get_order_out(db: Session, order_id: str) -> OrderOut:
     print(f"[get_order_out] id={order_id}")
     o = (
@@ -82,6 +241,14 @@ def get_order_out(db: Session, order_id: str) -> OrderOut:
         .filter(Order.id == order_id)
         .one_or_none()
     )
+    if not o:
+        # archived orders are still addressable by id
+        o = (
+            db.query(OrderArchive)
+            .options(selectinload(OrderArchive.items).selectinload(OrderItemArchive.variant))
+            .filter(OrderArchive.id == order_id)
+            .one_or_none()
+        )
     if not o:
         print(f"[get_order_out] not found: {order_id}")
         raise ValueError("Order not found")
@@ -102,7 +269,8 @@ def get_order_out(db: Session, order_id: str) -> OrderOut:
         id=o.id, status=o.status, created_at=o.created_at,
         customer_name=o.customer_name, customer_phone=o.customer_phone,
         customer_email=o.customer_email, customer_address=o.customer_address,
-        fulfillment_date=o.fulfillment_date, note=o.note, items=items
+        fulfillment_date=o.fulfillment_date, note=o.note, items=items,
+        total_amount=o.total_amount or 0, item_count=o.item_count or 0,
     )
     print(f"[get_order_out] done id={out.id} items={len(out.items)}")
     return out
@@ -114,14 +282,12 @@ def orders_list_for_dropdown(
 ) -> List[DropDownOption]:
     q = db.query(Order)
 
-    if statuses:
-        # compare as strings even if the column is a PG ENUM
-        q = q.filter(func.lower(cast(Order.status, String)).in_([s.lower() for s in statuses]))
-        print(q)
-        compiled = q.statement.compile(compile_kwargs={"literal_binds": True, "render_postcompile": True})
-        print(compiled)
+    wanted = normalize_statuses(statuses)
+    if wanted is not None:
+        # normalized in Python so (status, created_at) can serve filter + sort
+        q = q.filter(Order.status.in_(wanted))
 
-    orders = q.order_by(Order.created_at.desc()).all()
+    orders = q.order_by(Order.created_at.desc(), Order.id.desc()).all()
     visible = [
         {
             "id": str(o.id),
@@ -137,7 +303,7 @@ def orders_list_for_dropdown(
         DropDownOption(
             id=str(o.id),
             title=str(o.id),
-            description=o.customer_name or "",
+            description=f"{o.customer_name or ''} · ₹{o.total_amount or 0} · {o.item_count or 0} item(s)",
             metadata=o.status,
         )
         for o in orders if o.id
@@ -1,7 +1,12 @@
 # app/services/products.py
+from typing import List, Tuple
+
 from sqlalchemy.orm import Session
 from app.models import ProductCategory, ProductVariant
 from app.schemas import VariantOut
+from app.services.catalog_sync import record_changes
+from app.services.facets import facet_index
+from app.services.search import variant_index
 
 
 def list_categories(db: Session):
@@ -24,6 +29,14 @@ def list_all_variants(db: Session):
     ]
 
 
+def list_variant_rows(db: Session) -> List[Tuple[str, str, str]]:
+    """(sku, title, category_id) for every variant in one query; callers group by category."""
+    return [
+        (sku, title, category_id)
+        for sku, title, category_id in db.query(ProductVariant.sku, ProductVariant.title, ProductVariant.category_id)
+    ]
+
+
 def list_variants_by_category(db: Session, category_id: str):
     """
     Return SKU variants for a category.
@@ -71,6 +84,9 @@ def upsert_variant(
         var.category_id = category_id
         var.size = size
         var.color = color
+    record_changes(db, [sku])  # other processes' indexes replay this
     db.commit()
     db.refresh(var)
+    variant_index.upsert(var.sku, var.title, var.size, var.color)
+    facet_index.upsert(var.sku, var.title, var.category_id, var.size, var.color)
     return var
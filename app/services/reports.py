@@ -0,0 +1,184 @@
+# app/services/reports.py
+from collections import defaultdict
+from datetime import date, datetime
+from itertools import chain
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+
+from app.core.database import upsert_insert
+from app.models import DailySales, Order, OrderArchive, OrderStatus, ProductVariant
+from app.schemas import BestSellerOut, SalesDayOut, SalesSummaryOut, SalesTotals
+
+METRICS = (
+    "lines", "units", "revenue",
+    "cancelled_units", "cancelled_revenue",
+    "delivered_units", "delivered_revenue",
+)
+
+Key = Tuple[date, str]
+
+
+def _order_day(order: Order) -> date:
+    return (order.created_at or datetime.utcnow()).date()
+
+
+def _item_deltas(day: date, items: Iterable, factors: Dict[str, int]) -> Dict[Key, Dict[str, int]]:
+    """
+    factors maps a bucket prefix ("" = booked, "cancelled_", "delivered_") to +1/-1.
+    """
+    out: Dict[Key, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(METRICS, 0))
+    for it in items:
+        qty = int(it.quantity or 0)
+        rev = qty * int(it.unit_price or 0)
+        row = out[(day, it.sku)]
+        for prefix, sign in factors.items():
+            row[f"{prefix}units"] += sign * qty
+            row[f"{prefix}revenue"] += sign * rev
+            if prefix == "":
+                row["lines"] += sign
+    return out
+
+
+def _upsert(db: Session, deltas: Dict[Key, Dict[str, int]]) -> None:
+    """Add deltas onto daily_sales rows with INSERT .. ON CONFLICT DO UPDATE (read-modify-write elsewhere)."""
+    if not deltas:
+        return
+    rows = [{"day": d, "sku": sku, **vals} for (d, sku), vals in deltas.items()]
+    dialect_insert = upsert_insert(db.get_bind())
+
+    if dialect_insert is not None:
+        table = DailySales.__table__
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.day, table.c.sku],
+            set_={m: table.c[m] + stmt.excluded[m] for m in METRICS},
+        )
+        db.execute(stmt, rows)
+        return
+
+    for r in rows:
+        ds = db.query(DailySales).get((r["day"], r["sku"]))
+        if not ds:
+            ds = DailySales(day=r["day"], sku=r["sku"], **dict.fromkeys(METRICS, 0))
+            db.add(ds)
+        for m in METRICS:
+            setattr(ds, m, getattr(ds, m) + r[m])
+    db.flush()
+
+
+def record_order_created(db: Session, order: Order, items: Iterable) -> None:
+    """Add a new order's lines to the rollup. Runs inside the caller's transaction."""
+    _upsert(db, _item_deltas(_order_day(order), items, {"": 1}))
+
+
+def _transition_factors(old: OrderStatus, new: OrderStatus) -> Dict[str, int]:
+    factors: Dict[str, int] = {}
+    if old == new:
+        return factors
+    if new == OrderStatus.Cancelled:
+        factors.update({"": -1, "cancelled_": 1})
+    elif old == OrderStatus.Cancelled:
+        factors.update({"": 1, "cancelled_": -1})
+    if new == OrderStatus.Delivered:
+        factors["delivered_"] = 1
+    elif old == OrderStatus.Delivered:
+        factors["delivered_"] = -1
+    return factors
+
+
+def record_status_change(db: Session, order: Order, old: OrderStatus, new: OrderStatus) -> None:
+    """Move an order's lines between rollup buckets on a Cancelled/Delivered transition."""
+    record_status_changes(db, [(order, old, new)])
+
+
+def record_status_changes(db: Session, changes: Iterable[Tuple[Order, OrderStatus, OrderStatus]]) -> None:
+    """Same as record_status_change for many orders, merged into one upsert."""
+    merged: Dict[Key, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(METRICS, 0))
+    for order, old, new in changes:
+        factors = _transition_factors(old, new)
+        if not factors:
+            continue
+        for key, vals in _item_deltas(_order_day(order), order.items or [], factors).items():
+            for m, v in vals.items():
+                merged[key][m] += v
+    _upsert(db, merged)
+
+
+def rebuild_daily_sales(db: Session) -> int:
+    """Recompute the whole rollup from live and archived orders (backfill / repair). Returns rows written."""
+    db.query(DailySales).delete(synchronize_session=False)
+    hot = db.query(Order).options(selectinload(Order.items)).yield_per(500)
+    cold = db.query(OrderArchive).options(selectinload(OrderArchive.items)).yield_per(500)
+    deltas: Dict[Key, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(METRICS, 0))
+    for o in chain(hot, cold):
+        factors = {"cancelled_": 1} if o.status == OrderStatus.Cancelled else {"": 1}
+        if o.status == OrderStatus.Delivered:
+            factors["delivered_"] = 1
+        for key, vals in _item_deltas(_order_day(o), o.items or [], factors).items():
+            for m, v in vals.items():
+                deltas[key][m] += v
+    _upsert(db, deltas)
+    db.commit()
+    return len(deltas)
+
+
+def ensure_daily_sales(db: Session) -> int:
+    """
+    Rebuild the rollup when it is empty but orders exist: the table was just
+    created next to existing orders (or a build never finished). Returns rows written.
+    """
+    if db.query(DailySales.day).limit(1).first() is not None:
+        return 0
+    if db.query(Order.id).limit(1).first() is None and db.query(OrderArchive.id).limit(1).first() is None:
+        return 0
+    return rebuild_daily_sales(db)
+
+
+# ---------- range queries ----------
+
+
+def _rollup_frame(db: Session, start: date, end: date):
+    import pandas as pd
+
+    stmt = select(DailySales.day, DailySales.sku, *[DailySales.__table__.c[m] for m in METRICS]).where(
+        DailySales.day >= start, DailySales.day <= end
+    )
+    return pd.read_sql(stmt, db.connection())
+
+
+def sales_summary(db: Session, start: date, end: date) -> SalesSummaryOut:
+    df = _rollup_frame(db, start, end)
+    if df.empty:
+        return SalesSummaryOut(start=start, end=end, totals=SalesTotals(), daily=[])
+
+    totals = df[list(METRICS)].sum()
+    daily = df.groupby("day", sort=True)[["units", "revenue"]].sum()
+    return SalesSummaryOut(
+        start=start,
+        end=end,
+        totals=SalesTotals(**{m: int(totals[m]) for m in METRICS}),
+        daily=[
+            SalesDayOut(day=d, units=int(r.units), revenue=int(r.revenue))
+            for d, r in zip(daily.index, daily.itertuples(index=False))
+        ],
+    )
+
+
+def best_sellers(db: Session, start: date, end: date, limit: int = 10, by: str = "units") -> List[BestSellerOut]:
+    if by not in ("units", "revenue"):
+        raise ValueError("by must be 'units' or 'revenue'")
+    df = _rollup_frame(db, start, end)
+    if df.empty:
+        return []
+
+    top = df.groupby("sku")[["units", "revenue"]].sum().nlargest(limit, by)
+    titles = dict(
+        db.query(ProductVariant.sku, ProductVariant.title).filter(ProductVariant.sku.in_(top.index.tolist())).all()
+    )
+    return [
+        BestSellerOut(sku=sku, title=titles.get(sku) or sku, units=int(r.units), revenue=int(r.revenue))
+        for sku, r in zip(top.index, top.itertuples(index=False))
+    ]
+
@@ -0,0 +1,171 @@
+# app/services/search.py
+import bisect
+import heapq
+import re
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core import config
+from app.core.tenants import TenantLocal
+from app.models import ProductVariant
+from app.schemas import VariantOut
+from app.services.catalog_sync import SyncedIndex
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+MAX_PREFIX = 16
+WALK_STEPS = 256
+
+Rank = Tuple[str, str]  # (casefolded title, sku): alphabetical, as a type-ahead list reads
+
+
+def _tokens(text: Optional[str]) -> List[str]:
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+class VariantSearchIndex(SyncedIndex):
+    """
+    In-process prefix index over variant title/size/color/sku.
+
+    Every token prefix (up to MAX_PREFIX chars) maps to a posting list kept
+    sorted by rank plus a set for membership tests. A query walks the
+    shortest posting list in rank order and stops after `limit` hits, so
+    cost depends on the result size rather than the catalog size. Writes of
+    other processes are picked up by sync() (see catalog_sync).
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._titles: Dict[str, str] = {}
+        self._keys: Dict[str, Set[str]] = {}
+        self._postings: Dict[str, List[Rank]] = {}
+        self._members: Dict[str, Set[str]] = {}
+        self._by_sku: Dict[str, str] = {}  # lowercased sku -> sku
+        self._rank: Dict[str, Rank] = {}
+
+    @staticmethod
+    def _prefixes(title: str, size: Optional[str], color: Optional[str], sku: str) -> Set[str]:
+        keys: Set[str] = set()
+        for tok in _tokens(title) + _tokens(size) + _tokens(color) + _tokens(sku):
+            tok = tok[:MAX_PREFIX]
+            keys.update(tok[:i] for i in range(1, len(tok) + 1))
+        return keys
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def __len__(self) -> int:
+        return len(self._titles)
+
+    def load(self, db: Session) -> None:
+        """(Re)build from the database in one pass; posting lists are sorted once."""
+        rows = db.query(ProductVariant.sku, ProductVariant.title, ProductVariant.size, ProductVariant.color).all()
+        titles: Dict[str, str] = {}
+        keys: Dict[str, Set[str]] = {}
+        members: Dict[str, Set[str]] = {}
+        for sku, title, size, color in rows:
+            titles[sku] = title
+            keys[sku] = self._prefixes(title, size, color, sku)
+            for k in keys[sku]:
+                members.setdefault(k, set()).add(sku)
+        rank = {s: (t.casefold(), s) for s, t in titles.items()}
+        postings = {k: sorted(rank[s] for s in skus) for k, skus in members.items()}
+        with self._lock:
+            self._titles, self._keys, self._members, self._postings = titles, keys, members, postings
+            self._by_sku = {s.lower(): s for s in titles}
+            self._rank = rank
+            self._loaded = True
+
+    def _remove(self, sku: str) -> None:
+        if self._titles.pop(sku, None) is None:
+            return
+        rank = self._rank.pop(sku)
+        for k in self._keys.pop(sku, ()):
+            self._members[k].discard(sku)
+            lst = self._postings[k]
+            lst.pop(bisect.bisect_left(lst, rank))
+            if not lst:
+                del self._postings[k], self._members[k]
+        self._by_sku.pop(sku.lower(), None)
+
+    def upsert(self, sku: str, title: str, size: Optional[str] = None, color: Optional[str] = None) -> None:
+        """Keep the index in sync after a catalog write (no-op until first load)."""
+        if not self._loaded:
+            return
+        with self._lock:
+            self._remove(sku)
+            rank = self._rank[sku] = (title.casefold(), sku)
+            self._titles[sku] = title
+            self._by_sku[sku.lower()] = sku
+            self._keys[sku] = self._prefixes(title, size, color, sku)
+            for k in self._keys[sku]:
+                self._members.setdefault(k, set()).add(sku)
+                lst = self._postings.setdefault(k, [])
+                bisect.insort(lst, rank)
+
+    def remove(self, sku: str) -> None:
+        with self._lock:
+            self._remove(sku)
+
+    def refresh(self, db: Session, skus: Set[str]) -> None:
+        """Re-read `skus` from the database: upsert the ones that exist, drop the rest."""
+        rows = (
+            db.query(ProductVariant.sku, ProductVariant.title, ProductVariant.size, ProductVariant.color)
+            .filter(ProductVariant.sku.in_(list(skus)))
+            .all()
+        )
+        with self._lock:
+            for sku, title, size, color in rows:
+                self.upsert(sku, title, size, color)
+            for sku in skus - {sku for sku, *_ in rows}:
+                self._remove(sku)
+
+    def search(self, q: str, limit: int = 10) -> List[Tuple[str, str]]:
+        """
+        Top `limit` (sku, title) pairs whose tokens start with every query
+        token; an exact SKU match comes first. Walks the shortest posting list
+        in rank order for a bounded number of steps, then falls back to a set
+        intersection when the match rate is too low to fill `limit`.
+        """
+        qtoks = [t[:MAX_PREFIX] for t in _tokens(q)]
+        if not qtoks or limit <= 0:
+            return []
+        with self._lock:
+            exact = self._by_sku.get(q.strip().lower())
+            sets = []
+            for t in set(qtoks):
+                s = self._members.get(t)
+                if not s:
+                    return []
+                sets.append((len(s), t, s))
+            sets.sort(key=lambda x: x[0])
+            driver, others = sets[0][1], [s for _, _, s in sets[1:]]
+
+            hits: List[str] = [exact] if exact else []
+            postings = self._postings[driver]
+            for _, sku in postings[:WALK_STEPS]:
+                if len(hits) >= limit:
+                    break
+                if sku != exact and all(sku in o for o in others):
+                    hits.append(sku)
+            if len(hits) < limit and len(postings) > WALK_STEPS:
+                matched = sets[0][2].intersection(*others)
+                matched.discard(exact)
+                head = [exact] if exact else []
+                top = heapq.nsmallest(limit - len(head), map(self._rank.__getitem__, matched))
+                hits = head + [sku for _, sku in top]
+            return [(sku, self._titles[sku]) for sku in hits]
+
+
+# one index per tenant; memory is bounded by TENANT_MAX_CACHED
+variant_index: TenantLocal[VariantSearchIndex] = TenantLocal(VariantSearchIndex, config.TENANT_MAX_CACHED)
+
+
+def search_variants(db: Session, q: str, limit: int = 10) -> List[VariantOut]:
+    variant_index.sync()
+    return [VariantOut(id=sku, title=title) for sku, title in variant_index.search(q, limit)]
+
@@ -15,7 +15,7 @@ async def handle_hi(to: str, msg_id: str, raw_text: str, db: Session) -> None:
     fall back to a simple text if anything fails.
     """
     try:
-        flow_msg = seller_flow(to, db)
+        flow_msg = await seller_flow(to)
         payload = flow_msg.dict(exclude_none=True)
         print(f"payload{payload}")
         await send_interactive(to, payload, msg_id)
@@ -2,7 +2,7 @@
 from typing import Awaitable, Callable, Dict, Iterator
 from contextlib import contextmanager
 from sqlalchemy.orm import Session
-from app.core.database import get_db
+from app.core.database import get_read_db
 from app.services.text_handlers import handle_hi, handle_fallback
 
 TextHandler = Callable[[str, str, str, Session], Awaitable[None]]
@@ -12,7 +12,7 @@ COMMANDS: Dict[str, TextHandler] = {"hi": handle_hi}
 
 @contextmanager
 def db_session() -> Iterator[Session]:
-    gen = get_db()
+    gen = get_read_db()
     db = next(gen)
     try:
         yield db
@@ -1,31 +1,67 @@
 import asyncio
-from typing import Tuple, Union, Dict, Any, List
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Tuple, Union, Dict, Any, Iterator, List, Optional
 import json
 import logging
 import httpx
 
 from app.core import config
+from app.core.tenants import TenantLocal, all_tenants, current_tenant
 from app.flows_operations.schema import FlowMessage
+from app.utils.circuit_breaker import CallRejected, CircuitBreaker
 from app.utils.datetime import now_ms_ist, now_str_ist
 
 # WhatsApp Graph API endpoints
 GRAPH_BASE = f"https://graph.facebook.com/{config.GRAPH_API_VERSION}"
-MSG_URL = f"{GRAPH_BASE}/{config.PHONE_NUMBER_ID}/messages"
-MEDIA_URL = f"{GRAPH_BASE}/{config.PHONE_NUMBER_ID}/media"
 
-HEADERS_AUTH: Dict[str, str] = {"Authorization": f"Bearer {config.WHATSAPP_TOKEN}"}
+
+def _msg_url() -> str:
+    """Messages endpoint of the current tenant's number."""
+    return f"{GRAPH_BASE}/{current_tenant().phone_number_id}/messages"
+
+
+def _auth_headers() -> Dict[str, str]:
+    return {"Authorization": f"Bearer {current_tenant().whatsapp_token}"}
+
 
 # dedicated logger (configure handlers/rotation at app startup)
 logger = logging.getLogger("app.whatsapp")
 
 MASK = "*****"
 
+# Set while handling a coalesced burst whose read receipt was already sent.
+_receipts_suppressed: ContextVar[bool] = ContextVar("receipts_suppressed", default=False)
+
+
+def _new_breaker() -> CircuitBreaker:
+    return CircuitBreaker(
+        window_s=config.GRAPH_CB_WINDOW_S,
+        min_calls=config.GRAPH_CB_MIN_CALLS,
+        failure_ratio=config.GRAPH_CB_FAILURE_RATIO,
+        slow_ms=config.GRAPH_CB_SLOW_MS,
+        open_s=config.GRAPH_CB_OPEN_S,
+        probes=config.GRAPH_CB_PROBES,
+        max_inflight=config.GRAPH_SHED_OPTIONAL_INFLIGHT,
+    )
+
+
+# One breaker per tenant (i.e. per phone_number_id and token): one number's
+# failures (revoked token, throttling) must not cut off every other shop.
+# Sized to the registry so a breaker is never evicted while open.
+graph_breaker: TenantLocal[CircuitBreaker] = TenantLocal(_new_breaker, len(all_tenants()))
+
 
 def normalize(n: str) -> str:
     """Convert number to E.164 format required by WhatsApp."""
     return n if n.startswith("+") else f"+{n}"
 
 
+def canonical(n: str) -> str:
+    """Digits only ("+91 98765-43210" -> "919876543210"): the form phones are stored and compared in."""
+    return "".join(ch for ch in n or "" if ch.isdigit())
+
+
 def _sanitize_headers(h: Dict[str, str]) -> Dict[str, str]:
     if not h:
         return {}
@@ -47,24 +83,43 @@ def _preview(text: str | bytes | None, limit: int = 4000) -> str:
     return text if len(text) <= limit else f"{text[:limit]} …(truncated {len(text)-limit} chars)"
 
 
-async def _post_to_whatsapp(json_payload: dict) -> Tuple[bool, str]:
-    """POST payload to WhatsApp messages endpoint with full logging."""
+async def _post_to_whatsapp(json_payload: dict, optional: bool = False) -> Tuple[bool, str]:
+    """
+    POST payload to WhatsApp messages endpoint with full logging.
+    Goes through the current tenant's graph_breaker: fails fast while Graph
+    is unhealthy for this number, and `optional` traffic (receipts, typing
+    indicators) is shed first.
+    """
     to = json_payload.get("to")
+    breaker = graph_breaker.get()
+    try:
+        probe = breaker.admit(optional)
+    except CallRejected as e:
+        logger.warning("[SEND_SKIPPED] ts=%s to=%s optional=%s reason=%s", now_str_ist(), to, optional, e)
+        return False, str(e)
+
     t0 = now_ms_ist()
-    logger.info("[SEND_INITIATED] ts=%s to=%s endpoint=%s", now_str_ist(), to, MSG_URL)
+    url = _msg_url()
+    logger.info("[SEND_INITIATED] ts=%s to=%s endpoint=%s", now_str_ist(), to, url)
 
     try:
-        async with httpx.AsyncClient(timeout=httpx.Timeout(20)) as client:
+        async with httpx.AsyncClient(timeout=httpx.Timeout(config.GRAPH_TIMEOUT_S)) as client:
             resp = await client.post(
-                MSG_URL,
-                headers={**HEADERS_AUTH, "Content-Type": "application/json"},
+                url,
+                headers={**_auth_headers(), "Content-Type": "application/json"},
                 json=json_payload,
             )
     except httpx.RequestError as e:
+        breaker.record(probe, True, now_ms_ist() - t0)
         logger.error("[SEND_FAILED] ts=%s to=%s error=%s", now_str_ist(), to, str(e))
         return False, str(e)
+    except BaseException:
+        breaker.record(probe, True, now_ms_ist() - t0)
+        raise
 
     dt = now_ms_ist() - t0
+    # 4xx is our payload's fault, not Graph's health
+    breaker.record(probe, resp.status_code >= 500 or resp.status_code == 429, dt)
     reason = getattr(resp, "reason_phrase", "")
     # request context
     try:
@@ -136,13 +191,30 @@ def _read_receipt(message_id: str) -> dict:
     }
 
 
+async def send_read_receipt(message_id: str) -> Tuple[bool, str]:
+    """Standalone read receipt (+ typing indicator); optional traffic, shed under load."""
+    ok, text = await _post_to_whatsapp(_read_receipt(message_id), optional=True)
+    logger.info("[RECEIPT_RESULT] ok=%s body=%s", ok, _preview(text))
+    return ok, text
+
+
+@contextmanager
+def suppress_receipts() -> Iterator[None]:
+    """Replies sent inside this block do not carry their own read receipt."""
+    token = _receipts_suppressed.set(True)
+    try:
+        yield
+    finally:
+        _receipts_suppressed.reset(token)
+
+
 async def send_with_receipts(message_id: str, message_payload: dict) -> Tuple[bool, str]:
     """
     Send read receipt + actual message concurrently.
     Return only the message result (ok, text) for call-site simplicity.
     """
     tasks = [
-        _post_to_whatsapp(_read_receipt(message_id)),
+        _post_to_whatsapp(_read_receipt(message_id), optional=True),
         _post_to_whatsapp(message_payload),
     ]
     results: List[Tuple[bool, str]] = await asyncio.gather(*tasks, return_exceptions=False)
@@ -157,17 +229,24 @@ async def send_with_receipts(message_id: str, message_payload: dict) -> Tuple[bo
 # ---- Message Senders ----
 
 
-async def send_text(to_number: str, body: str, message_id: str) -> Tuple[bool, str]:
+async def _send(message_id: Optional[str], payload: dict) -> Tuple[bool, str]:
+    """Replies to an inbound message carry its read receipt; proactive sends (no message_id) do not."""
+    if message_id and not _receipts_suppressed.get():
+        return await send_with_receipts(message_id, payload)
+    return await _post_to_whatsapp(payload)
+
+
+async def send_text(to_number: str, body: str, message_id: Optional[str] = None) -> Tuple[bool, str]:
     payload = {
         "messaging_product": "whatsapp",
         "to": normalize(to_number),
         "type": "text",
         "text": {"body": body},
     }
-    return await send_with_receipts(message_id, payload)
+    return await _send(message_id, payload)
 
 
-async def send_interactive(to_number: str, message: Union[FlowMessage, dict], message_id: str) -> Tuple[bool, str]:
+async def send_interactive(to_number: str, message: Union[FlowMessage, dict], message_id: Optional[str] = None) -> Tuple[bool, str]:
     if isinstance(message, FlowMessage):
         try:
             payload = message.dict(exclude_none=True)  # Pydantic v1
@@ -176,4 +255,4 @@ async def send_interactive(to_number: str, message: Union[FlowMessage, dict], me
     else:
         payload = message
     payload["to"] = normalize(to_number)
-    return await send_with_receipts(message_id, payload)
+    return await _send(message_id, payload)
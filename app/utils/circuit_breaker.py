@@ -0,0 +1,140 @@
+# app/utils/circuit_breaker.py
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Tuple
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CallRejected(Exception):
+    """Raised by admit() when a call is not let through; str(e) is the reason."""
+
+
+class CircuitBreaker:
+    """
+    Error-rate / latency circuit breaker with priority-aware load shedding.
+
+    Outcomes of the last `window_s` seconds decide the state: once at least
+    `min_calls` were seen and the share of failed or slow (> slow_ms) calls
+    reaches `failure_ratio`, the circuit opens and every call fails fast for
+    `open_s`. It then goes half-open and lets `probes` calls through; a
+    successful probe closes it, a failed one re-opens it.
+
+    Optional calls (receipts, typing indicators) are shed before required
+    ones: whenever the circuit is not closed, when `max_inflight` calls are
+    already outstanding, or when the window is degraded (half the opening
+    ratio).
+
+    Single event loop only: state changes never span an await, so no lock.
+    """
+
+    def __init__(
+        self,
+        window_s: float = 30,
+        min_calls: int = 10,
+        failure_ratio: float = 0.5,
+        slow_ms: float = 5000,
+        open_s: float = 30,
+        probes: int = 1,
+        max_inflight: int = 16,
+    ) -> None:
+        self.window_s = window_s
+        self.min_calls = max(1, min_calls)
+        self.failure_ratio = failure_ratio
+        self.slow_ms = slow_ms
+        self.open_s = open_s
+        self.probes = max(1, probes)
+        self.max_inflight = max(1, max_inflight)
+
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._window: Deque[Tuple[float, bool]] = deque()  # (ts, bad)
+        self._bad = 0
+        self.inflight = 0
+        self._probes_inflight = 0
+        self.counters: Dict[str, int] = {"calls": 0, "failures": 0, "slow": 0, "rejected": 0, "shed_optional": 0, "opened": 0}
+
+    # ---------- window ----------
+
+    def _trim(self, now: float) -> None:
+        w = self._window
+        while w and w[0][0] < now - self.window_s:
+            if w.popleft()[1]:
+                self._bad -= 1
+
+    def _bad_ratio(self, now: float) -> float:
+        self._trim(now)
+        n = len(self._window)
+        return self._bad / n if n >= self.min_calls else 0.0
+
+    def _open(self, now: float) -> None:
+        self.state = OPEN
+        self._opened_at = now
+        self.counters["opened"] += 1
+
+    # ---------- calls ----------
+
+    def admit(self, optional: bool = False) -> bool:
+        """Admit one call or raise CallRejected. Returns True when the call is a half-open probe."""
+        now = time.monotonic()
+        if self.state == OPEN and now - self._opened_at >= self.open_s:
+            self.state = HALF_OPEN
+
+        if optional and (
+            self.state != CLOSED
+            or self.inflight >= self.max_inflight
+            or self._bad_ratio(now) >= self.failure_ratio / 2
+        ):
+            self.counters["shed_optional"] += 1
+            raise CallRejected("shed")
+
+        probe = False
+        if self.state == OPEN:
+            self.counters["rejected"] += 1
+            raise CallRejected("circuit open")
+        if self.state == HALF_OPEN:
+            if self._probes_inflight >= self.probes:
+                self.counters["rejected"] += 1
+                raise CallRejected("circuit half-open")
+            self._probes_inflight += 1
+            probe = True
+
+        self.inflight += 1
+        self.counters["calls"] += 1
+        return probe
+
+    def record(self, probe: bool, failed: bool, latency_ms: float) -> None:
+        """Report the outcome of an admitted call."""
+        now = time.monotonic()
+        self.inflight -= 1
+        slow = latency_ms > self.slow_ms
+        bad = failed or slow
+        self.counters["failures"] += int(failed)
+        self.counters["slow"] += int(slow)
+
+        self._window.append((now, bad))
+        self._bad += int(bad)
+        self._trim(now)
+
+        if probe:
+            self._probes_inflight -= 1
+            if bad:
+                self._open(now)
+            else:
+                self.state = CLOSED
+                self._window.clear()
+                self._bad = 0
+        elif self.state == CLOSED and self._bad_ratio(now) >= self.failure_ratio:
+            self._open(now)
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        ratio = self._bad_ratio(now)
+        return {
+            "state": self.state,
+            "window_calls": len(self._window),
+            "window_bad_ratio": round(ratio, 3),
+            "inflight": self.inflight,
+            "open_for_s": round(max(0.0, self.open_s - (now - self._opened_at)), 1) if self.state == OPEN else 0,
+            **self.counters,
+        }
@@ -0,0 +1,49 @@
+# app/utils/imaging.py
+"""
+CPU-bound image work, run in a process pool. Only Pillow is imported here
+so worker processes stay light (no app config, DB engine or routers).
+"""
+import os
+import tempfile
+from typing import Tuple
+
+from PIL import Image, ImageOps
+
+
+def probe(src_path: str) -> Tuple[int, int, str]:
+    """(width, height, format) of an image file; ValueError if it is not a readable image."""
+    try:
+        with Image.open(src_path) as im:
+            im.verify()
+        with Image.open(src_path) as im:  # verify() leaves the image unusable
+            w, h = ImageOps.exif_transpose(im).size
+            return w, h, im.format or ""
+    except (OSError, SyntaxError, Image.DecompressionBombError):
+        raise ValueError("Not a supported image")
+
+
+def render(src_path: str, dest_path: str, max_px: int, quality: int) -> Tuple[int, int]:
+    """
+    Write a JPEG of src fitted inside max_px × max_px (never upscaled, EXIF
+    orientation applied, alpha flattened on white) to dest_path atomically.
+    Returns the rendition's (width, height).
+    """
+    with Image.open(src_path) as im:
+        im = ImageOps.exif_transpose(im)
+        if im.mode in ("RGBA", "LA", "P"):
+            im = im.convert("RGBA")
+            bg = Image.new("RGB", im.size, (255, 255, 255))
+            bg.paste(im, mask=im.getchannel("A"))
+            im = bg
+        elif im.mode != "RGB":
+            im = im.convert("RGB")
+        im.thumbnail((max_px, max_px), Image.Resampling.LANCZOS)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest_path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                im.save(f, "JPEG", quality=quality, optimize=True, progressive=True)
+            os.replace(tmp, dest_path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+        return im.size
@@ -0,0 +1,27 @@
+# app/utils/ratelimit.py
+import asyncio
+import time
+
+
+class AsyncTokenBucket:
+    """Token bucket shared by coroutines: `rate` tokens/second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = 1.0) -> None:
+        self.rate = max(rate, 1e-6)
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        async with self._lock:  # FIFO: waiters are served in arrival order
+            self._refill()
+            while self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
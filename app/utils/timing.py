@@ -0,0 +1,29 @@
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Dict, Iterator
+
+
+class PhaseTimer:
+    """Collect wall-clock durations (ms) for named phases, in insertion order."""
+
+    def __init__(self) -> None:
+        self.phases: Dict[str, float] = {}
+
+    def record(self, name: str, ms: float) -> None:
+        self.phases[name] = ms
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        t0 = perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = (perf_counter() - t0) * 1000
+
+    def total_ms(self) -> float:
+        return sum(self.phases.values())
+
+    def summary(self) -> str:
+        parts = [f"{k}={v:.1f}ms" for k, v in self.phases.items()]
+        parts.append(f"total={self.total_ms():.1f}ms")
+        return " ".join(parts)
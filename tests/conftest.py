@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# app.core.database builds its engines at import time: point them at throwaway files first
+_TMP = tempfile.mkdtemp(prefix="boutique-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP}/primary.db"
+os.environ.setdefault("FAST_START", "false")
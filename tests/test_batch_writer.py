@@ -0,0 +1,35 @@
+"""MicroBatchWriter: a worker killed mid-batch fails its callers instead of leaving them waiting."""
+import asyncio
+import threading
+
+import pytest
+
+from app.services.batch_writer import MicroBatchWriter
+
+
+def test_killed_worker_fails_pending_submits_and_restarts():
+    release = threading.Event()
+    applied = []
+
+    def apply(db, ops):
+        if "block" in ops:
+            release.wait(5)
+        applied.extend(ops)
+        return [op.upper() for op in ops]
+
+    async def scenario():
+        writer = MicroBatchWriter("test", apply, max_batch=1, max_wait_ms=0)
+        in_flight = asyncio.ensure_future(writer.submit("block"))
+        await asyncio.sleep(0.05)  # the worker is now inside apply_batch
+        queued = asyncio.ensure_future(writer.submit("queued"))
+        await asyncio.sleep(0)
+        writer._worker.cancel()
+        for fut in (in_flight, queued):
+            with pytest.raises(RuntimeError):
+                await asyncio.wait_for(fut, 1)
+        release.set()
+        assert await asyncio.wait_for(writer.submit("after"), 1) == "AFTER"
+        await writer.close()
+
+    asyncio.run(scenario())
+    assert "queued" not in applied and "after" in applied
@@ -0,0 +1,131 @@
+"""Graph API circuit breaker state machine, per-tenant isolation, and the campaign token bucket."""
+import asyncio
+
+import pytest
+
+from app.core.tenants import Tenant, TenantLocal, use_tenant
+from app.services import wa
+from app.utils import circuit_breaker, ratelimit
+from app.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CallRejected, CircuitBreaker
+from app.utils.ratelimit import AsyncTokenBucket
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture()
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(circuit_breaker, "time", c)
+    monkeypatch.setattr(ratelimit, "time", c)
+    return c
+
+
+def _fail(cb, n):
+    for _ in range(n):
+        cb.record(cb.admit(), True, 1)
+
+
+def test_opens_then_half_open_probe_closes(clock):
+    cb = CircuitBreaker(window_s=30, min_calls=4, failure_ratio=0.5, open_s=10, probes=1)
+    cb.record(cb.admit(), False, 1)
+    cb.record(cb.admit(), False, 1)
+    _fail(cb, 1)
+    assert cb.state == CLOSED  # 1 bad of 3: below min_calls
+    _fail(cb, 1)
+    assert cb.state == OPEN  # 2 bad of 4
+    with pytest.raises(CallRejected, match="open"):
+        cb.admit()
+
+    clock.now += 10
+    assert cb.admit() is True  # first call after open_s is the probe
+    assert cb.state == HALF_OPEN
+    cb.record(True, False, 1)
+    assert cb.state == CLOSED
+    assert cb.snapshot()["window_calls"] == 0  # old failures do not re-open it
+
+
+def test_failed_probe_reopens(clock):
+    cb = CircuitBreaker(min_calls=1, failure_ratio=0.5, open_s=10)
+    _fail(cb, 1)
+    clock.now += 10
+    cb.record(cb.admit(), True, 1)
+    assert cb.state == OPEN
+    with pytest.raises(CallRejected):
+        cb.admit()
+    clock.now += 10
+    assert cb.admit() is True
+
+
+def test_half_open_admits_only_probe_slots(clock):
+    cb = CircuitBreaker(min_calls=1, open_s=10, probes=2)
+    _fail(cb, 1)
+    clock.now += 10
+    assert cb.admit() is True and cb.admit() is True
+    with pytest.raises(CallRejected, match="half-open"):
+        cb.admit()
+    with pytest.raises(CallRejected, match="shed"):
+        cb.admit(optional=True)  # optional traffic waits for a closed circuit
+    cb.record(True, True, 1)  # one probe fails: back to open, the other is still out
+    with pytest.raises(CallRejected, match="open"):
+        cb.admit()
+
+
+def test_slow_calls_count_as_failures(clock):
+    cb = CircuitBreaker(min_calls=2, failure_ratio=0.5, slow_ms=100)
+    cb.record(cb.admit(), False, 50)
+    cb.record(cb.admit(), False, 150)
+    assert cb.state == OPEN
+
+
+def test_failures_age_out_of_the_window(clock):
+    cb = CircuitBreaker(window_s=30, min_calls=2, failure_ratio=0.5)
+    _fail(cb, 1)
+    clock.now += 31
+    cb.record(cb.admit(), False, 1)
+    cb.record(cb.admit(), False, 1)
+    _fail(cb, 1)
+    assert cb.state == CLOSED  # 1 bad of the 3 still in the window
+
+
+def test_breaker_is_per_tenant():
+    a = Tenant(id="cb-a", phone_number_id="111", whatsapp_token="x")
+    b = Tenant(id="cb-b", phone_number_id="222", whatsapp_token="y")
+    breakers = TenantLocal(wa._new_breaker, 4)  # as wa.graph_breaker, sized for these two tenants
+    with use_tenant(a):
+        _fail(breakers.get(), 10)
+        assert breakers.state == OPEN
+    with use_tenant(b):
+        assert breakers.state == CLOSED
+        assert breakers.admit() is False
+
+
+def test_token_bucket_refills_at_rate_up_to_capacity(clock, monkeypatch):
+    slept = []
+
+    async def fake_sleep(s):
+        slept.append(s)
+        clock.now += s
+
+    monkeypatch.setattr(ratelimit.asyncio, "sleep", fake_sleep)
+
+    async def scenario():
+        bucket = AsyncTokenBucket(rate=4, capacity=2)  # binary-exact steps for the fake clock
+        await bucket.acquire()
+        await bucket.acquire()  # the initial burst is free
+        assert slept == []
+        await bucket.acquire()  # empty: waits one token's worth
+        assert slept == [0.25]
+        clock.now += 60  # a long idle refills to capacity, not beyond
+        await bucket.acquire()
+        await bucket.acquire()
+        assert len(slept) == 1
+        await bucket.acquire()
+        assert len(slept) == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,79 @@
+"""Facet index: OR within a facet, AND across facets, disjunctive counts, and other processes' stock writes."""
+import pytest
+
+from app.core.database import SessionLocal, init_db
+from app.models import Inventory, ProductCategory, ProductVariant
+from app.schemas import InventoryAdjustmentIn
+from app.services.facets import VariantFacetIndex
+from app.services.inventory import apply_adjustments
+
+# sku, category, size, colour, quantity (None = no inventory row)
+VARIANTS = [
+    ("FCT-1", "fct-a", "F-S", "F-red", 5),
+    ("FCT-2", "fct-a", "F-M", "F-blue", 0),
+    ("FCT-3", "fct-b", "F-S", "F-blue", 2),
+    ("FCT-4", "fct-b", "F-M", "F-red", 1),
+    ("FCT-5", "fct-b", "F-S", "F-red", None),
+]
+CATS = ["fct-a", "fct-b"]
+
+
+@pytest.fixture(scope="module")
+def db():
+    init_db()
+    with SessionLocal() as s:
+        for c in CATS:
+            s.merge(ProductCategory(id=c, title=c))
+        for sku, cat, size, color, qty in VARIANTS:
+            s.merge(ProductVariant(sku=sku, title=sku, category_id=cat, size=size, color=color))
+            if qty is not None:
+                s.merge(Inventory(sku=sku, quantity=qty))
+        s.commit()
+        yield s
+
+
+@pytest.fixture()
+def index(db):
+    idx = VariantFacetIndex()
+    idx.sync()
+    return idx
+
+
+def _ours(counts, facet):
+    return {v: c for v, c in counts[facet].items() if v.startswith(("fct-", "F-"))}
+
+
+def test_or_within_a_facet_and_across_facets(index):
+    total, page, _ = index.query(category=CATS, size=["F-S"])
+    assert total == 3
+    assert sorted(sku for sku, _ in page) == ["FCT-1", "FCT-3", "FCT-5"]
+
+    total, page, _ = index.query(category=CATS, color=["F-red"], in_stock=True)
+    assert sorted(sku for sku, _ in page) == ["FCT-1", "FCT-4"]
+
+    total, _, _ = index.query(category=CATS, size=["F-S", "F-M"], color=["F-blue"])
+    assert total == 2
+
+
+def test_counts_skip_their_own_facet(index):
+    _, _, counts = index.query(category=CATS, size=["F-S"])
+    assert _ours(counts, "size") == {"F-S": 3, "F-M": 2}  # size filter not applied to size counts
+    assert _ours(counts, "color") == {"F-red": 2, "F-blue": 1}
+    assert _ours(counts, "category") == {"fct-a": 1, "fct-b": 2}
+    assert counts["in_stock"] == {"true": 2, "false": 1}
+
+
+def test_paging(index):
+    total, page, _ = index.query(category=CATS, limit=2, offset=4)
+    assert total == 5 and len(page) == 1
+
+
+def test_sync_picks_up_stock_written_by_another_process(db, index):
+    assert index.query(category=CATS, in_stock=True)[0] == 3
+    # written through this process's own index, as another worker would
+    apply_adjustments(db, [InventoryAdjustmentIn(category="fct-a", sku="FCT-2", action="set", qty=4)])
+    apply_adjustments(db, [InventoryAdjustmentIn(category="fct-b", sku="FCT-4", action="remove", qty=1)])
+    assert index.query(category=CATS, in_stock=True)[0] == 3
+    index.sync()
+    total, page, _ = index.query(category=CATS, in_stock=True)
+    assert sorted(sku for sku, _ in page) == ["FCT-1", "FCT-2", "FCT-3"]
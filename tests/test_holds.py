@@ -0,0 +1,118 @@
+"""Stock holds: orders reserve units, and confirmation, cancellation, expiry and stock counts keep them consistent."""
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.database import SessionLocal, init_db
+from app.models import HoldStatus, Inventory, OrderStatus, ProductCategory, ProductVariant, StockHold
+from app.schemas import InventoryAdjustmentIn, OrderCreate, OrderItemIn, OrderStatusUpdate
+from app.services import holds
+from app.services import orders as orders_service
+from app.services.inventory import apply_adjustments
+
+
+@pytest.fixture()
+def sku():
+    init_db()
+    sku = f"HLD-{uuid.uuid4().hex[:8]}"
+    with SessionLocal() as s:
+        s.merge(ProductCategory(id="hld", title="Holds"))
+        s.merge(ProductVariant(sku=sku, title="Held item", category_id="hld"))
+        s.commit()
+    return sku
+
+
+def _stock(sku, action, qty):
+    with SessionLocal() as s:
+        apply_adjustments(s, [InventoryAdjustmentIn(category="hld", sku=sku, action=action, qty=qty)])
+
+
+def _order(sku, qty):
+    with SessionLocal() as s:
+        payload = OrderCreate(
+            customer_name="H", customer_phone="910001",
+            items=[OrderItemIn(category="hld", item_variant=sku, quantity=qty)],
+        )
+        return orders_service.create_order(s, payload).id
+
+
+def _move(order_id, status):
+    with SessionLocal() as s:
+        orders_service.update_order_status(s, order_id, OrderStatusUpdate(status=status))
+
+
+def _available(sku):
+    with SessionLocal() as s:
+        return s.get(Inventory, sku).quantity
+
+
+def _hold_statuses(sku):
+    with SessionLocal() as s:
+        return sorted(st for (st,) in s.query(StockHold.status).filter(StockHold.sku == sku))
+
+
+def test_concurrent_orders_cannot_oversell(sku):
+    _stock(sku, "set", 1)
+    start = threading.Barrier(2)
+    results = []
+
+    def buy():
+        start.wait(5)
+        try:
+            results.append(_order(sku, 1))
+        except ValueError as e:
+            results.append(e)
+
+    threads = [threading.Thread(target=buy) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+    assert len(results) == 2 and sum(isinstance(r, ValueError) for r in results) == 1
+    assert _available(sku) == 0
+    assert _hold_statuses(sku) == [HoldStatus.Held]
+
+
+def test_cancel_returns_held_units(sku):
+    _stock(sku, "set", 5)
+    order_id = _order(sku, 2)
+    assert _available(sku) == 3
+    _move(order_id, OrderStatus.Cancelled)
+    assert _available(sku) == 5
+    assert _hold_statuses(sku) == [HoldStatus.Released]
+
+
+def test_confirm_converts_hold_to_sale(sku):
+    _stock(sku, "set", 5)
+    order_id = _order(sku, 2)
+    _move(order_id, OrderStatus.Confirmed)
+    assert _available(sku) == 3
+    assert _hold_statuses(sku) == [HoldStatus.Converted]
+
+
+def test_set_nets_off_held_units(sku):
+    _stock(sku, "set", 5)
+    order_id = _order(sku, 2)
+    _stock(sku, "set", 10)  # counted on the shelf, including the 2 units set aside
+    assert _available(sku) == 8
+    _move(order_id, OrderStatus.Cancelled)
+    assert _available(sku) == 10  # not 12: the held units were already counted
+
+
+def test_expired_holds_are_swept_and_retaken_on_confirm(sku):
+    _stock(sku, "set", 5)
+    order_id = _order(sku, 2)
+    with SessionLocal() as s:
+        s.query(StockHold).filter(StockHold.order_id == order_id).update(
+            {"expires_at": datetime.utcnow() - timedelta(seconds=1)}
+        )
+        s.commit()
+        assert holds.sweep_expired(s) == 1
+        assert holds.sweep_expired(s) == 0
+    assert _available(sku) == 5
+    assert _hold_statuses(sku) == [HoldStatus.Released]
+    _move(order_id, OrderStatus.Confirmed)  # the lapsed hold is taken from stock again
+    assert _available(sku) == 3
+    assert _hold_statuses(sku) == [HoldStatus.Converted]
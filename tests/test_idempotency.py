@@ -0,0 +1,105 @@
+"""Idempotency keys: replay, waiting duplicates, body conflicts and takeover of abandoned keys."""
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from app.core import config
+from app.core.database import SessionLocal, init_db
+from app.models import IdempotencyKey
+from app.services import idempotency
+
+
+class Payload(BaseModel):
+    n: int
+
+
+@pytest.fixture(autouse=True)
+def _tables():
+    init_db()
+
+
+def _work(calls, status=201):
+    def work():
+        calls.append(1)
+        return status, {"n": len(calls)}
+    return work
+
+
+def test_completed_key_is_replayed():
+    calls = []
+    with SessionLocal() as db:
+        assert idempotency.run_once(db, "t", "replay", Payload(n=1), _work(calls)) == (201, {"n": 1}, False)
+        assert idempotency.run_once(db, "t", "replay", Payload(n=1), _work(calls)) == (201, {"n": 1}, True)
+    assert len(calls) == 1
+
+
+def test_concurrent_duplicate_waits_then_replays(monkeypatch):
+    monkeypatch.setattr(config, "IDEMPOTENCY_WAIT_S", 5)
+    started, release = threading.Event(), threading.Event()
+    calls, results = [], {}
+
+    def slow_work():
+        started.set()
+        release.wait(5)
+        calls.append(1)
+        return 201, {"n": 1}
+
+    def original():
+        with SessionLocal() as db:
+            results["original"] = idempotency.run_once(db, "t", "dup", Payload(n=1), slow_work)
+
+    t = threading.Thread(target=original)
+    t.start()
+    assert started.wait(5)
+    threading.Timer(0.2, release.set).start()  # finish while the duplicate is polling
+    with SessionLocal() as db:
+        results["duplicate"] = idempotency.run_once(db, "t", "dup", Payload(n=1), _work(calls))
+    t.join(5)
+    assert results["original"] == (201, {"n": 1}, False)
+    assert results["duplicate"] == (201, {"n": 1}, True)
+    assert len(calls) == 1
+
+
+def test_key_reused_with_different_body_conflicts():
+    with SessionLocal() as db:
+        idempotency.run_once(db, "t", "reuse", Payload(n=1), _work([]))
+        with pytest.raises(idempotency.IdempotencyConflict):
+            idempotency.run_once(db, "t", "reuse", Payload(n=2), _work([]))
+
+
+def test_reused_key_is_409_over_http():
+    from app.main import app
+
+    client = TestClient(app)  # no lifespan: tables come from init_db above
+    headers = {"Idempotency-Key": "http-reuse"}
+    body = {"category": "none", "sku": "NOPE", "action": "add", "qty": 1}
+    assert client.post("/inventory/adjust", json=body, headers=headers).status_code == 400  # stored as-is
+    assert client.post("/inventory/adjust", json=body, headers=headers).headers["Idempotent-Replayed"] == "true"
+    assert client.post("/inventory/adjust", json={**body, "qty": 2}, headers=headers).status_code == 409
+
+
+def test_stale_pending_key_is_taken_over(monkeypatch):
+    with SessionLocal() as db:
+        assert idempotency._acquire(db, "t", "stale", idempotency.request_hash(Payload(n=1)), "crashed") is None
+        monkeypatch.setattr(config, "IDEMPOTENCY_STALE_S", 0)
+        calls = []
+        assert idempotency.run_once(db, "t", "stale", Payload(n=1), _work(calls)) == (201, {"n": 1}, False)
+        # the original came back after all: it may no longer store its response
+        assert not idempotency._finish(db, "t", "stale", "crashed", 500, {})
+        db.rollback()
+        assert idempotency.run_once(db, "t", "stale", Payload(n=1), _work(calls))[2] is True
+
+
+def test_expired_key_runs_again():
+    calls = []
+    with SessionLocal() as db:
+        idempotency.run_once(db, "t", "ttl", Payload(n=1), _work(calls))
+        db.query(IdempotencyKey).filter(IdempotencyKey.key == "ttl").update(
+            {"expires_at": datetime.utcnow() - timedelta(seconds=1)}
+        )
+        db.commit()
+        assert idempotency.run_once(db, "t", "ttl", Payload(n=2), _work(calls)) == (201, {"n": 2}, False)
+    assert len(calls) == 2
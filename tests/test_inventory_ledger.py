@@ -0,0 +1,47 @@
+"""Inventory ledger: levels that predate it keep their history, and only app sessions fire the stock hooks."""
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal, engine, init_db
+from app.models import Inventory, InventoryMovement, ProductCategory, ProductVariant
+from app.schemas import InventoryAdjustmentIn
+from app.services import inventory
+from app.services.inventory import OPENING_AT, apply_adjustments, note_stock_levels, stock_at
+
+
+@pytest.fixture()
+def sku():
+    init_db()
+    sku = f"LGR-{uuid.uuid4().hex[:8]}"
+    with SessionLocal() as s:
+        s.merge(ProductCategory(id="lgr", title="Ledger"))
+        s.merge(ProductVariant(sku=sku, title="Ledger item", category_id="lgr"))
+        s.add(Inventory(sku=sku, quantity=7))  # entered before the ledger existed
+        s.commit()
+    return sku
+
+
+def test_pre_ledger_level_is_reported_for_past_dates(sku):
+    before = datetime.utcnow() - timedelta(days=30)
+    with SessionLocal() as s:
+        apply_adjustments(s, [InventoryAdjustmentIn(category="lgr", sku=sku, action="add", qty=3)])
+        opening = s.query(InventoryMovement).filter(InventoryMovement.sku == sku, InventoryMovement.action == "opening").one()
+        assert opening.created_at == OPENING_AT and opening.delta == 7
+        assert stock_at(s, sku, before) == 7
+        assert stock_at(s, sku, datetime.utcnow() + timedelta(seconds=1)) == 10
+
+
+def test_stock_hook_ignores_sessions_outside_the_app(sku, monkeypatch):
+    seen = []
+    monkeypatch.setattr(inventory, "stock_changed", lambda db, levels: seen.append(dict(levels)))
+    with Session(engine) as plain:
+        note_stock_levels(plain, {sku: 1})
+        plain.commit()
+    assert seen == []
+    with SessionLocal() as s:
+        note_stock_levels(s, {sku: 2})
+        s.commit()
+    assert seen == [{sku: 2}]
@@ -0,0 +1,73 @@
+"""
+Query-plan regression tests for the order listing: the status filter and the
+newest-first sort must stay on the composite indexes, not a full scan + sort.
+"""
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+import pytest
+from sqlalchemy import event, text
+
+from app.core.database import SessionLocal, engine, init_db
+from app.models import Order, OrderStatus
+from app.services.orders import normalize_statuses, orders_list_for_dropdown
+
+N_ORDERS = 1800  # a multiple of len(OrderStatus)
+
+
+@pytest.fixture(scope="module")
+def db():
+    init_db()
+    with SessionLocal() as s:
+        s.query(Order).delete()
+        start = datetime(2026, 1, 1)
+        statuses = list(OrderStatus)
+        s.add_all(
+            Order(
+                customer_name=f"C{i}", customer_phone=f"91{i:08d}",
+                status=statuses[i % len(statuses)], created_at=start + timedelta(minutes=i),
+            )
+            for i in range(N_ORDERS)
+        )
+        s.commit()
+        s.execute(text("ANALYZE"))
+        yield s
+
+
+def _captured_plan(db, statuses) -> Tuple[int, str]:
+    """Run orders_list_for_dropdown and EXPLAIN QUERY PLAN the orders SELECT it issued."""
+    seen: List[Tuple[str, tuple]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM orders" in statement:
+            seen.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        rows = orders_list_for_dropdown(db, statuses)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    assert seen, "no orders query captured"
+    statement, params = seen[0]
+    with engine.connect() as conn:
+        plan = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, params).fetchall()
+    return len(rows), "\n".join(str(r[-1]) for r in plan)
+
+
+def test_status_filter_uses_status_created_at_index(db):
+    n, plan = _captured_plan(db, ["Pending"])
+    assert n == N_ORDERS // len(OrderStatus)
+    assert "ix_orders_status_created_at" in plan, plan
+
+
+def test_unfiltered_listing_uses_created_at_id_index(db):
+    n, plan = _captured_plan(db, None)
+    assert n == N_ORDERS
+    assert "ix_orders_created_at_id" in plan, plan
+    assert "TEMP B-TREE" not in plan, plan
+
+
+@pytest.mark.parametrize("statuses", [[], ["bogus"], "ALL", ["all"]])
+def test_no_usable_filter_lists_everything(db, statuses):
+    assert normalize_statuses(statuses) is None
+    assert len(orders_list_for_dropdown(db, statuses)) == N_ORDERS
@@ -0,0 +1,57 @@
+"""Order status moves: a transition is applied once even when two requests race on the same order."""
+import pytest
+from sqlalchemy import func
+
+from app.core.database import SessionLocal, init_db
+from app.models import DailySales, Order, OrderItem, OrderStatus, ProductCategory, ProductVariant
+from app.schemas import BulkStatusUpdate, OrderStatusUpdate
+from app.services import orders as orders_service
+from app.services.reports import record_order_created
+
+
+@pytest.fixture()
+def order_id():
+    init_db()
+    with SessionLocal() as s:
+        s.merge(ProductCategory(id="ost", title="Status"))
+        s.merge(ProductVariant(sku="OST-1", title="Status item", category_id="ost"))
+        o = Order(customer_name="R", customer_phone="910000", status=OrderStatus.Pending)
+        s.add(o)
+        s.flush()
+        item = OrderItem(order_id=o.id, category_id="ost", sku="OST-1", quantity=3, unit_price=100)
+        s.add(item)
+        record_order_created(s, o, [item])
+        s.commit()
+        yield o.id
+
+
+def _cancelled_units(s):
+    return s.query(func.sum(DailySales.cancelled_units)).filter(DailySales.sku == "OST-1").scalar() or 0
+
+
+def test_racing_movers_apply_the_transition_once(order_id):
+    with SessionLocal() as a, SessionLocal() as b:
+        before = _cancelled_units(a)
+        stale = a.get(Order, order_id)  # A read the order while it was still Pending ...
+        assert stale.status == OrderStatus.Pending
+        orders_service.bulk_update_status(b, [order_id], OrderStatus.Cancelled)  # ... then B moved it
+        a.rollback()  # SQLite: A must not hold a read transaction across B's write
+        assert orders_service._move_status(a, [stale], OrderStatus.Cancelled) == []
+        assert _cancelled_units(a) == before + 3
+
+
+def test_bulk_reports_only_orders_it_moved(order_id):
+    with SessionLocal() as s:
+        found, missing = orders_service.bulk_update_status(s, [order_id, "nope"], OrderStatus.Confirmed, note="n1")
+        assert found == [(order_id, "910000", True)] and missing == ["nope"]
+        found, _ = orders_service.bulk_update_status(s, [order_id], OrderStatus.Confirmed, note="n2")
+        assert found == [(order_id, "910000", False)]
+        out = orders_service.update_order_status(s, order_id, OrderStatusUpdate(status=OrderStatus.Confirmed, note="n3"))
+        assert out.status == OrderStatus.Confirmed and out.note == "n3"
+
+
+def test_bulk_request_is_capped():
+    with pytest.raises(ValueError):
+        BulkStatusUpdate(order_ids=["x"] * 100_000, status=OrderStatus.Confirmed)
+    with pytest.raises(ValueError):
+        BulkStatusUpdate(order_ids=[], status=OrderStatus.Confirmed)
@@ -0,0 +1,74 @@
+"""
+Read-your-writes across processes: after a write, the caller's reads stay on
+the primary even when they land on a worker that did not see the write.
+Primary and replica are two SQLite files; the replica never receives writes,
+standing in for one that lags.
+"""
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import config, database
+from app.core.database import Base, init_db
+from app.core.signature import sign_write_time
+from app.main import app
+
+
+@pytest.fixture()
+def replica(tmp_path, monkeypatch):
+    init_db()
+    eng = database._make_engine(f"sqlite:///{tmp_path}/replica.db")
+    Base.metadata.create_all(bind=eng)
+    monkeypatch.setattr(database, "replica_engines", [eng])
+    monkeypatch.setattr(database, "_replica_cycle", iter(lambda: eng, None))
+    monkeypatch.setattr(config, "REPLICA_PIN_S", 30.0)
+    yield eng
+    eng.dispose()
+
+
+def _other_worker():
+    """Forget this process's own pins, as if the next request reached another worker."""
+    database._last_write.clear()
+
+
+def _category_ids(client, **kw):
+    resp = client.get("/products/categories", **kw)
+    assert resp.status_code == 200
+    return {c["id"] for c in resp.json()}
+
+
+def test_writer_reads_own_write_on_another_worker(replica):
+    writer = TestClient(app, headers={"X-Caller-Id": "writer"})
+    assert writer.post("/products/categories", params={"id": "pin-a", "title": "A"}).status_code == 201
+    assert writer.cookies.get("last_write")
+
+    _other_worker()
+    assert "pin-a" in _category_ids(writer)  # cookie pins the writer to the primary
+
+    reader = TestClient(app, headers={"X-Caller-Id": "reader"})
+    assert "pin-a" not in _category_ids(reader)  # everyone else reads the replica
+
+
+def test_pin_is_bound_to_caller_and_signature(replica):
+    writer = TestClient(app, headers={"X-Caller-Id": "writer-b"})
+    writer.post("/products/categories", params={"id": "pin-b", "title": "B"})
+    cookie = writer.cookies.get("last_write")
+    _other_worker()
+
+    stolen = TestClient(app, headers={"X-Caller-Id": "someone-else"})
+    assert "pin-b" not in _category_ids(stolen, headers={"X-Caller-Id": "someone-else", "X-Last-Write": cookie})
+
+    stamp, mac = cookie.rsplit(".", 1)
+    forged = f"{stamp}.{'0' * len(mac)}"
+    fresh = TestClient(app, headers={"X-Caller-Id": "writer-b"})
+    assert "pin-b" not in _category_ids(fresh, headers={"X-Last-Write": forged})
+    assert "pin-b" in _category_ids(fresh, headers={"X-Last-Write": cookie})
+
+
+def test_pin_expires(replica):
+    client = TestClient(app, headers={"X-Caller-Id": "late"})
+    client.post("/products/categories", params={"id": "pin-c", "title": "C"})
+    _other_worker()
+    expired = sign_write_time("late", time.time() - config.REPLICA_PIN_S - 1)
+    assert "pin-c" not in _category_ids(TestClient(app, headers={"X-Caller-Id": "late", "X-Last-Write": expired}))
@@ -0,0 +1,75 @@
+"""Variant search index: prefix matching, ranking, write sync and pickup of other processes' writes."""
+import pytest
+
+from app.core.database import SessionLocal, init_db
+from app.models import CatalogChange, ProductCategory, ProductVariant
+from app.services.catalog_sync import record_changes
+from app.services.products import upsert_variant
+from app.services.search import VariantSearchIndex
+
+VARIANTS = [
+    ("SRCH-SKIRT-BLK-S", "Skirt Pleated Black", "S", "Black"),
+    ("SRCH-SKIRT-RED-M", "skirt pleated red", "M", "Red"),
+    ("SRCH-SHIRT-BLK-M", "Shirt Linen Black", "M", "Black"),
+    ("SRCH-SAREE-GRN", "Saree Silk Green", None, "Green"),
+]
+
+
+@pytest.fixture(scope="module")
+def db():
+    init_db()
+    with SessionLocal() as s:
+        s.merge(ProductCategory(id="srch", title="Search"))
+        for sku, title, size, color in VARIANTS:
+            s.merge(ProductVariant(sku=sku, title=title, size=size, color=color, category_id="srch"))
+        s.commit()
+        yield s
+
+
+@pytest.fixture()
+def index(db):
+    idx = VariantSearchIndex()
+    idx.sync()
+    return idx
+
+
+def _skus(idx, q, limit=10):
+    return [sku for sku, _ in idx.search(q, limit) if sku.startswith("SRCH-")]
+
+
+def test_prefixes_of_every_token_match(index):
+    assert _skus(index, "sk") == ["SRCH-SKIRT-BLK-S", "SRCH-SKIRT-RED-M"]
+    assert _skus(index, "pleat bl") == ["SRCH-SKIRT-BLK-S"]  # every query token must match
+    assert _skus(index, "silk") == ["SRCH-SAREE-GRN"]
+    assert _skus(index, "green") == ["SRCH-SAREE-GRN"]  # colour
+    assert _skus(index, "blk") == ["SRCH-SHIRT-BLK-M", "SRCH-SKIRT-BLK-S"]  # sku tokens
+    assert _skus(index, "kirt") == []  # prefixes only, no infix
+
+
+def test_ranking_is_case_insensitive_alphabetical_with_exact_sku_first(index):
+    assert _skus(index, "black") == ["SRCH-SHIRT-BLK-M", "SRCH-SKIRT-BLK-S"]
+    assert _skus(index, "srch-skirt-red-m")[0] == "SRCH-SKIRT-RED-M"
+    assert _skus(index, "skirt", limit=1) == ["SRCH-SKIRT-BLK-S"]
+
+
+def test_upsert_and_remove_keep_postings_in_sync(index):
+    index.upsert("SRCH-SKIRT-RED-M", "Dress Wrap Red", "M", "Red")
+    assert _skus(index, "pleated") == ["SRCH-SKIRT-BLK-S"]  # old title tokens are gone
+    assert _skus(index, "wrap") == ["SRCH-SKIRT-RED-M"]
+    index.remove("SRCH-SKIRT-BLK-S")
+    assert _skus(index, "pleated") == []
+    assert _skus(index, "skirt") == ["SRCH-SKIRT-RED-M"]  # still matched by its sku
+
+
+def test_sync_picks_up_writes_made_by_another_process(db, index):
+    upsert_variant(db, "SRCH-KURTA-1", "Kurta Cotton", "srch")  # updates this process's own index, not `index`
+    assert _skus(index, "kurta") == []
+    index.sync()
+    assert _skus(index, "kurta") == ["SRCH-KURTA-1"]
+
+    db.query(ProductVariant).filter(ProductVariant.sku == "SRCH-KURTA-1").delete()
+    record_changes(db, ["SRCH-KURTA-1"])
+    db.commit()
+    index.sync()
+    assert _skus(index, "kurta") == []
+    assert db.query(CatalogChange).filter(CatalogChange.sku == "SRCH-KURTA-1").count() == 2